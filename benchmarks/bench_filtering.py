@@ -0,0 +1,17 @@
+from src.core.filtering import apply_filter, gaussian_window, ChungKennedyFilter
+
+from .common import benchmark, trace, SAMPLING_RATE
+
+
+@benchmark(sizes=[10 ** 4, 10 ** 5, 10 ** 6])
+def bench_gauss_filter(n_samples):
+    signal = trace(n_samples)
+    window = gaussian_window(1000, SAMPLING_RATE)
+    return lambda: apply_filter(signal, window)
+
+
+@benchmark(sizes=[10 ** 3, 10 ** 4, 10 ** 5])
+def bench_chung_kennedy_filter(n_samples):
+    signal = trace(n_samples)
+    ck_filter = ChungKennedyFilter([5, 10, 20], weight_exponent=5, weight_window=10)
+    return lambda: ck_filter.apply_filter(signal)
@@ -0,0 +1,40 @@
+import numpy as np
+
+from src.core.analysis import Idealizer
+
+from .common import benchmark, recording, AMPLITUDES, SAMPLING_RATE
+
+THRESHOLDS = np.array([-1e-12])
+
+
+def _signal(n_samples):
+    episode = recording(1, n_samples, noise_std=0.3e-12).series[0]
+    return episode.trace, episode.time
+
+
+@benchmark(sizes=[10 ** 4, 10 ** 5, 10 ** 6])
+def bench_threshold_crossing(n_samples):
+    signal, _ = _signal(n_samples)
+    amplitudes = np.array(AMPLITUDES)
+    return lambda: Idealizer.threshold_crossing(signal, amplitudes, THRESHOLDS)
+
+
+@benchmark(sizes=[10 ** 4, 10 ** 5, 10 ** 6])
+def bench_apply_resolution(n_samples):
+    signal, time = _signal(n_samples)
+    idealization = Idealizer.threshold_crossing(signal, np.array(AMPLITUDES), THRESHOLDS)
+    resolution = 4 / SAMPLING_RATE
+    return lambda: Idealizer.apply_resolution(idealization, time, resolution)
+
+
+@benchmark(sizes=[10 ** 4, 10 ** 5, 10 ** 6])
+def bench_extract_events(n_samples):
+    signal, time = _signal(n_samples)
+    idealization = Idealizer.threshold_crossing(signal, np.array(AMPLITUDES), THRESHOLDS)
+    return lambda: Idealizer.extract_events(idealization, time)
+
+
+@benchmark(sizes=[10, 100, 1000])
+def bench_series_hist(n_episodes):
+    data = recording(n_episodes, 4000, piezo_step=(0.02, 0.08))
+    return lambda: data.series_hist(select_piezo=True)
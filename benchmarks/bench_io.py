@@ -0,0 +1,48 @@
+import os
+import atexit
+import shutil
+import tempfile
+
+from src.core import Recording
+
+from .common import benchmark, recording, Skip
+
+_directory = tempfile.mkdtemp(prefix="ascam_benchmarks_")
+atexit.register(shutil.rmtree, _directory, True)
+
+
+def _write(n_episodes, extension, save):
+    filepath = os.path.join(_directory, f"{n_episodes}.{extension}")
+    if not os.path.exists(filepath):
+        save(recording(n_episodes, 4000, piezo_step=(0.02, 0.08)), filepath)
+    return filepath
+
+
+def _save_matlab(data, filepath):
+    data.export_matlab(filepath, "raw_", ["All"], True, True)
+
+
+def _save_axo(data, filepath):
+    data.export_axo(filepath, "raw_", ["All"], True, True)
+
+
+@benchmark(sizes=[10, 100, 1000])
+def bench_load_matlab(n_episodes):
+    filepath = _write(n_episodes, "mat", _save_matlab)
+    return lambda: Recording.from_file(filepath)
+
+
+@benchmark(sizes=[10, 100, 1000])
+def bench_load_axo(n_episodes):
+    try:
+        import axographio
+    except ImportError:
+        raise Skip()
+    filepath = _write(n_episodes, "axgd", _save_axo)
+    return lambda: Recording.from_file(filepath)
+
+
+@benchmark(sizes=[10, 100, 1000])
+def bench_load_snapshot(n_episodes):
+    filepath = _write(n_episodes, "ascam", lambda data, path: data.save_snapshot(path))
+    return lambda: Recording.from_file(filepath)
@@ -0,0 +1,88 @@
+"""Registry and measurement of the benchmarks.
+
+A benchmark is a function decorated with `benchmark` that takes a size,
+does its setup and returns the function whose run time and peak memory are
+measured. The data are synthetic recordings from `src.core.simulate`."""
+
+import time
+import tracemalloc
+
+import numpy as np
+
+from src.core.simulate import simulate_recording
+
+BENCHMARKS = dict()
+
+# rates [1/s] and currents [A] of the simulated two state channel
+RATES = [[0, 200], [400, 0]]
+AMPLITUDES = [0, -2e-12]
+SAMPLING_RATE = 4e4
+
+
+class Skip(Exception):
+    """Raised by the setup of a benchmark that cannot run here."""
+
+
+def benchmark(sizes):
+    """Register a benchmark that is run at each of `sizes`, the smallest
+    size comes first."""
+
+    def register(setup):
+        BENCHMARKS[setup.__name__[len("bench_") :]] = (setup, sizes)
+        return setup
+
+    return register
+
+
+def recording(n_episodes, n_samples, seed=0, **kwargs):
+    return simulate_recording(
+        RATES,
+        AMPLITUDES,
+        n_episodes=n_episodes,
+        duration=n_samples / SAMPLING_RATE,
+        sampling_rate=SAMPLING_RATE,
+        seed=seed,
+        **kwargs,
+    )
+
+
+def trace(n_samples, seed=0):
+    return recording(1, n_samples, seed).series[0].trace
+
+
+def measure(function, repeat=5, min_time=0.2):
+    """Time `function` and measure the peak memory it allocates.
+
+    The function is called at least `repeat` times and until `min_time`
+    seconds have passed, the fastest call is reported. The memory is
+    measured in a separate call with tracemalloc, which slows it down.
+    Returns:
+        seconds, peak_bytes"""
+    times = []
+    start = time.perf_counter()
+    while len(times) < repeat or time.perf_counter() - start < min_time:
+        call_start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - call_start)
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return float(np.min(times)), int(peak)
+
+
+def run_benchmark(name, size, repeat=5, min_time=0.2):
+    """Set up and measure one benchmark at one size.
+
+    Returns:
+        dict with the time [s] and peak memory [bytes], or None if the
+        benchmark was skipped"""
+    setup, _ = BENCHMARKS[name]
+    try:
+        function = setup(size)
+    except Skip:
+        return None
+    seconds, peak = measure(function, repeat, min_time)
+    return dict(seconds=seconds, peak_bytes=peak)
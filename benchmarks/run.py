@@ -0,0 +1,143 @@
+"""Run the benchmarks and compare them with the stored baseline.
+
+    python -m benchmarks.run [--quick] [--save-baseline] [--tolerance=T]
+                             [--output=FILE] [NAME ...]
+
+Without names all benchmarks are run. A result is a regression if its time
+or peak memory is more than `tolerance` times that of the baseline, the
+exit status is 1 if there is any. The baseline is machine dependent, save
+a new one with --save-baseline before comparing changes on another
+machine."""
+
+import os
+import sys
+import json
+import getopt
+import pkgutil
+import platform
+import importlib
+
+import numpy as np
+
+from .common import BENCHMARKS, run_benchmark
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+def load_benchmarks():
+    """Import all `bench_*` modules of this package, which registers their
+    benchmarks."""
+    for module in pkgutil.iter_modules([os.path.dirname(os.path.abspath(__file__))]):
+        if module.name.startswith("bench_"):
+            importlib.import_module(f"{__package__}.{module.name}")
+    return BENCHMARKS
+
+
+def run(names=None, quick=False, repeat=5, min_time=0.2):
+    """Run the benchmarks, only at their smallest size if `quick`.
+
+    Returns:
+        dict mapping name to a dict mapping size (as a string, like in the
+        JSON file) to the result of `run_benchmark`"""
+    results = dict()
+    for name, (_, sizes) in load_benchmarks().items():
+        if names and name not in names:
+            continue
+        for size in sizes[:1] if quick else sizes:
+            result = run_benchmark(name, size, repeat, min_time)
+            if result is not None:
+                results.setdefault(name, dict())[str(size)] = result
+    return results
+
+
+def compare(results, baseline, tolerance=1.5):
+    """Return the (name, size, quantity, ratio) of all results that are
+    more than `tolerance` times their baseline."""
+    regressions = []
+    for name, sizes in results.items():
+        for size, result in sizes.items():
+            reference = baseline.get(name, dict()).get(size)
+            if reference is None:
+                continue
+            for quantity in ("seconds", "peak_bytes"):
+                ratio = result[quantity] / max(reference[quantity], 1e-12)
+                if ratio > tolerance:
+                    regressions.append((name, size, quantity, ratio))
+    return regressions
+
+
+def format_results(results, baseline):
+    lines = [f"{'benchmark':28}{'size':>9}{'time [ms]':>12}{'peak [MB]':>11}{'vs base':>9}"]
+    for name, sizes in results.items():
+        for size, result in sizes.items():
+            reference = baseline.get(name, dict()).get(size)
+            ratio = ""
+            if reference is not None:
+                ratio = f"{result['seconds'] / reference['seconds']:.2f}x"
+            lines.append(
+                f"{name:28}{size:>9}{result['seconds'] * 1e3:12.3f}"
+                f"{result['peak_bytes'] / 2 ** 20:11.2f}{ratio:>9}"
+            )
+    return "\n".join(lines)
+
+
+def machine():
+    return dict(
+        platform=platform.platform(),
+        processor=platform.processor(),
+        python=platform.python_version(),
+        numpy=np.__version__,
+    )
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    quick = False
+    save_baseline = False
+    tolerance = 1.5
+    output = None
+    try:
+        options, names = getopt.getopt(
+            argv, "qst:o:h", ["quick", "save-baseline", "tolerance=", "output=", "help"]
+        )
+    except getopt.GetoptError as err:
+        print(err)
+        print(__doc__)
+        return 2
+    for opt, arg in options:
+        if opt in ("-q", "--quick"):
+            quick = True
+        elif opt in ("-s", "--save-baseline"):
+            save_baseline = True
+        elif opt in ("-t", "--tolerance"):
+            tolerance = float(arg)
+        elif opt in ("-o", "--output"):
+            output = arg
+        elif opt in ("-h", "--help"):
+            print(__doc__)
+            return 0
+
+    baseline = dict()
+    if os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE) as f:
+            baseline = json.load(f)["results"]
+    results = run(names, quick)
+    print(format_results(results, baseline))
+    if output is not None:
+        with open(output, "w") as f:
+            json.dump(dict(machine=machine(), results=results), f, indent=2)
+    if save_baseline:
+        with open(BASELINE_FILE, "w") as f:
+            json.dump(dict(machine=machine(), results=results), f, indent=2)
+        print(f"saved the baseline to {BASELINE_FILE}")
+        return 0
+
+    regressions = compare(results, baseline, tolerance)
+    for name, size, quantity, ratio in regressions:
+        print(f"regression: {name} at size {size}: {quantity} is {ratio:.2f}x the baseline")
+    return int(bool(regressions))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
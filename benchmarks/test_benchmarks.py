@@ -0,0 +1,28 @@
+"""Run every benchmark once at its smallest size, so that a broken benchmark
+is noticed with the tests. Timing is left to `python -m benchmarks.run`."""
+
+import pytest
+
+from .run import load_benchmarks, run, compare
+from .common import run_benchmark
+
+BENCHMARKS = load_benchmarks()
+
+
+@pytest.mark.parametrize("name", sorted(BENCHMARKS))
+def test_benchmark_runs(name):
+    _, sizes = BENCHMARKS[name]
+    result = run_benchmark(name, sizes[0], repeat=1, min_time=0)
+    if result is None:
+        pytest.skip(f"{name} cannot run here")
+    assert result["seconds"] > 0 and result["peak_bytes"] > 0
+
+
+def test_compare_flags_regressions():
+    baseline = {"gauss_filter": {"10": {"seconds": 1.0, "peak_bytes": 100}}}
+    results = {"gauss_filter": {"10": {"seconds": 2.0, "peak_bytes": 100}}}
+    assert compare(results, baseline, tolerance=1.5) == [
+        ("gauss_filter", "10", "seconds", 2.0)
+    ]
+    assert compare(results, baseline, tolerance=2.5) == []
+    assert run(["no_such_benchmark"], quick=True) == {}
@@ -9,17 +9,10 @@ import logging
 
 import getopt
 
-from PySide2.QtWidgets import QApplication
 try :
-    from .gui.mainwindow import MainWindow
-    
-except:
-    from src.gui.mainwindow import MainWindow
-    
-try :
-    from .utils import initialize_logger
+    from .utils import initialize_logger, log_version_in_background
 except :
-    from src.utils import initialize_logger
+    from src.utils import initialize_logger, log_version_in_background
     
 if platform.system() == 'Darwin':
     os.environ['QT_MAC_WANTS_LAYER'] = '1'
@@ -75,6 +68,9 @@ def display_help():
     """
     print(
         """Usage: ./run --debug --silent --test --logdir=./logfiles
+       ./run batch --help
+       ./run watch --help
+       ./run profile --help
 
             -d --debug : print debug messages to console
             -s --silent : do not print content of analysis log to console
@@ -84,28 +80,35 @@ def display_help():
     )
 
 
-def get_version():
-    here = os.path.abspath(os.path.dirname(__file__))
-    stream = os.popen(f"pip freeze")
-    pip_freeze = stream.read()
+# the commands that do not need the GUI and the modules that run them
+COMMANDS = {"batch": "batch", "watch": "watch", "profile": "profiling"}
 
-    stream = os.popen(f"cd {here}; git show")
-    git_info = stream.read()
-    git_info = "\n".join(git_info.split("\n")[:3])
 
-    return pip_freeze, git_info
+def run_command(command, argv):
+    """Run a command that does not need the GUI and exit with its status."""
+    import importlib
+
+    package = __package__ or "src"
+    module = importlib.import_module(f"{package}.{COMMANDS[command]}")
+    sys.exit(module.main(argv))
 
 
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        # headless processing, see `batch.py`, `watch.py` and `profiling.py`
+        run_command(sys.argv[1], sys.argv[2:])
+
     silent, logdir, test, debug = parse_options()
 
     initialize_logger(logdir, silent, debug)
     logging.info("-" * 20 + "Start of new ASCAM session" + "-" * 20)
 
-    pip_freeze, git_info = get_version()
-
-    logging.info(git_info)
-    logging.info(pip_freeze)
+    # the GUI libraries are large, they are only imported to show the window
+    from PySide2.QtWidgets import QApplication
+    try :
+        from .gui.mainwindow import MainWindow
+    except:
+        from src.gui.mainwindow import MainWindow
 
     app = QApplication([])
     for screen in app.screens():
@@ -113,8 +116,13 @@ def main():
             screen_resolution = screen.size().toTuple()
     main_window = MainWindow(screen_resolution=screen_resolution)
     main_window.show()
+    # asking pip and git for the versions is slow, do it once the window
+    # is up
+    log_version_in_background()
     if test:
         main_window.test_mode()
+    else:
+        main_window.offer_restore()
     sys.exit(app.exec_())
     
 if __name__ == "__main__":
@@ -0,0 +1,347 @@
+"""Process many recordings with the same steps without the GUI.
+
+The steps are read from a JSON file of the form
+
+    {
+        "load": {"sampling_rate": 40000, "trace_input_unit": "pA"},
+        "steps": [
+            {"step": "baseline", "method": "Polynomial", "degree": 1,
+             "intervals": [[0, 10]], "selection": "intervals",
+             "time_unit": "ms"},
+            {"step": "gauss_filter", "filter_freq": 2000},
+            {"step": "idealize", "amplitudes": [0, -1, -2], "trace_unit": "pA",
+             "resolution": 0.1, "time_unit": "ms"},
+            {"step": "export_events"},
+            {"step": "export_idealization", "filetype": "npz"}
+        ]
+    }
+
+where "load" holds the arguments of `Recording.from_file` and every step
+names one of the methods `step_<name>` of `BatchJob` together with its
+arguments. The files are processed in parallel worker processes, each
+writes its outputs and a log next to each other in the output directory,
+named after the file and its extension, see `output_names`, and a summary
+of all files is written to `batch_summary.json`."""
+
+import os
+import sys
+import json
+import time
+import getopt
+import logging
+import traceback
+import collections
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .core import Recording, IdealizationCache
+from .constants import CURRENT_UNIT_FACTORS, TIME_UNIT_FACTORS
+
+ana_logger = logging.getLogger("ascam.analysis")
+debug_logger = logging.getLogger("ascam.debug")
+
+SUMMARY_FILE = "batch_summary.json"
+
+
+def output_names(filenames):
+    """Return the names the outputs of the files start with.
+
+    The name is the file name with its extension, e.g. 'rec_mat' for
+    'day1/rec.mat', so that 'rec.mat' and 'rec.axgd' do not overwrite each
+    other. Files with the same name in different directories are told apart
+    by their position in `filenames`, e.g. 'rec_mat_2'."""
+    names = [os.path.basename(filename).replace(".", "_") for filename in filenames]
+    counts = collections.Counter(names)
+    return [
+        f"{name}_{i + 1}" if counts[name] > 1 else name for i, name in enumerate(names)
+    ]
+
+
+class BatchJob:
+    def __init__(self, filename, spec, output_dir, name=None):
+        """The processing of a single file.
+
+        Args:
+            filename - the recording to process
+            spec - the loading arguments and steps, see the module docstring
+            output_dir - the directory in which the outputs are written
+            name - the name the outputs start with, see `output_names`"""
+        self.filename = filename
+        self.spec = spec
+        if name is None:
+            (name,) = output_names([filename])
+        self.output_base = os.path.join(output_dir, name)
+        self.recording = None
+        self.idealization_cache = None
+        # the idealization parameters in the units they were given in, they
+        # are written to the header of the exports
+        self.idealization_params = None
+        self.outputs = []
+
+    def run(self):
+        ana_logger.info(f"batch processing {self.filename}")
+        self.recording = Recording.from_file(self.filename, **self.spec.get("load", {}))
+        for params in self.spec.get("steps", []):
+            params = dict(params)
+            name = params.pop("step")
+            step = getattr(self, f"step_{name}", None)
+            if step is None:
+                raise ValueError(f"Unknown batch step '{name}'.")
+            ana_logger.info(f"step '{name}' with {params}")
+            step(**params)
+
+    def output(self, suffix):
+        filepath = f"{self.output_base}_{suffix}"
+        self.outputs.append(filepath)
+        return filepath
+
+    def step_baseline(self, **params):
+        self.recording.baseline_correction(**params)
+
+    def step_gauss_filter(self, filter_freq):
+        self.recording.gauss_filter_series(filter_freq)
+
+    def step_ck_filter(self, **params):
+        self.recording.CK_filter_series(**params)
+
+    def step_idealize(
+        self,
+        amplitudes,
+        thresholds=None,
+        resolution=None,
+        interpolation_factor=1,
+        interpolation_method="spline",
+        trace_unit="pA",
+        time_unit="ms",
+    ):
+        """Idealize the current series, the amplitudes and thresholds are
+        given in `trace_unit` and the resolution in `time_unit`. Without
+        thresholds they are placed half way between the amplitudes."""
+        amps = np.array(amplitudes, dtype=float)
+        if thresholds is None:
+            thetas = (amps[1:] + amps[:-1]) / 2
+        else:
+            thetas = np.array(thresholds, dtype=float)
+        self.idealization_params = dict(
+            amplitudes=amps,
+            thresholds=thetas,
+            resolution=resolution,
+            interpolation_factor=interpolation_factor,
+        )
+        trace_factor = CURRENT_UNIT_FACTORS[trace_unit]
+        if resolution is not None:
+            resolution = resolution / TIME_UNIT_FACTORS[time_unit]
+        self.idealization_cache = IdealizationCache(
+            self.recording,
+            amps / trace_factor,
+            thetas / trace_factor,
+            resolution,
+            interpolation_factor,
+            interpolation_method,
+        )
+        self.idealization_cache.idealize_series()
+
+    def step_first_activation(self, threshold, trace_unit="pA"):
+        self.recording.detect_fa(threshold / CURRENT_UNIT_FACTORS[trace_unit])
+
+    def step_first_events(self, threshold, trace_unit="pA"):
+        self.recording.get_first_events(threshold / CURRENT_UNIT_FACTORS[trace_unit])
+
+    def step_export_events(self, time_unit="us", trace_unit="pA"):
+        self.require_idealization("export_events")
+        self.idealization_cache.export_events(
+            self.output("events.csv"), time_unit, trace_unit
+        )
+
+    def step_export_idealization(
+        self, lists=None, filetype="csv", time_unit="ms", trace_unit="pA"
+    ):
+        self.require_idealization("export_idealization")
+        self.recording.export_idealization(
+            self.output(f"idealization.{filetype}"),
+            lists,
+            time_unit,
+            trace_unit,
+            filetype=filetype,
+            **self.idealization_params,
+        )
+
+    def step_export_matlab(
+        self,
+        lists=None,
+        save_piezo=True,
+        save_command=True,
+        time_unit="s",
+        trace_unit="A",
+        piezo_unit="V",
+        command_unit="V",
+        do_compression=False,
+    ):
+        self.recording.export_matlab(
+            self.output("export.mat"),
+            self.recording.current_datakey,
+            lists,
+            save_piezo and self.recording.has_piezo,
+            save_command and self.recording.has_command,
+            time_unit,
+            trace_unit,
+            piezo_unit,
+            command_unit,
+            do_compression,
+        )
+
+    def step_export_first_activation(self, lists=None, time_unit="ms", trace_unit="pA"):
+        self.recording.export_first_activation(
+            self.output("first_activation.csv"),
+            lists_to_save=lists,
+            time_unit=time_unit,
+            trace_unit=trace_unit,
+        )
+
+    def step_export_first_events(self, lists=None, time_unit="ms"):
+        self.recording.export_first_events(
+            self.output("first_events.csv"), lists_to_save=lists, time_unit=time_unit
+        )
+
+    def require_idealization(self, step):
+        if self.idealization_cache is None:
+            raise ValueError(f"Step '{step}' needs an 'idealize' step before it.")
+
+
+def process_file(filename, spec, output_dir, name=None):
+    """Run the steps on one file and log them to `<name>.log` in the output
+    directory, errors are logged and reported instead of raised.
+
+    Returns:
+        a dict with the file, its status ('ok' or 'failed'), the error
+        message, the run time, the number of episodes and the output files"""
+    return run_job(BatchJob(filename, spec, output_dir, name))
+
+
+def run_job(job):
+    """Run a `BatchJob` as described in `process_file`."""
+    handler = logging.FileHandler(f"{job.output_base}.log", "w")
+    handler.setFormatter(
+        logging.Formatter("%(asctime)s:%(levelname)s:%(module)s:%(message)s")
+    )
+    # the analysis log only reaches the root logger if the ascam loggers
+    # were not set up with `initialize_logger`
+    loggers = [logging.getLogger()]
+    if not ana_logger.propagate:
+        loggers.append(ana_logger)
+    levels = [logger.level for logger in loggers]
+    for logger in loggers:
+        logger.addHandler(handler)
+        logger.setLevel(min(logger.getEffectiveLevel(), logging.INFO))
+    start = time.perf_counter()
+    result = dict(file=job.filename, status="ok", error=None)
+    try:
+        job.run()
+    except Exception as e:
+        ana_logger.error(traceback.format_exc())
+        result.update(status="failed", error=f"{type(e).__name__}: {e}")
+    finally:
+        for logger, level in zip(loggers, levels):
+            logger.removeHandler(handler)
+            logger.setLevel(level)
+        handler.close()
+    result.update(
+        seconds=time.perf_counter() - start,
+        n_episodes=len(job.recording.series) if job.recording is not None else 0,
+        outputs=job.outputs,
+        log=handler.baseFilename,
+    )
+    return result
+
+
+def run_batch(filenames, spec, output_dir, jobs=None):
+    """Process the files with the steps in `spec`.
+
+    Args:
+        filenames - the recordings to process
+        spec - dict with the loading arguments and the steps
+        output_dir - the directory in which the outputs, logs and the
+            summary are written
+        jobs - the number of worker processes, all files are processed in
+            this process if it is 1 and by one worker per cpu if it is None
+    Returns:
+        the results of `process_file` in the order of the files"""
+    os.makedirs(output_dir, exist_ok=True)
+    start = time.perf_counter()
+    names = output_names(filenames)
+    if jobs == 1:
+        results = [
+            process_file(f, spec, output_dir, name) for f, name in zip(filenames, names)
+        ]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = [
+                executor.submit(process_file, f, spec, output_dir, name)
+                for f, name in zip(filenames, names)
+            ]
+            results = [future.result() for future in futures]
+    summary = dict(
+        spec=spec,
+        seconds=time.perf_counter() - start,
+        n_files=len(results),
+        n_failed=sum(result["status"] != "ok" for result in results),
+        files=results,
+    )
+    with open(os.path.join(output_dir, SUMMARY_FILE), "w") as f:
+        json.dump(summary, f, indent=2)
+    return results
+
+
+def format_report(results):
+    lines = []
+    for result in results:
+        line = f"{result['status']:6} {result['seconds']:8.2f}s {result['file']}"
+        if result["error"] is not None:
+            line += f"\n       {result['error']} (see {result['log']})"
+        lines.append(line)
+    n_failed = sum(result["status"] != "ok" for result in results)
+    lines.append(f"{len(results) - n_failed} of {len(results)} files processed")
+    return "\n".join(lines)
+
+
+def display_help():
+    print(
+        """Usage: ascam batch [--jobs=N] [--outdir=DIR] SPEC FILE [FILE ...]
+
+            SPEC : JSON file with the loading arguments and processing steps
+            -j --jobs : number of worker processes (default: one per cpu)
+            -o --outdir : directory for the outputs (default: ./ASCAM_batch)
+            -h --help : display this message"""
+    )
+
+
+def main(argv=None):
+    """Entry point of `ascam batch`, returns the exit status."""
+    if argv is None:
+        argv = sys.argv[1:]
+    jobs = None
+    output_dir = "./ASCAM_batch"
+    try:
+        options, args = getopt.getopt(argv, "j:o:h", ["jobs=", "outdir=", "help"])
+    except getopt.GetoptError as err:
+        print(err)
+        display_help()
+        return 2
+    for opt, arg in options:
+        if opt in ("-j", "--jobs"):
+            jobs = int(arg)
+        elif opt in ("-o", "--outdir"):
+            output_dir = arg
+        elif opt in ("-h", "--help"):
+            display_help()
+            return 0
+    if len(args) < 2:
+        display_help()
+        return 2
+
+    with open(args[0]) as f:
+        spec = json.load(f)
+    results = run_batch(args[1:], spec, output_dir, jobs)
+    print(format_report(results))
+    return int(any(result["status"] != "ok" for result in results))
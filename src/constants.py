@@ -1,3 +1,5 @@
+import os
+
 DEFAULT_GAUSS_CUTOFF_FREQ = 1000
 
 CURRENT_UNIT_FACTORS = {"fA": 1e15, "pA": 1e12, "nA": 1e9, "µA": 1e6, "mA": 1e3, "A": 1}
@@ -20,5 +22,17 @@ PRECISIONS = {
     "int": 0,
 }
 
+# layout of session snapshots, see `savedata.save_snapshot`
+SNAPSHOT_MAGIC = b"ASCAMSNP"
+SNAPSHOT_VERSION = 1
+# the buffers of the arrays start at multiples of this many bytes
+SNAPSHOT_ALIGNMENT = 64
+
 TEST_FILE_NAME = "181010007_max_bursts_conc.axgx"
 TEST_FILE_NAME = "GluA2_T1_SC-recording_40kHzSR.mat"
+
+# directory in which the journals of the autosaved sessions are kept
+AUTOSAVE_DIR = os.path.join(os.path.expanduser("~"), ".ascam", "autosave")
+# directory for information that is expensive to collect, e.g. the versions
+# of the installed packages
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".ascam", "cache")
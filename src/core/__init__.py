@@ -1,3 +1,6 @@
 from .episode import Episode
 from .idealization import IdealizationCache
 from .recording import Recording
+from .session import SessionJournal
+from .pipeline import Pipeline
+from .simulate import simulate_recording
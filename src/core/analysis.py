@@ -3,7 +3,6 @@ import copy
 import logging
 
 import numpy as np
-from scipy.interpolate import CubicSpline as spCubicSpline
 
 from ..utils.tools import interval_selection, piezo_selection
 
@@ -13,15 +12,38 @@ debug_logger = logging.getLogger("ascam.debug")
 
 
 def interpolate(
-    signal, time, interpolation_factor
+    signal, time, interpolation_factor, method = "spline"
 ):
-    """Interpolate the signal with a cubic spline."""
+    """Interpolate the signal with a cubic spline or by polyphase resampling.
+
+    Arguments:
+        signal - 1D array or 2D array with one episode per row, the
+            interpolation is done along the last axis
+        time - the time points of the signal
+        interpolation_factor - the factor by which to increase the sampling
+            rate
+        method - 'spline' for a cubic spline or 'polyphase' for the cheaper
+            polyphase FIR resampling
+    Returns:
+        the interpolated signal and the corresponding time"""
 
-    spline = spCubicSpline(time, signal)
     interpolation_time = np.arange(
         time[0], time[-1], (time[1] - time[0]) / interpolation_factor
     )
-    return spline(interpolation_time), interpolation_time
+    # scipy takes a long time to import and is only needed here
+    if method == "spline":
+        from scipy.interpolate import CubicSpline as spCubicSpline
+
+        spline = spCubicSpline(time, signal, axis=-1)
+        return spline(interpolation_time), interpolation_time
+    elif method == "polyphase":
+        from scipy.signal import resample_poly
+
+        resampled = resample_poly(
+            signal, int(interpolation_factor), 1, axis=-1, padtype="line"
+        )
+        return resampled[..., : interpolation_time.size], interpolation_time
+    raise ValueError(f"Unknown interpolation method '{method}'.")
 
 
 class Idealizer:
@@ -36,16 +58,27 @@ class Idealizer:
         thresholds = None,
         resolution = None,
         interpolation_factor = 1,
+        interpolation_method = "spline",
+        levels = None,
     ):
-        """Get idealization for single episode."""
+        """Get idealization for single episode.
+
+        If the level indices of the (interpolated) signal for these thresholds
+        are already known they can be passed as `levels`, see
+        `Idealizer.level_indices`."""
 
         if thresholds is None or thresholds.size != amplitudes.size - 1:
             thresholds = (amplitudes[1:] + amplitudes[:-1]) / 2
 
         if interpolation_factor != 1:
-            signal, time = interpolate(signal, time, interpolation_factor)
+            signal, time = interpolate(
+                signal, time, interpolation_factor, interpolation_method
+            )
 
-        idealization = cls.threshold_crossing(signal, amplitudes, thresholds)
+        if levels is not None:
+            idealization = np.sort(amplitudes)[::-1][levels]
+        else:
+            idealization = cls.threshold_crossing(signal, amplitudes, thresholds)
 
         if resolution is not None:
             idealization = cls.apply_resolution(idealization, time, resolution)
@@ -80,10 +113,16 @@ class Idealizer:
             )
 
             thresholds = (amplitudes[1:] + amplitudes[:-1]) / 2
+        elif thresholds is None:
+            thresholds = (amplitudes[1:] + amplitudes[:-1]) / 2
 
         # for convenience we include the trivial case of only 1 amplitude
         if amplitudes.size == 1:
             idealization = np.ones(signal.size) * amplitudes
+        elif np.all(np.diff(thresholds) < 0):
+            # with thresholds in the same order as the amplitudes the level
+            # of every point can be found in a single pass
+            idealization = amplitudes[Idealizer.level_indices(signal, thresholds)]
         else:
             idealization = np.zeros(len(signal))
             # np.where returns a tuple containing array so we have to get the
@@ -96,6 +135,64 @@ class Idealizer:
 
         return idealization
 
+    @staticmethod
+    def extract_series_events(idealizations, time, labels=None):
+        """Summarize idealized traces of equal length as one table of events.
+
+        Args:
+            idealizations [2D numpy array] - idealized traces in the rows
+            time [1D numpy array] - the time array shared by all traces
+            labels [1D numpy array] - the value of the first column for the
+                events of each row, defaults to the row index
+        Return:
+            event_list [2D numpy array] - an array containing the label, the
+                amplitude of the event, its duration, the time it starts and
+                the time it ends in its columns, sorted by row and start"""
+
+        n_rows, n_points = idealizations.shape
+        if labels is None:
+            labels = np.arange(n_rows)
+        rows, cols = np.nonzero(idealizations[:, 1:] != idealizations[:, :-1])
+        # every row has an event starting at its first point and a new event
+        # after each change
+        start_rows = np.concatenate((np.arange(n_rows), rows))
+        starts = np.concatenate((np.zeros(n_rows, dtype=int), cols + 1))
+        order = np.lexsort((starts, start_rows))
+        start_rows = start_rows[order]
+        starts = starts[order]
+        # events end where the next one starts or at the end of the row
+        ends = np.empty_like(starts)
+        ends[:-1] = starts[1:] - 1
+        ends[np.append(start_rows[1:] != start_rows[:-1], True)] = n_points - 1
+
+        event_list = np.zeros((starts.size, 5))
+        event_list[:, 0] = np.asarray(labels)[start_rows]
+        event_list[:, 1] = idealizations[start_rows, starts]
+        event_list[:, 3] = time[starts]
+        event_list[:, 4] = time[ends]
+        # start and end times are inclusive bounds, see `extract_events`
+        sampling_interval = time[1] - time[0]
+        event_list[:, 2] = event_list[:, 4] - event_list[:, 3] + sampling_interval
+        return event_list
+
+    @staticmethod
+    def level_indices(signal, thresholds):
+        """Return the index of the level of every point in the signal.
+
+        The index of a point is the number of thresholds above it, ie the
+        index of its amplitude when the amplitudes are sorted in descending
+        order. This only depends on the thresholds, so the result can be
+        reused when only the amplitudes change.
+        Args:
+            signal - the (interpolated) trace
+            thresholds - thresholds sorted in descending order"""
+
+        thresholds = np.asarray(thresholds)
+        indices = thresholds.size - np.searchsorted(
+            thresholds[::-1], signal, side="right"
+        )
+        return indices.astype(np.min_scalar_type(thresholds.size))
+
     @staticmethod
     def apply_resolution(
         idealization, time, resolution
@@ -114,12 +211,14 @@ class Idealizer:
         end_ind = len(events[:, 1])
         while i < end_ind:
             if events[i, 1] < resolution:
-                i_start = int(np.where(time == events[i, 2])[0])
-                i_end = int(np.where(time == events[i, 3])[0]) + 1
+                # time is sorted so the indices of the event boundaries can
+                # be found by binary search
+                i_start = int(np.searchsorted(time, events[i, 2]))
+                i_end = int(np.searchsorted(time, events[i, 3])) + 1
                 # add the first but not the last event to the next,
                 # otherwise, flip a coin
                 if (np.random.binomial(1, 0.5) or i == 0) and i != end_ind - 1:
-                    i_end = int(np.where(time == events[i + 1, 3])[0]) + 1
+                    i_end = int(np.searchsorted(time, events[i + 1, 3])) + 1
                     idealization[i_start:i_end] = events[i + 1, 0]
                     # set amplitude
                     events[i, 0] = events[i + 1, 0]
@@ -130,7 +229,7 @@ class Idealizer:
                     # delete next event
                     events = np.delete(events, i + 1, axis=0)
                 else:  # add to the previous event
-                    i_start = int(np.where(time == events[i - 1, 2])[0])
+                    i_start = int(np.searchsorted(time, events[i - 1, 2]))
                     idealization[i_start:i_end] = events[i - 1, 0]
                     # add duration
                     events[i - 1, 1] += events[i, 1]
@@ -197,6 +296,91 @@ class Idealizer:
         event_list[:, 1] = event_list[:, 3] - event_list[:, 2] + sampling_interval
         return event_list
 
+    @staticmethod
+    def step_curve(idealization, time):
+        """Return the vertices of the step curve of an idealized trace.
+
+        Each event is drawn as a horizontal segment from its first time point
+        to the first time point of the next event (the last event ends at
+        the last time point), so the curve has two vertices per event.
+        Args:
+            idealization [1D numpy array] - an idealized current trace
+            time [1D numpy array] - the corresponding time array
+        Returns:
+            x, y [1D numpy arrays] - the coordinates of the vertices"""
+        changes = np.flatnonzero(idealization[1:] != idealization[:-1]) + 1
+        starts = np.concatenate(([0], changes))
+        ends = np.concatenate((changes, [time.size - 1]))
+        x = np.column_stack((time[starts], time[ends])).ravel()
+        return x, np.repeat(idealization[starts], 2)
+
+
+def series_events(idealizations, times, block_size=64):
+    """Extract the events of a list of idealized traces.
+
+    Traces of equal length are processed in blocks of `block_size` with
+    `Idealizer.extract_series_events`, which assumes they share their time.
+    Args:
+        idealizations - list of idealized traces
+        times - list of the corresponding time arrays
+    Returns:
+        event_list [2D numpy array] - event table with the position of the
+            trace in the list in the first column"""
+
+    tables = []
+    for start in range(0, len(idealizations), block_size):
+        block = idealizations[start : start + block_size]
+        if all(ideal.size == block[0].size for ideal in block):
+            tables.append(
+                Idealizer.extract_series_events(
+                    np.vstack(block),
+                    times[start],
+                    np.arange(start, start + len(block)),
+                )
+            )
+        else:
+            for i, (ideal, time) in enumerate(
+                zip(block, times[start : start + block_size])
+            ):
+                events = Idealizer.extract_events(ideal, time)
+                tables.append(
+                    np.column_stack((np.full(len(events), start + i), events))
+                )
+    if tables:
+        return np.concatenate(tables, axis=0)
+    return np.zeros((0, 5))
+
+
+def first_events_table(events, n_episodes, exit_times, states):
+    """Find the first event in each state for all episodes of a series.
+
+    Args:
+        events [2D numpy array] - event table of the series as returned by
+            `Idealizer.extract_series_events` with the position of the
+            episode in the series in the first column
+        n_episodes [int] - the number of episodes in the series
+        exit_times [1D numpy array] - for each episode the time before which
+            events are ignored
+        states [1D numpy array] - the states in the order of the output
+    Returns:
+        first_events [3D numpy array] - n_episodes x 2 x n_states array with
+            the start time and duration of the first event of each state,
+            NaN where a state is not visited"""
+
+    first_events = np.full((n_episodes, 2, len(states)), np.nan)
+    rows = events[:, 0].astype(int)
+    # we skip events before first activation time and before piezo
+    events = events[events[:, 3] >= exit_times[rows]]
+    rows = events[:, 0].astype(int)
+    order = np.argsort(states)
+    state_inds = order[np.searchsorted(states, events[:, 1], sorter=order)]
+    # the events are sorted by episode and start time so the first occurrence
+    # of each (episode, state) pair is the first event in that state
+    _, first = np.unique(rows * len(states) + state_inds, return_index=True)
+    first_events[rows[first], 0, state_inds[first]] = events[first, 3]
+    first_events[rows[first], 1, state_inds[first]] = events[first, 2]
+    return first_events
+
 
 def detect_first_activation(
     time, signal, threshold
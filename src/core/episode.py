@@ -67,15 +67,36 @@ class Episode:
         return self.trace[np.argmin(np.abs(self.time - self.first_activation))]
 
     def idealize(
-        self, amplitudes, thresholds=None, resolution=None, interpolation_factor=1
+        self,
+        amplitudes,
+        thresholds=None,
+        resolution=None,
+        interpolation_factor=1,
+        interpolation_method="spline",
+        interpolated=None,
+        levels=None,
     ):
+        """Idealize the episode.
+
+        If `interpolated` is given it should be a tuple of the trace and time
+        already interpolated by `interpolation_factor`, which are then used
+        instead of interpolating again. Precomputed level indices of the
+        signal can be passed as `levels`."""
+
+        if interpolated is not None:
+            signal, time = interpolated
+            interpolation_factor = 1
+        else:
+            signal, time = self.trace, self.time
         self.idealization, self.id_time = Idealizer.idealize_episode(
-            self.trace,
-            self.time,
+            signal,
+            time,
             amplitudes,
             thresholds,
             resolution,
             interpolation_factor,
+            interpolation_method,
+            levels,
         )
 
     def gauss_filter_episode(self, filter_frequency=1e3, sampling_rate=4e4):
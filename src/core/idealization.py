@@ -1,9 +1,11 @@
 import logging
+import threading
+
 import numpy as np
 
-from .analysis import Idealizer
+from .analysis import Idealizer, series_events
 from ..constants import CURRENT_UNIT_FACTORS, TIME_UNIT_FACTORS
-from ..utils import round_off_tables
+from ..utils import write_csv_table, remove_on_error, instrumented
 
 
 debug_logger = logging.getLogger("ascam.debug")
@@ -18,6 +20,7 @@ class IdealizationCache:
         thresholds=None,
         resolution=None,
         interpolation_factor=None,
+        interpolation_method="spline",
     ):
         self.data = data
 
@@ -25,6 +28,27 @@ class IdealizationCache:
         self.thresholds = thresholds
         self.resolution = resolution
         self.interpolation_factor = interpolation_factor
+        self.interpolation_method = interpolation_method
+
+        # the event table and the dwell times grouped by amplitude are built
+        # once per series and kept until the idealization is cleared
+        self._events = dict()
+        self._dwell_times = dict()
+        # episodes can be idealized ahead of time in a background thread, the
+        # lock keeps this from interleaving with changes of the parameters and
+        # the generation counts these changes, see `_idealize`
+        self._lock = threading.RLock()
+        self._generation = 0
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop("_lock")
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+        self._generation = 0
 
     @property
     def ind_idealized(self):
@@ -72,72 +96,199 @@ class IdealizationCache:
         return {e.n_episode for e in self.data.series}
 
     def clear_idealization(self):
-        for series in self.data.values():
-            for episode in [
-                episode for episode in series if episode.idealization is not None
-            ]:
-                episode.idealization = None
-                episode.id_time = None
+        with self._lock:
+            self._generation += 1
+            self._events = dict()
+            self._dwell_times = dict()
+            for series in self.data.values():
+                for episode in [
+                    episode for episode in series if episode.idealization is not None
+                ]:
+                    episode.idealization = None
+                    episode.id_time = None
 
-    def idealize_episode(self, n_episode=None):
-        if n_episode is None:
-            n_episode = self.data.current_ep_ind
-        if n_episode not in self.ind_idealized:
-            debug_logger.debug(
-                f"idealizing episode {n_episode} of "
-                f"series {self.data.current_datakey}"
+    def set_params(
+        self,
+        amplitudes,
+        thresholds=None,
+        resolution=None,
+        interpolation_factor=None,
+        interpolation_method="spline",
+    ):
+        """Change the parameters of the idealization in place.
+
+        Idealizations and events computed with the old parameters are cleared
+        but the level indices of the episodes are kept as long as the
+        thresholds and the interpolation stay the same, so that moving only
+        the amplitudes does not require new threshold crossings, see
+        `_level_indices`."""
+        with self._lock:
+            self.amplitudes = amplitudes
+            self.thresholds = thresholds
+            self.resolution = resolution
+            self.interpolation_factor = interpolation_factor
+            self.interpolation_method = interpolation_method
+            self.clear_idealization()
+
+    def _signal(self, episode, datakey, interpolation_factor, interpolation_method):
+        """Return the signal and time that are idealized for an episode."""
+        if interpolation_factor not in (None, 1):
+            # interpolated traces are cached by the recording
+            return self.data.interpolated_trace(
+                episode.n_episode, interpolation_factor, interpolation_method, datakey
             )
-            self.data.episode(n_episode).idealize(
+        return episode.trace, episode.time
+
+    def _level_indices(self, episode, signal, datakey, params):
+        """Return the cached level indices of an episode, if the thresholds
+        are not in descending order the levels cannot be used and None is
+        returned.
+
+        The levels are kept with the data derived from the series, so they
+        are dropped when the series is replaced, together with the thresholds
+        and interpolation they were computed with."""
+        amplitudes, thresholds, _, interpolation_factor, interpolation_method = params
+        if thresholds is None or thresholds.size != amplitudes.size - 1:
+            thresholds = (amplitudes[1:] + amplitudes[:-1]) / 2
+        if amplitudes.size == 1 or not np.all(np.diff(thresholds) < 0):
+            return None
+        levels = self.data.derived_cache_entry(
+            "levels",
+            (tuple(thresholds), interpolation_factor, interpolation_method),
+            datakey,
+        )
+        if episode.n_episode not in levels:
+            levels[episode.n_episode] = Idealizer.level_indices(signal, thresholds)
+        return levels[episode.n_episode]
+
+    def _idealize(self, episode, datakey):
+        """Idealize an episode of the series `datakey` with the current
+        parameters.
+
+        The lock is only held to read the parameters and to store the
+        result, so changing the parameters never waits for an idealization
+        running in another thread. The result is discarded if the parameters
+        changed or the idealization was cleared in the meantime."""
+        with self._lock:
+            if episode.idealization is not None:
+                debug_logger.debug(
+                    f"episode number {episode.n_episode} already idealized"
+                )
+                return
+            generation = self._generation
+            params = (
                 self.amplitudes,
                 self.thresholds,
                 self.resolution,
                 self.interpolation_factor,
+                self.interpolation_method,
             )
+        debug_logger.debug(
+            f"idealizing episode {episode.n_episode} of series {datakey}"
+        )
+        amplitudes, thresholds, resolution, _, interpolation_method = params
+        signal, time = self._signal(episode, datakey, *params[3:])
+        idealization, id_time = Idealizer.idealize_episode(
+            signal,
+            time,
+            amplitudes,
+            thresholds,
+            resolution,
+            1,
+            interpolation_method,
+            self._level_indices(episode, signal, datakey, params),
+        )
+        with self._lock:
+            if generation == self._generation:
+                episode.idealization = idealization
+                episode.id_time = id_time
 
-        else:
-            debug_logger.debug(f"episode number {n_episode} already idealized")
+    def idealize_episode(self, n_episode=None):
+        if n_episode is None:
+            n_episode = self.data.current_ep_ind
+        datakey = self.data.current_datakey
+        self._idealize(self.data.episode(n_episode), datakey)
 
-    def idealize_series(self):
-        debug_logger.debug(f"idealizing series {self.data.current_datakey}")
-        to_idealize = self.all_ep_inds - self.ind_idealized
-        for i in to_idealize:
-            self.idealize_episode(i)
+    @instrumented
+    def idealize_series(self, progress=None, around=None):
+        """Idealize all episodes of the current series that are not idealized.
 
-    def get_events(self, time_unit="s", trace_unit="A"):
-        if self.all_ep_inds != self.ind_idealized:
-            self.idealize_series()
-        event_array = np.zeros((0, 5)).astype(object)
-        for episode in self.data.series:
-            # create a column containing the episode number
-            ep_events = Idealizer.extract_events(
-                self.idealization(episode.n_episode), self.time()
-            )
-            episode_number = episode.n_episode * np.ones(len(ep_events[:, 0]))
-            # glue that column to the event
-            ep_events = np.concatenate(
-                (episode_number[:, np.newaxis], ep_events), axis=1
+        Args:
+            progress - function called with the number of episodes done and
+                the number of episodes in the series
+            around - if given, the episodes closest to the one with this
+                number are idealized first"""
+        datakey = self.data.current_datakey
+        debug_logger.debug(f"idealizing series {datakey}")
+        series = list(self.data[datakey])
+        if around is not None:
+            series.sort(key=lambda episode: abs(episode.n_episode - around))
+        for i, episode in enumerate(series):
+            self._idealize(episode, datakey)
+            if progress is not None:
+                progress(i + 1, len(series))
+
+    @instrumented
+    def events(self):
+        """Return the events of all episodes in the current series.
+
+        The table is computed once per series and cached, its columns are the
+        episode number, amplitude [A], duration, t_start and t_stop [s]."""
+        datakey = self.data.current_datakey
+        if datakey not in self._events:
+            if self.all_ep_inds != self.ind_idealized:
+                self.idealize_series()
+            debug_logger.debug(f"extracting events of series {datakey}")
+            series = self.data.series
+            events = series_events(
+                [episode.idealization for episode in series],
+                [episode.id_time for episode in series],
             )
-            event_array = np.concatenate((event_array, ep_events), axis=0)
+            # replace the position in the series by the episode number
+            episode_numbers = np.array([episode.n_episode for episode in series])
+            events[:, 0] = episode_numbers[events[:, 0].astype(int)]
+            self._events[datakey] = events
+        return self._events[datakey]
+
+    def get_events(self, time_unit="s", trace_unit="A"):
+        event_array = self.events().copy()
         event_array[:, 1] *= CURRENT_UNIT_FACTORS[trace_unit]
         event_array[:, 2:] *= TIME_UNIT_FACTORS[time_unit]
         return event_array
 
+    def dwell_times(self):
+        """Return the durations [s] of the events in the current series grouped
+        by amplitude, as a dict mapping amplitude to an array of durations.
+
+        All levels are grouped in one pass over the event table and the result
+        is cached, so rebinning a histogram does not touch the events again."""
+        datakey = self.data.current_datakey
+        if datakey not in self._dwell_times:
+            events = self.events()
+            levels, inverse = np.unique(events[:, 1], return_inverse=True)
+            order = np.argsort(inverse, kind="stable")
+            splits = np.cumsum(np.bincount(inverse, minlength=len(levels)))[:-1]
+            durations = np.split(events[order, 2], splits)
+            self._dwell_times[datakey] = dict(zip(levels, durations))
+        return self._dwell_times[datakey]
+
     def dwell_time_hist(
         self, amp, n_bins=None, time_unit="ms", log_times=True, root_counts=True
     ):
-        events = self.get_events(time_unit)
-        debug_logger.debug(f"getting events for amplitude {amp}")
+        debug_logger.debug(f"getting dwell times for amplitude {amp}")
         # np.isclose works best on order of unity (with default tolerances
         # rather than figure out tolerances for e-12 multiply the
         # amp values by the expected units pA
         factor = CURRENT_UNIT_FACTORS["pA"]
-        mask = np.isclose(
-            np.asarray(events[:, 1], dtype=float) * factor, amp * factor
-        )
-        debug_logger.debug(f"multiplied amps by pA, amp={amp*factor}")
-        data = events[:, 2][mask]
+        data = [
+            durations
+            for level, durations in self.dwell_times().items()
+            if np.isclose(level * factor, amp * factor)
+        ]
+        data = np.concatenate(data) if data else np.zeros(0)
+        data = data * TIME_UNIT_FACTORS[time_unit]
         if log_times:
-            data = np.log10(data.astype(float))
+            data = np.log10(data)
         debug_logger.debug(f"there are {len(data)} events")
         if n_bins is None:
             n_bins = int(self.get_n_bins(data))
@@ -147,18 +298,37 @@ class IdealizationCache:
             heights = np.sqrt(heights)
         return heights, bins
 
+    def dwell_time_hists(
+        self, amps, n_bins=None, time_unit="ms", log_times=True, root_counts=True
+    ):
+        """Return the dwell time histograms of all the given amplitudes as a
+        dict mapping amplitude to (heights, bins).
+
+        Args:
+            amps - the amplitudes for which to create histograms
+            n_bins - None, or the number of bins for all histograms or a dict
+                mapping the amplitudes to their number of bins"""
+        hists = dict()
+        for amp in amps:
+            amp_bins = n_bins.get(amp) if isinstance(n_bins, dict) else n_bins
+            hists[amp] = self.dwell_time_hist(
+                amp, amp_bins, time_unit, log_times, root_counts
+            )
+        return hists
+
     @staticmethod
     def get_n_bins(data):
         n = len(data)
         std = np.std(data)
         return round(3.49 * std * n ** (1 / 3))
 
-    def export_events(self, filepath, time_unit="us", trace_unit="pA"):
+    @instrumented
+    def export_events(self, filepath, time_unit="us", trace_unit="pA", progress=None):
         """Export a table of events in the current (idealized) series and
-        duration to a csv file."""
-        debug_logger.debug(f"export_events")
+        duration to a csv file.
 
-        import pandas as pd
+        `progress` is called with the number of written and total rows."""
+        debug_logger.debug(f"export_events")
 
         if not filepath.endswith(".csv"):
             filepath += ".csv"
@@ -175,12 +345,18 @@ class IdealizationCache:
             + f"resolution = {self.resolution} [s];"
             + f"interpolation_factor = {self.interpolation_factor}\n"
         )
-        export_array = self.get_events(time_unit, trace_unit)
-        export_array = pd.DataFrame(export_array, columns=header)
-        # truncate floats for duration and timestamps to 1 micro second
-        export_array = round_off_tables(
-            export_array, ["int", trace_unit, time_unit, time_unit, time_unit]
-        )
-        with open(filepath, "w") as f:
-            f.write(params)
-        export_array.to_csv(filepath, mode="a")
+        export_array = self.events().copy()
+        export_array[:, 1] *= CURRENT_UNIT_FACTORS[trace_unit]
+        export_array[:, 2:] *= TIME_UNIT_FACTORS[time_unit]
+        with remove_on_error(filepath):
+            with open(filepath, "w") as f:
+                f.write(params)
+            # truncate floats for duration and timestamps to 1 micro second
+            write_csv_table(
+                filepath,
+                export_array,
+                header,
+                ["int", trace_unit, time_unit, time_unit, time_unit],
+                mode="a",
+                progress=progress,
+            )
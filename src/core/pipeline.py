@@ -0,0 +1,299 @@
+"""Chainable processing of the episodes of a `Recording` for scripts.
+
+    events = (
+        Pipeline(recording)
+        .baseline(intervals=[[0, 10]], selection="intervals", time_unit="ms")
+        .gauss(2000)
+        .gauss(5000)
+        .idealize([0, -1e-12, -2e-12])
+        .events()
+    )
+
+Every method adding a step returns a new pipeline and nothing is computed
+until one of `episodes`, `batches`, `traces`, `events` or `run` is called.
+These process one episode at a time through all the steps, so no
+intermediate series is stored, and only `run` adds the result to the
+recording. Consecutive gaussian filters are fused when episodes are only
+read, `run` applies them one after the other so that the series it adds
+is the same as that of the processing methods of `Recording`."""
+
+import copy
+import logging
+
+import numpy as np
+
+from .analysis import series_events
+from .filtering import gaussian_window, apply_filter
+from ..constants import TIME_UNIT_FACTORS
+
+debug_logger = logging.getLogger("ascam.debug")
+ana_logger = logging.getLogger("ascam.analysis")
+
+
+class Step:
+    def __init__(self, name, datakey, function, **params):
+        """A processing step of a pipeline.
+
+        Args:
+            name - the name of the step
+            datakey - the part of the name of the series that is added by the
+                step, as in the processing methods of `Recording`
+            function - called with an episode, changes it in place
+            params - the parameters of the step, they are only used to
+                describe it"""
+        self.name = name
+        self.datakey = datakey
+        self.function = function
+        self.params = params
+
+    def __call__(self, episode):
+        self.function(episode)
+
+    def __repr__(self):
+        params = ", ".join(f"{key}={value}" for key, value in self.params.items())
+        return f"{self.name}({params})"
+
+
+class Pipeline:
+    def __init__(self, recording, datakey=None, steps=()):
+        """Steps that are applied to the episodes of a series.
+
+        Args:
+            recording - the recording
+            datakey - the series to start from, the current one if None
+            steps - the steps of the pipeline"""
+        self.recording = recording
+        self.datakey = recording.current_datakey if datakey is None else datakey
+        self.steps = tuple(steps)
+
+    def __repr__(self):
+        steps = " -> ".join(repr(step) for step in self.plan())
+        return f"Pipeline({self.datakey}: {steps})"
+
+    def _add(self, step):
+        if self.steps and self.steps[-1].name == "idealize":
+            raise ValueError(f"Cannot add '{step.name}' after 'idealize'.")
+        return Pipeline(self.recording, self.datakey, self.steps + (step,))
+
+    def baseline(
+        self,
+        intervals=None,
+        method="Polynomial",
+        degree=1,
+        selection="piezo",
+        active=False,
+        deviation=0.05,
+        time_unit="s",
+    ):
+        """Add a baseline correction, see `Recording.baseline_correction`."""
+        if selection.lower() == "piezo" and not self.recording.has_piezo:
+            selection = "None"
+        if intervals is not None:
+            intervals = np.array(intervals) / TIME_UNIT_FACTORS[time_unit]
+        sampling_rate = self.recording.sampling_rate
+
+        def correct(episode):
+            episode.baseline_correct_episode(
+                intervals=intervals,
+                method=method,
+                degree=degree,
+                selection=selection,
+                active=active,
+                deviation=deviation,
+                sampling_rate=sampling_rate,
+            )
+
+        return self._add(
+            Step(
+                "baseline",
+                "BC_",
+                correct,
+                method=method,
+                degree=degree,
+                selection=selection,
+                intervals=intervals,
+            )
+        )
+
+    def gauss(self, filter_freq):
+        """Add a gaussian filter with cutoff frequency `filter_freq` [Hz]."""
+        window = gaussian_window(filter_freq, self.recording.sampling_rate)
+        return self._add(self._gauss_step([filter_freq], window))
+
+    @staticmethod
+    def _gauss_step(filter_freqs, window):
+        def gauss_filter(episode):
+            episode.trace = apply_filter(episode.trace, window)
+
+        datakey = "".join(f"GFILTER{freq}_" for freq in filter_freqs)
+        step = Step("gauss", datakey, gauss_filter, filter_freqs=filter_freqs)
+        step.window = window
+        return step
+
+    def ck_filter(
+        self,
+        window_lengths,
+        weight_exponent,
+        weight_window,
+        apriori_f_weights=False,
+        apriori_b_weights=False,
+    ):
+        """Add a Chung-Kennedy filter, see `Recording.CK_filter_series`."""
+
+        def ck_filter(episode):
+            episode.CK_filter_episode(
+                window_lengths,
+                weight_exponent,
+                weight_window,
+                apriori_f_weights,
+                apriori_b_weights,
+            )
+
+        datakey = f"CKFILTER_K{len(window_lengths)}p{weight_exponent}M{weight_window}_"
+        return self._add(
+            Step(
+                "ck_filter",
+                datakey,
+                ck_filter,
+                window_lengths=window_lengths,
+                weight_exponent=weight_exponent,
+                weight_window=weight_window,
+            )
+        )
+
+    def idealize(
+        self,
+        amplitudes,
+        thresholds=None,
+        resolution=None,
+        interpolation_factor=1,
+        interpolation_method="spline",
+    ):
+        """Add the idealization of the episodes, it has to be the last step.
+
+        The amplitudes and thresholds are given in A and the resolution in
+        s, as for `IdealizationCache`."""
+        amplitudes = np.asarray(amplitudes, dtype=float)
+        if thresholds is None:
+            thresholds = (amplitudes[1:] + amplitudes[:-1]) / 2
+
+        def idealize(episode):
+            episode.idealize(
+                amplitudes,
+                thresholds,
+                resolution,
+                interpolation_factor,
+                interpolation_method,
+            )
+
+        return self._add(
+            Step(
+                "idealize",
+                "",
+                idealize,
+                amplitudes=amplitudes,
+                thresholds=thresholds,
+                resolution=resolution,
+                interpolation_factor=interpolation_factor,
+            )
+        )
+
+    def plan(self):
+        """Return the steps that are applied to every episode read with
+        `episodes`, `batches`, `traces` or `events`.
+
+        Consecutive gaussian filters are fused into one filter whose window
+        is the convolution of their windows. Away from the ends of the trace
+        (within half the length of the fused window) the result is the same
+        as applying the filters one after the other."""
+        plan = []
+        for step in self.steps:
+            if step.name == "gauss" and plan and plan[-1].name == "gauss":
+                previous = plan.pop()
+                step = self._gauss_step(
+                    previous.params["filter_freqs"] + step.params["filter_freqs"],
+                    np.convolve(previous.window, step.window),
+                )
+            plan.append(step)
+        return plan
+
+    def episodes(self, n_episodes=None):
+        """Yield the processed episodes one at a time.
+
+        The episodes are copies, the episodes of the recording are not
+        changed.
+        Args:
+            n_episodes - the numbers of the episodes to process, all
+                episodes of the series if None"""
+        return self._process(self.plan(), n_episodes)
+
+    def _process(self, steps, n_episodes=None):
+        for episode in self.recording[self.datakey]:
+            if n_episodes is not None and episode.n_episode not in n_episodes:
+                continue
+            # the steps replace the arrays of the episode instead of changing
+            # them, so a shallow copy leaves the original untouched
+            episode = copy.copy(episode)
+            for step in steps:
+                step(episode)
+            yield episode
+
+    def batches(self, batch_size, n_episodes=None):
+        """Yield lists of at most `batch_size` processed episodes."""
+        batch = []
+        for episode in self.episodes(n_episodes):
+            batch.append(episode)
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def traces(self, n_episodes=None):
+        """Yield the processed traces one at a time."""
+        for episode in self.episodes(n_episodes):
+            yield episode.trace
+
+    def events(self, n_episodes=None):
+        """Return the event table of the idealized episodes, see
+        `IdealizationCache.events`.
+
+        Only the idealizations are kept while the episodes are processed."""
+        if not self.steps or self.steps[-1].name != "idealize":
+            raise ValueError("The pipeline has to end with 'idealize'.")
+        numbers, idealizations, times = [], [], []
+        for episode in self.episodes(n_episodes):
+            numbers.append(episode.n_episode)
+            idealizations.append(episode.idealization)
+            times.append(episode.id_time)
+        events = series_events(idealizations, times)
+        events[:, 0] = np.array(numbers)[events[:, 0].astype(int)]
+        return events
+
+    def run(self, progress=None):
+        """Process all episodes and add them to the recording as a new series,
+        which becomes the current one.
+
+        The steps are applied as with the processing methods of `Recording`,
+        gaussian filters are not fused, and the series is named like theirs.
+        Args:
+            progress - function called with the number of processed episodes
+                and the total number of episodes
+        Returns:
+            the name of the new series"""
+        step_datakey = "".join(step.datakey for step in self.steps)
+        if not step_datakey:
+            # e.g. only 'idealize', the source series would be replaced
+            raise ValueError("The pipeline has no step that creates a new series.")
+        ana_logger.info(f"running {self}")
+        datakey = "" if self.datakey == "raw_" else self.datakey
+        datakey += step_datakey
+        n_episodes = len(self.recording[self.datakey])
+        series = []
+        for episode in self._process(self.steps):
+            series.append(episode)
+            if progress is not None:
+                progress(len(series), n_episodes)
+        self.recording[datakey] = series
+        self.recording.current_datakey = datakey
+        return datakey
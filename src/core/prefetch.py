@@ -0,0 +1,78 @@
+import logging
+import threading
+
+debug_logger = logging.getLogger("ascam.debug")
+
+
+class EpisodePrefetcher:
+    def __init__(self, n_episodes=3):
+        """Prepare the episodes around the one that is shown in a background
+        thread, so that showing them next only needs drawing.
+
+        Args:
+            n_episodes - the number of episodes prepared on each side of the
+                current one"""
+        self.n_episodes = n_episodes
+        self._condition = threading.Condition()
+        self._queue = []
+        self._task = None
+        self._thread = None
+        self._stopped = False
+        self._last_position = None
+
+    def request(self, episode_numbers, current, task):
+        """Prepare the neighbours of the current episode, replacing any
+        episodes that are still waiting from an earlier request.
+
+        The episodes following the current one in the browsing direction are
+        prepared first, then the ones on the other side.
+        Args:
+            episode_numbers - the numbers of the episodes in the order in
+                which they are browsed
+            current - the number of the episode that is shown
+            task - function that prepares the episode with the number it is
+                called with, it is called in the background thread"""
+        position = episode_numbers.index(current)
+        direction = 1
+        if self._last_position is not None and position < self._last_position:
+            direction = -1
+        self._last_position = position
+        ahead = [position + direction * k for k in range(1, self.n_episodes + 1)]
+        behind = [position - direction * k for k in range(1, self.n_episodes + 1)]
+        queue = [
+            episode_numbers[i] for i in ahead + behind if 0 <= i < len(episode_numbers)
+        ]
+        with self._condition:
+            self._queue = queue
+            self._task = task
+            self._condition.notify()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._queue and not self._stopped:
+                    self._condition.wait()
+                if self._stopped:
+                    return
+                n_episode = self._queue.pop(0)
+                task = self._task
+            try:
+                task(n_episode)
+            except Exception:
+                debug_logger.exception(f"prefetching episode {n_episode} failed")
+
+    def cancel(self):
+        """Drop the episodes that are still waiting to be prepared."""
+        with self._condition:
+            self._queue = []
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -1,13 +1,12 @@
+import zlib
 import pickle
+import struct
 import logging
 
 import numpy as np
-import axographio
-from scipy.io import loadmat as scipy_loadmat
-from scipy.io.matlab.mio5 import varmats_from_mat
-
 
 from ..utils.tools import parse_filename
+from ..constants import SNAPSHOT_MAGIC, SNAPSHOT_VERSION
 
 
 def load(filename, filetype=False, dtype=None, headerlength=None, fs=None):
@@ -44,6 +43,37 @@ def load_pickle(filename):
     return data
 
 
+def load_snapshot(filename):
+    """
+    Read an object saved with `savedata.save_snapshot`.
+    Each buffer is read straight into the memory of the array it belongs to.
+    """
+    header_format = "<IIQQ"
+    with open(filename, "rb") as file:
+        if file.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+            raise ValueError(f"{filename} is not an ASCAM snapshot.")
+        version, compressed, payload_length, n_buffers = struct.unpack(
+            header_format, file.read(struct.calcsize(header_format))
+        )
+        if version > SNAPSHOT_VERSION:
+            raise ValueError(f"Cannot read snapshots of version {version}.")
+        payload = file.read(payload_length)
+        file.seek(-24 * n_buffers, 2)
+        table = np.frombuffer(file.read(24 * n_buffers), dtype="<u8").reshape(-1, 3)
+        buffers = []
+        for offset, stored_size, raw_size in table:
+            file.seek(int(offset))
+            buffer = np.empty(int(raw_size), dtype=np.uint8)
+            if compressed:
+                buffer[:] = np.frombuffer(
+                    zlib.decompress(file.read(int(stored_size))), dtype=np.uint8
+                )
+            else:
+                file.readinto(buffer.data)
+            buffers.append(buffer)
+    return pickle.loads(payload, buffers=buffers)
+
+
 def load_matlab(filename):
     """
     Uses `scipy.io.loadmat` to load data from a `.mat` file.
@@ -70,7 +100,15 @@ def load_matlab(filename):
     # each variable this is necessary for files containing a lot of data
     # (i.e. more that 1000 episode) because the variable names are 3-digit
     # column numbers (so they loop back around after 1000))
-    varmats = varmats_from_mat(open(filename, "rb"))
+    from scipy.io import loadmat as scipy_loadmat
+    try:
+        from scipy.io.matlab import varmats_from_mat
+    except ImportError:
+        # not exported by scipy 1.10, the `mio5` namespace is deprecated
+        from scipy.io.matlab._mio5 import varmats_from_mat
+
+    with open(filename, "rb") as file:
+        varmats = varmats_from_mat(file)
 
     for variable in varmats:
         value = scipy_loadmat(variable[1])[variable[0]]
@@ -102,6 +140,43 @@ def load_matlab(filename):
     return names, time, current, piezo, command_voltage, ep_numbers
 
 
+def load_idealization(filename):
+    """Load an idealization exported by `Recording.export_idealization` with
+    filetype 'npz'.
+
+    Input:
+        filename [string] - name (including location) of the file to be loaded
+    Output:
+        time [1D numpy array] - times of the idealized points
+        episode_numbers [1D numpy array] - the numbers of the episodes
+        idealizations [list of 1D numpy arrays] - the idealized traces
+        params [dict] - the units and the parameters of the idealization
+    """
+    with np.load(filename) as data:
+        time = data["time"]
+        offsets = data["event_offsets"]
+        starts = data["event_starts"]
+        amplitudes = data["event_amplitudes"]
+        idealizations = []
+        for first, last in zip(offsets[:-1], offsets[1:]):
+            # each event lasts until the next one starts
+            durations = np.diff(np.append(starts[first:last], time.size))
+            idealizations.append(np.repeat(amplitudes[first:last], durations))
+        params = {
+            key: data[key].item() if data[key].ndim == 0 else data[key]
+            for key in (
+                "time_unit",
+                "trace_unit",
+                "amplitudes",
+                "thresholds",
+                "resolution",
+                "interpolation_factor",
+            )
+        }
+        episode_numbers = data["episode_numbers"]
+    return time, episode_numbers, idealizations, params
+
+
 def load_binary(filename, dtype, headerlength, fs):
     """
     Loads data from binary file using the numpy function fromfile,
@@ -139,6 +214,7 @@ def load_axo(filename):
         piezo [list of 1D numpy arrays] - voltage of the piezo pipette
         command_voltage [list of 1D numpy arrays] - command voltage applied to
                                                     the patch"""
+    import axographio
 
     file = axographio.read(filename)
     current = []
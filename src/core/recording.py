@@ -1,27 +1,36 @@
 import copy
-import logging
 import pickle
+import logging
+import collections
 
 import numpy as np
-import pandas as pd
 
 from ..constants import CURRENT_UNIT_FACTORS, VOLTAGE_UNIT_FACTORS, TIME_UNIT_FACTORS
 from ..utils import (
     parse_filename,
     piezo_selection,
     interval_selection,
-    round_off_tables,
+    write_csv_table,
+    remove_on_error,
+    MinMaxPyramid,
+    instrumented,
 )
-from .readdata import load_matlab, load_axo
+from .readdata import load_matlab, load_axo, load_snapshot
+from .savedata import save_snapshot
 from .episode import Episode
+from .analysis import interpolate, series_events, first_events_table
 
 
 ana_logger = logging.getLogger("ascam.analysis")
 debug_logger = logging.getLogger("ascam.debug")
 
+# number of episodes per series whose plot pyramids are kept
+PYRAMID_CACHE_SIZE = 16
+
 
 class Recording(dict):
     @classmethod
+    @instrumented
     def from_file(
         cls,
         filename="data/180426 000 Copy Export.mat",
@@ -30,6 +39,7 @@ class Recording(dict):
         trace_input_unit="A",
         piezo_input_unit="V",
         command_input_unit="V",
+        progress=None,
     ):
         """Load data from a file.
 
@@ -42,6 +52,8 @@ class Recording(dict):
             trace_unit - the unit of electric current in the input
             piezo_unit - the unit of voltage in the piezo data in the input
             command_unit - the units in which the command voltage is given
+            progress - function called with the number of loaded episodes
+                and the total number of episodes
         Returns:
             recording - instance of the Recording class containing the data"""
         ana_logger.info(
@@ -58,6 +70,10 @@ class Recording(dict):
         filetype, _, _, _ = parse_filename(filename)
         if filetype == "pkl":
             recording = cls._load_from_pickle(recording)
+        elif filetype == "ascam":
+            recording = cls._load_from_snapshot(recording)
+            # the lists are part of the snapshot
+            return recording
         elif filetype == "mat":
             recording = cls._load_from_matlab(
                 recording,
@@ -65,6 +81,7 @@ class Recording(dict):
                 piezo_input_unit=piezo_input_unit,
                 command_input_unit=command_input_unit,
                 time_input_unit=time_input_unit,
+                progress=progress,
             )
         elif "axg" in filetype:
             recording = cls._load_from_axo(
@@ -73,6 +90,7 @@ class Recording(dict):
                 piezo_input_unit=piezo_input_unit,
                 command_input_unit=command_input_unit,
                 time_input_unit=time_input_unit,
+                progress=progress,
             )
         else:
             raise ValueError(f"Cannot load from filetype {filetype}.")
@@ -84,6 +102,14 @@ class Recording(dict):
     def __init__(self, filename="", sampling_rate=4e4):
         super().__init__()
 
+        # data derived from the series that is expensive to compute but can
+        # always be recomputed, e.g. interpolated traces; it is stored per
+        # datakey, dropped when a series is replaced and not pickled
+        self._derived = dict()
+        # the idealization cache stored in a snapshot, it is handed over to
+        # the idealization frame when the snapshot is loaded
+        self.idealization_cache = None
+
         # parameters for loading the data
         self.filename = filename
 
@@ -101,6 +127,47 @@ class Recording(dict):
         # lists[name] = ([inds], key)
         self.lists = dict()
 
+    def __setitem__(self, datakey, series):
+        # derived data is invalid once the series it came from is replaced,
+        # this is also called while unpickling before `_derived` exists
+        derived = getattr(self, "_derived", None)
+        if derived is not None:
+            derived.pop(datakey, None)
+        super().__setitem__(datakey, series)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop("_derived", None)
+        state.pop("idealization_cache", None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._derived = dict()
+        self.idealization_cache = None
+
+    def derived_cache(self, datakey=None):
+        """Return the dict holding the cached data derived from a series."""
+        if datakey is None:
+            datakey = self.current_datakey
+        return self._derived.setdefault(datakey, dict())
+
+    def derived_cache_entry(self, name, params, datakey=None):
+        """Return the dict holding the data `name` of the episodes of a series
+        computed with `params`.
+
+        Only the entry of the last parameters is kept, e.g. the interpolation
+        with the factor last chosen, the data computed with other parameters
+        is dropped."""
+        cache = self.derived_cache(datakey)
+        # the entry is looked up once, so that data computed with other
+        # parameters in another thread is never stored with these
+        entry = cache.get(name)
+        if not isinstance(entry, tuple) or entry[0] != params:
+            entry = (params, dict())
+            cache[name] = entry
+        return entry[1]
+
     def select_episodes(self, datakey=None, lists=None):
         if datakey is None:
             datakey = self.current_datakey
@@ -146,6 +213,68 @@ class Recording(dict):
             return 0
         return int(current) + 1
 
+    def interpolated_trace(
+        self, n_episode, factor, method="spline", datakey=None, block_size=64
+    ):
+        """Return the trace of an episode interpolated by `factor` together with
+        the interpolated time.
+
+        The interpolation is done for a whole block of episodes at once and
+        cached per series, factor and method, so it is independent of the
+        thresholds and resolution of an idealization.
+        Args:
+            n_episode - number of the episode
+            factor - the interpolation factor
+            method - 'spline' or 'polyphase', see `analysis.interpolate`
+            datakey - the series, defaults to the current one
+            block_size - the number of episodes interpolated together"""
+        if datakey is None:
+            datakey = self.current_datakey
+        cache = self.derived_cache_entry("interpolation", (factor, method), datakey)
+        if n_episode not in cache:
+            series = self[datakey]
+            position = [e.n_episode for e in series].index(n_episode)
+            start = position - position % block_size
+            block = [
+                e
+                for e in series[start : start + block_size]
+                if e.trace.size == series[position].trace.size
+            ]
+            debug_logger.debug(
+                f"interpolating episodes {block[0].n_episode} to "
+                f"{block[-1].n_episode} of series {datakey} by {factor} "
+                f"using {method}"
+            )
+            signals, time = interpolate(
+                np.vstack([e.trace for e in block]),
+                series[position].time,
+                factor,
+                method,
+            )
+            for episode, signal in zip(block, signals):
+                cache[episode.n_episode] = (signal, time)
+        return cache[n_episode]
+
+    def trace_pyramid(self, n_episode=None, datakey=None):
+        """Return the min/max pyramid of an episode's trace used to plot it
+        at the resolution of the screen, it is built once per episode."""
+        if n_episode is None:
+            n_episode = self.current_ep_ind
+        if datakey is None:
+            datakey = self.current_datakey
+        cache = self.derived_cache(datakey).setdefault(
+            "pyramid", collections.OrderedDict()
+        )
+        if n_episode in cache:
+            cache.move_to_end(n_episode)
+        else:
+            episode = [e for e in self[datakey] if e.n_episode == n_episode][0]
+            cache[n_episode] = MinMaxPyramid(episode.time, episode.trace)
+            # only the pyramids of the recently shown episodes are kept
+            while len(cache) > PYRAMID_CACHE_SIZE:
+                cache.popitem(last=False)
+        return cache[n_episode]
+
     @property
     def has_command(self):
         if self.series:
@@ -158,6 +287,7 @@ class Recording(dict):
             return True if self.episode().piezo is not None else False
         return False
 
+    @instrumented
     def baseline_correction(
         self,
         intervals=None,
@@ -167,8 +297,15 @@ class Recording(dict):
         active=False,
         deviation=0.05,
         time_unit="s",
+        progress=None,
+        add=True,
     ):
-        """Apply a baseline correction to the current series."""
+        """Apply a baseline correction to the current series.
+
+        The corrected series is only added once all episodes are corrected,
+        `progress` is called with the number of corrected episodes and the
+        total number of episodes. If `add` is false the new datakey and
+        series are returned instead, see `add_series`."""
 
         if self.current_datakey == "raw_":
             # if its the first operation drop the 'raw_'
@@ -177,7 +314,7 @@ class Recording(dict):
             # if operations have been done before combine the names
             new_datakey = self.current_datakey + "BC_"
         logging.info(f"new datakey is {new_datakey}")
-        self[new_datakey] = copy.deepcopy(self.series)
+        series = copy.deepcopy(self.series)
         if selection.lower() == "piezo" and not self.has_piezo:
             debug_logger.debug(
                 "selection method was set to 'piezo' but"
@@ -196,7 +333,7 @@ class Recording(dict):
         )
         if intervals is not None:
             intervals = np.array(intervals) / TIME_UNIT_FACTORS[time_unit]
-        for episode in self[new_datakey]:
+        for i, episode in enumerate(series):
             episode.baseline_correct_episode(
                 degree=degree,
                 intervals=intervals,
@@ -206,11 +343,28 @@ class Recording(dict):
                 active=active,
                 sampling_rate=self.sampling_rate,
             )
-        self.current_datakey = new_datakey
+            if progress is not None:
+                progress(i + 1, len(series))
+        if not add:
+            return new_datakey, series
+        self.add_series(new_datakey, series)
+
+    def add_series(self, datakey, series):
+        """Add a processed series and select it.
+
+        Processing in a background thread can return the series and add it
+        from the thread that shows the recording."""
+        self[datakey] = series
+        self.current_datakey = datakey
         debug_logger.debug("keys of the recording are now {}".format(self.keys()))
 
-    def gauss_filter_series(self, filter_freq):
-        """Filter the current series using a gaussian filter"""
+    @instrumented
+    def gauss_filter_series(self, filter_freq, progress=None, add=True):
+        """Filter the current series using a gaussian filter
+
+        `progress` is called with the number of filtered episodes and the
+        total number of episodes. If `add` is false the new datakey and
+        series are returned instead, see `add_series`."""
         ana_logger.info(
             f"gauss filtering series '{self.current_datakey}'\n"
             f"with frequency {filter_freq}"
@@ -224,11 +378,16 @@ class Recording(dict):
         else:
             # if operations have been done before combine the names
             new_datakey = self.current_datakey + fdatakey
-        self[new_datakey] = copy.deepcopy(self.series)
-        for episode in self[new_datakey]:
+        series = copy.deepcopy(self.series)
+        for i, episode in enumerate(series):
             episode.gauss_filter_episode(filter_freq, self.sampling_rate)
-        self.current_datakey = new_datakey
+            if progress is not None:
+                progress(i + 1, len(series))
+        if not add:
+            return new_datakey, series
+        self.add_series(new_datakey, series)
 
+    @instrumented
     def CK_filter_series(
         self,
         window_lengths,
@@ -236,8 +395,14 @@ class Recording(dict):
         weight_window,
         apriori_f_weights=False,
         apriori_b_weights=False,
+        progress=None,
+        add=True,
     ):
-        """Filter the current series using the Chung-Kennedy filter banks"""
+        """Filter the current series using the Chung-Kennedy filter banks
+
+        `progress` is called with the number of filtered episodes and the
+        total number of episodes. If `add` is false the new datakey and
+        series are returned instead, see `add_series`."""
         ana_logger.info(
             f"Chung-Kennedy filtering on series "
             f"'{self.current_datakey}'\n"
@@ -257,8 +422,8 @@ class Recording(dict):
             # if operations have been done before combine the names
             new_datakey = self.current_datakey + fdatakey
 
-        self[new_datakey] = copy.deepcopy(self.series)
-        for episode in self[new_datakey]:
+        series = copy.deepcopy(self.series)
+        for i, episode in enumerate(series):
             episode.CK_filter_episode(
                 window_lengths,
                 weight_exponent,
@@ -266,31 +431,117 @@ class Recording(dict):
                 apriori_f_weights,
                 apriori_b_weights,
             )
-        self.current_datakey = new_datakey
+            if progress is not None:
+                progress(i + 1, len(series))
+        if not add:
+            return new_datakey, series
+        self.add_series(new_datakey, series)
 
+    @instrumented
     def detect_fa(self, threshold):
         """Apply first event detection to all episodes in the selected series"""
 
-        [
-            episode.detect_first_activation(threshold)
-            for episode in self.series
-            if not episode.manual_first_activation
-        ]
+        indices = self.first_activation_indices(threshold)
+        for episode, index in zip(self.series, indices):
+            if not episode.manual_first_activation:
+                episode.first_activation = episode.time[index]
+
+    def piezo_onsets(self, datakey=None, active=True, deviation=0.05):
+        """Return for each episode in a series the index of the first time
+        point selected by `piezo_selection`, which is cached per series.
+
+        Episodes without piezo data get the index 0."""
+        cache = self.derived_cache(datakey)
+        key = ("piezo_onsets", active, deviation)
+        if key not in cache:
+            onsets = []
+            for episode in self[datakey or self.current_datakey]:
+                if episode.piezo is None:
+                    onsets.append(0)
+                    continue
+                piezo = np.abs(episode.piezo)
+                max_piezo = np.max(piezo)
+                if active:
+                    selected = (max_piezo - piezo) / max_piezo < deviation
+                else:
+                    selected = piezo / max_piezo < deviation
+                onsets.append(np.argmax(selected))
+            cache[key] = np.array(onsets, dtype=int)
+        return cache[key]
+
+    def first_activation_index(self, datakey=None):
+        """Return for each episode in a series the negated running minimum of
+        its trace, which is cached per series.
+
+        The running minimum is below a threshold from the first point where
+        the trace crosses it, so the first crossing of any threshold can be
+        found by binary search in these non-decreasing arrays."""
+        cache = self.derived_cache(datakey)
+        if "first_activation_index" not in cache:
+            cache["first_activation_index"] = [
+                -np.fmin.accumulate(episode.trace)
+                for episode in self[datakey or self.current_datakey]
+            ]
+        return cache["first_activation_index"]
 
+    def first_activation_indices(self, threshold, datakey=None):
+        """Return for each episode in a series the index of the first point
+        where the trace is below `threshold` (0 if it never is)."""
+        indices = np.array(
+            [
+                np.searchsorted(neg_running_min, -threshold, side="right")
+                for neg_running_min in self.first_activation_index(datakey)
+            ],
+            dtype=int,
+        )
+        n_points = np.array(
+            [e.trace.size for e in self[datakey or self.current_datakey]]
+        )
+        indices[indices == n_points] = 0
+        return indices
+
+    @instrumented
     def get_first_events(self, threshold):
-        # Finding all states in the data
-        states_in_episodes = [
-            np.unique(episode.idealization) for episode in self.series
-        ]
-        states = np.unique(np.hstack(states_in_episodes))
-        states.sort()
-        states = states[::-1]
-        first_events_list = []
-        for episode in self.series:
-            first_events = episode.detect_first_events(threshold, states)
-            first_events_list.append(first_events)
-        return np.hstack(first_events_list)
+        """Detect the first activation and the first event in each state for all
+        episodes in the current series.
 
+        Only events that start after both the piezo onset and the first
+        activation are considered. The results are stored in the
+        `first_activation` and `first_events` attributes of the episodes.
+        Returns:
+            first_events - n_episodes x 2 x n_states array with the start time
+                and duration of the first event in each state, the states are
+                sorted in descending order"""
+        series = self.series
+        events = series_events(
+            [episode.idealization for episode in series],
+            [
+                episode.time if episode.id_time is None else episode.id_time
+                for episode in series
+            ],
+        )
+        # Finding all states in the data
+        states = np.unique(events[:, 1])[::-1]
+        first_activation = np.array(
+            [
+                episode.time[i]
+                for episode, i in zip(series, self.first_activation_indices(threshold))
+            ]
+        )
+        piezo_time = np.array(
+            [episode.time[i] for episode, i in zip(series, self.piezo_onsets())]
+        )
+        first_events = first_events_table(
+            events, len(series), np.maximum(piezo_time, first_activation), states
+        )
+        for episode, activation, episode_first_events in zip(
+            series, first_activation, first_events
+        ):
+            episode.first_activation = activation
+            episode.first_events = episode_first_events
+        return first_events
+
+    @instrumented
     def series_hist(
         self,
         active=True,
@@ -347,9 +598,22 @@ class Recording(dict):
         n_bins=50,
         density=False,
         intervals=False,
+        n_episode=None,
     ):
-        """Create a histogram of the current in the presently selected episode.
-        """
+        """Create a histogram of the current in an episode of the presently
+        selected series, by default the current episode.
+
+        The histograms are cached per series so that they can be prepared
+        ahead of time while browsing."""
+        if n_episode is None:
+            n_episode = self.current_ep_ind
+        cache = self.derived_cache_entry(
+            "episode_hist",
+            (active, select_piezo, deviation, n_bins, density, str(intervals)),
+        )
+        if n_episode in cache:
+            return cache[n_episode]
+        episode = self.episode(n_episode)
         if not self.has_piezo:
             debug_logger.debug(
                 (f"Tried piezo selection even though there is no piezo data!")
@@ -358,27 +622,21 @@ class Recording(dict):
         # select time points to include in histogram
         if select_piezo:
             time, trace_points = piezo_selection(
-                self.episode().time,
-                self.episode().piezo,
-                self.episode().trace,
-                active,
-                deviation,
+                episode.time, episode.piezo, episode.trace, active, deviation,
             )
         elif intervals:
             time, trace_points = interval_selection(
-                self.episode().time,
-                self.episode().trace,
-                intervals,
-                self.episode().sampling_rate,
+                episode.time, episode.trace, intervals, episode.sampling_rate,
             )
         else:
-            trace_points = self.episode().trace
+            trace_points = episode.trace
         heights, bins = np.histogram(trace_points, n_bins, density=density)
         # get centers of all the bins
         centers = (bins[:-1] + bins[1:]) / 2
         # get the width of a(ll) bin(s)
         width = bins[1] - bins[0]
-        return heights, bins, centers, width
+        cache[n_episode] = heights, bins, centers, width
+        return cache[n_episode]
 
     # exporting and saving methods
     def save_to_pickle(self, filepath):
@@ -390,6 +648,50 @@ class Recording(dict):
         with open(filepath, "wb") as save_file:
             pickle.dump(self, save_file)
 
+    @instrumented
+    def save_snapshot(self, filepath, idealization_cache=None, compress=False):
+        """Save the recording together with the data derived from it and an
+        idealization cache, so nothing needs to be recomputed after loading.
+
+        Uses pickle protocol 5 with the arrays written as raw blocks, see
+        `savedata.save_snapshot`.
+        Args:
+            filepath - path of the file, '.ascam' is appended if missing
+            idealization_cache - the cache of the current idealization,
+                defaults to the one loaded with the recording
+            compress - if true the arrays are compressed"""
+        debug_logger.debug(f"save_snapshot to {filepath}, compress = {compress}")
+
+        if not filepath.endswith(".ascam"):
+            filepath += ".ascam"
+        if idealization_cache is None:
+            idealization_cache = self.idealization_cache
+        save_snapshot(
+            {
+                "recording": self,
+                "derived": self._derived,
+                "idealization_cache": idealization_cache,
+            },
+            filepath,
+            compress,
+        )
+
+    @staticmethod
+    def _load_from_snapshot(recording):
+        """Load a recording from a '.ascam' snapshot.
+
+        Args:
+            recording - recording object to be filled with data
+        Returns:
+            the recording stored in the snapshot with its derived data and
+            idealization cache"""
+        snapshot = load_snapshot(recording.filename)
+        data = snapshot["recording"]
+        data.filename = recording.filename
+        data._derived = snapshot["derived"]
+        data.idealization_cache = snapshot["idealization_cache"]
+        return data
+
     @staticmethod
     def _load_from_pickle(recording):
         """Load a recording from a '.pkl' file.
@@ -408,6 +710,7 @@ class Recording(dict):
                 recording[key] = value
         return recording
 
+    @instrumented
     def export_idealization(
         self,
         filepath,
@@ -418,35 +721,113 @@ class Recording(dict):
         thresholds,
         resolution,
         interpolation_factor,
+        filetype="csv",
+        progress=None,
     ):
-        debug_logger.debug(f"export_idealization")
+        """Export the idealization of the episodes in the given lists.
 
-        if not filepath.endswith(".csv"):
-            filepath += ".csv"
+        Args:
+            filetype - 'csv' for a table with the time and one column per
+                episode or 'npz' for a compact file that only stores the
+                transitions of the idealizations, it can be read with
+                `readdata.load_idealization`
+            progress - function called with the number of written time
+                points and the total number of time points"""
+        debug_logger.debug(f"export_idealization")
 
         episodes = self.select_episodes(lists=lists_to_save)
-
-        export_array = np.zeros(
-            shape=(len(episodes) + 1, episodes[0].idealization.size)
-        )
-        export_array[0] = self.episode().id_time * TIME_UNIT_FACTORS[time_unit]
-        for k, episode in enumerate(episodes):
-            export_array[k + 1] = (
-                episode.idealization * CURRENT_UNIT_FACTORS[trace_unit]
+        time = self.episode().id_time * TIME_UNIT_FACTORS[time_unit]
+        if filetype == "npz":
+            self._export_idealization_npz(
+                filepath,
+                episodes,
+                time,
+                time_unit,
+                trace_unit,
+                amplitudes,
+                thresholds,
+                resolution,
+                interpolation_factor,
             )
-        # note that we transpose the export array to export the matrix
-        np.savetxt(
-            filepath,
-            export_array.T,
-            delimiter=",",
-            header=f"amplitudes = {amplitudes};"
+            return
+
+        if not filepath.endswith(".csv"):
+            filepath += ".csv"
+        header = (
+            f"amplitudes = {amplitudes};"
             f"thresholds = {thresholds};"
             f"resolution = {resolution};"
             f"interpolation_factor = {interpolation_factor}"
             "\n Time, "
-            + ", ".join(["Episode number " + str(e.n_episode) for e in episodes]),
+            + ", ".join(["Episode number " + str(e.n_episode) for e in episodes])
+        )
+        trace_factor = CURRENT_UNIT_FACTORS[trace_unit]
+        # the output is the same as `np.savetxt` of the matrix with the time
+        # and the idealizations in its columns, but the rows are written in
+        # blocks without creating the whole matrix
+        row_format = ",".join(["%.18e"] * (len(episodes) + 1)) + "\n"
+        block_size = max(1, 2 ** 20 // (len(episodes) + 1))
+        with remove_on_error(filepath):
+            with open(filepath, "w") as export_file:
+                export_file.write("# " + header.replace("\n", "\n# ") + "\n")
+                for start in range(0, time.size, block_size):
+                    block = np.empty(
+                        (min(block_size, time.size - start), len(episodes) + 1)
+                    )
+                    block[:, 0] = time[start : start + block_size]
+                    for k, episode in enumerate(episodes):
+                        block[:, k + 1] = (
+                            episode.idealization[start : start + block_size]
+                            * trace_factor
+                        )
+                    export_file.write(
+                        (row_format * len(block)) % tuple(block.ravel().tolist())
+                    )
+                    if progress is not None:
+                        progress(start + len(block), time.size)
+
+    @staticmethod
+    def _export_idealization_npz(
+        filepath,
+        episodes,
+        time,
+        time_unit,
+        trace_unit,
+        amplitudes,
+        thresholds,
+        resolution,
+        interpolation_factor,
+    ):
+        """Save the idealizations as the index and amplitude of the first
+        point of each of their events."""
+        if not filepath.endswith(".npz"):
+            filepath += ".npz"
+        starts = []
+        event_amplitudes = []
+        for episode in episodes:
+            changes = np.flatnonzero(episode.idealization[1:] != episode.idealization[:-1])
+            episode_starts = np.concatenate(([0], changes + 1))
+            starts.append(episode_starts)
+            event_amplitudes.append(episode.idealization[episode_starts])
+        np.savez_compressed(
+            filepath,
+            time=time,
+            episode_numbers=np.array([e.n_episode for e in episodes]),
+            event_offsets=np.cumsum([0] + [len(s) for s in starts]),
+            event_starts=np.concatenate(starts),
+            event_amplitudes=np.concatenate(event_amplitudes)
+            * CURRENT_UNIT_FACTORS[trace_unit],
+            time_unit=time_unit,
+            trace_unit=trace_unit,
+            amplitudes=np.asarray(amplitudes, dtype=float),
+            thresholds=np.asarray(
+                thresholds if thresholds is not None else [], dtype=float
+            ),
+            resolution=np.nan if resolution is None else resolution,
+            interpolation_factor=interpolation_factor,
         )
 
+    @instrumented
     def export_matlab(
         self,
         filepath,
@@ -458,9 +839,19 @@ class Recording(dict):
         trace_unit="A",
         piezo_unit="V",
         command_unit="V",
+        do_compression=False,
+        progress=None,
     ):
         """Export all the episodes in the givens list(s) from the given series
-        (only one) to a matlab file."""
+        (only one) to a matlab file.
+
+        The variables are written to the file one episode at a time so only
+        the scaled copies of a single episode are held in memory.
+
+        Args:
+            do_compression - if true the variables are zlib compressed
+            progress - function called with the number of written episodes
+                and the total number of episodes"""
         debug_logger.debug(
             f"export_matlab:\n"
             f"saving the lists: {lists_to_save}\n"
@@ -469,36 +860,50 @@ class Recording(dict):
             "save command: {save_command}\n"
             f"saving to destination: {filepath}"
         )
-        from scipy import io
+        try:
+            from scipy.io.matlab import MatFile5Writer
+        except ImportError:
+            # not exported by scipy 1.10, the `mio5` namespace is deprecated
+            from scipy.io.matlab._mio5 import MatFile5Writer
 
         if not filepath.endswith(".mat"):
             filepath += ".mat"
 
-        # create dict to write matlab file and add the time vector
-        export_dict = dict()
-        export_dict["time"] = self["raw_"][0].time * TIME_UNIT_FACTORS[time_unit]
         fill_length = len(str(len(self[datakey])))
         episodes = self.select_episodes(datakey, lists_to_save)
-        # # get the episodes we want to save
-        # indices = list()
-        # for listname in lists_to_save:
-        #     indices.extend(self.lists[listname][0])
-        # indices = np.array(list(set(indices)))
-        # episodes = np.array(self[datakey])[indices]
-        for episode in episodes:
-            n = str(episode.n_episode).zfill(fill_length)
-            export_dict["trace" + n] = episode.trace * CURRENT_UNIT_FACTORS[trace_unit]
-            if save_piezo:
-                export_dict["piezo" + n] = (
-                    episode.piezo * VOLTAGE_UNIT_FACTORS[piezo_unit]
-                )
-            if save_command:
-                export_dict["command" + n] = (
-                    episode.command * VOLTAGE_UNIT_FACTORS[command_unit]
-                )
-        io.savemat(filepath, export_dict)
-
-    def export_axo(self, filepath, datakey, lists_to_save, save_piezo, save_command):
+        with remove_on_error(filepath), open(filepath, "wb") as export_file:
+            # same writer settings as `scipy.io.savemat`, the header is
+            # written with the first variable
+            writer = MatFile5Writer(
+                export_file,
+                do_compression=do_compression,
+                unicode_strings=True,
+                oned_as="row",
+            )
+            writer.put_variables(
+                {"time": self["raw_"][0].time * TIME_UNIT_FACTORS[time_unit]}
+            )
+            for i, episode in enumerate(episodes):
+                n = str(episode.n_episode).zfill(fill_length)
+                episode_dict = {
+                    "trace" + n: episode.trace * CURRENT_UNIT_FACTORS[trace_unit]
+                }
+                if save_piezo:
+                    episode_dict["piezo" + n] = (
+                        episode.piezo * VOLTAGE_UNIT_FACTORS[piezo_unit]
+                    )
+                if save_command:
+                    episode_dict["command" + n] = (
+                        episode.command * VOLTAGE_UNIT_FACTORS[command_unit]
+                    )
+                writer.put_variables(episode_dict)
+                if progress is not None:
+                    progress(i + 1, len(episodes))
+
+    @instrumented
+    def export_axo(
+        self, filepath, datakey, lists_to_save, save_piezo, save_command, progress=None
+    ):
         """Export data to an axograph file.
 
         Argument:
@@ -507,7 +912,10 @@ class Recording(dict):
             lists_to_save - the user-created lists of episodes that should be
                 includes
             save_piezo - if true piezo data will be exported
-            save_command - if true command voltage data will be exported"""
+            save_command - if true command voltage data will be exported
+            progress - function called with the number of collected episodes
+                and the total number of episodes, the file is written at once
+                after all episodes are collected"""
         debug_logger.debug(
             f"export_axo:\n"
             f"saving the lists: {lists_to_save}\n"
@@ -526,20 +934,24 @@ class Recording(dict):
         # to write to axgd we need a list as the second argument of the 'write'
         # method, this elements in the lists will be the columns in data table
         # the first column in this will be a list of episode numbers
+        # axographio writes all columns in one call, so the arrays of the
+        # series are passed as they are instead of copying them
         data_list = [self.episode().time]
 
         # get the episodes we want to save
         episodes = self.select_episodes(datakey, lists_to_save)
 
-        for episode in episodes:
-            data_list.append(np.array(episode.trace))
+        for i, episode in enumerate(episodes):
+            data_list.append(episode.trace)
             column_names.append(f"Ipatch (A) ep# {episode.n_episode}")
             if save_piezo:
                 column_names.append(f"piezo voltage (V) ep# {episode.n_episode}")
-                data_list.append(np.array(episode.piezo))
+                data_list.append(episode.piezo)
             if save_command:
                 column_names.append(f"command voltage (V) ep# {episode.n_episode}")
-                data_list.append(np.array(episode.command))
+                data_list.append(episode.command)
+            if progress is not None:
+                progress(i + 1, len(episodes))
         file = axographio.file_contents(column_names, data_list)
         file.write(filepath)
 
@@ -561,7 +973,7 @@ class Recording(dict):
                 for episode in self.select_episodes(datakey, lists_to_save)
             ]
         )
-        return export_array.astype(object)
+        return export_array
 
     def create_first_event_table(
             self, datakey=None, time_unit="ms", lists_to_save=None
@@ -570,18 +982,21 @@ class Recording(dict):
             datakey = self.current_datakey
         debug_logger.debug(f"first_events for series {datakey}")
 
-        table_rows = []
-        for episode in self.select_episodes(datakey, lists_to_save):
-            first_events_matrix = episode.first_events
-            # Reshaping 2xnstates matrix into an array, column first
-            first_events = first_events_matrix.reshape(
-                first_events_matrix.size, order="F"
-            ) * TIME_UNIT_FACTORS[time_unit]
-            idx_first_event = np.argmin(first_events[::2])
-            data = (episode.n_episode, ) + (f"{idx_first_event}",) + tuple(first_events)
-            table_rows.append(data)
-        return np.array(table_rows).astype(object)
+        episodes = self.select_episodes(datakey, lists_to_save)
+        first_events = np.stack([episode.first_events for episode in episodes])
+        first_events *= TIME_UNIT_FACTORS[time_unit]
+        # the first state visited is the one whose first event starts earliest
+        starts = np.where(np.isnan(first_events[:, 0]), np.inf, first_events[:, 0])
+        first_state = np.argmin(starts, axis=1).astype(float)
+        first_state[np.all(np.isinf(starts), axis=1)] = np.nan
+        # start and duration of each state next to each other
+        first_events = first_events.transpose(0, 2, 1).reshape(len(episodes), -1)
+        table = np.column_stack(
+            ([episode.n_episode for episode in episodes], first_state, first_events)
+        )
+        return table
 
+    @instrumented
     def export_first_activation(
         self,
         filepath,
@@ -589,6 +1004,7 @@ class Recording(dict):
         time_unit="ms",
         lists_to_save=None,
         trace_unit="pA",
+        progress=None,
     ):
         """Export csv file of first activation times."""
         export_array = self.create_first_activation_table(
@@ -599,13 +1015,19 @@ class Recording(dict):
             f"First Activation Time [{time_unit}]",
             f"Current [{trace_unit}]",
         ]
-        export_array = pd.DataFrame(export_array, columns=header)
-        # truncate floats for duration and timestamps to 1 micro second
-        export_array = round_off_tables(export_array, ["int", time_unit, trace_unit])
         if not filepath.endswith(".csv"):
             filepath += ".csv"
-        export_array.to_csv(filepath)
+        # truncate floats for duration and timestamps to 1 micro second
+        with remove_on_error(filepath):
+            write_csv_table(
+                filepath,
+                export_array,
+                header,
+                ["int", time_unit, trace_unit],
+                progress=progress,
+            )
 
+    @instrumented
     def export_first_events(
         self,
         filepath,
@@ -613,6 +1035,7 @@ class Recording(dict):
         time_unit="ms",
         lists_to_save=None,
         trace_unit="pA",
+        progress=None,
     ):
         """Export csv file of first event start times and durations at each state."""
         export_array = self.create_first_event_table(
@@ -623,12 +1046,14 @@ class Recording(dict):
         for i in range(int((export_array.shape[1]-2)/2)):
             header.append(f"S{i}-start [{time_unit}]")
             header.append(f"S{i}-duration [{time_unit}]")
-        export_array_df = pd.DataFrame(export_array, columns=header)
-        # truncate floats for duration and timestamps to 1 micro second
-        export_df = round_off_tables(export_array_df, ["int", time_unit, trace_unit])
         if not filepath.endswith(".csv"):
             filepath += ".csv"
-        export_df.to_csv(filepath)
+        # truncate floats for duration and timestamps to 1 micro second
+        column_units = ["int", "int"] + [time_unit] * (len(header) - 2)
+        with remove_on_error(filepath):
+            write_csv_table(
+                filepath, export_array, header, column_units, progress=progress
+            )
 
     @staticmethod
     def _load_from_axo(
@@ -637,6 +1062,7 @@ class Recording(dict):
         piezo_input_unit,
         command_input_unit,
         time_input_unit,
+        progress=None,
     ):
         """Load a recording from an axograph file.
 
@@ -658,21 +1084,25 @@ class Recording(dict):
         if not ep_numbers:
             ep_numbers = range(n_episodes)
         initial_index = ep_numbers[0]
-        recording["raw_"] = [
-            Episode(
-                time,
-                current[i],
-                n_episode=int(ep_numbers[i]),
-                piezo=piezo[i],
-                command=command[i],
-                sampling_rate=recording.sampling_rate,
-                input_time_unit=time_input_unit,
-                input_trace_unit=trace_input_unit,
-                input_piezo_unit=piezo_input_unit,
-                input_command_unit=command_input_unit,
+        series = []
+        for i in range(n_episodes):
+            series.append(
+                Episode(
+                    time,
+                    current[i],
+                    n_episode=int(ep_numbers[i]),
+                    piezo=piezo[i],
+                    command=command[i],
+                    sampling_rate=recording.sampling_rate,
+                    input_time_unit=time_input_unit,
+                    input_trace_unit=trace_input_unit,
+                    input_piezo_unit=piezo_input_unit,
+                    input_command_unit=command_input_unit,
+                )
             )
-            for i in range(n_episodes)
-        ]
+            if progress is not None:
+                progress(i + 1, n_episodes)
+        recording["raw_"] = series
         recording.current_ep_ind = int(initial_index)
         return recording
 
@@ -683,6 +1113,7 @@ class Recording(dict):
         piezo_input_unit,
         command_input_unit,
         time_input_unit,
+        progress=None,
     ):
         """Load data from a matlab file.
 
@@ -704,20 +1135,24 @@ class Recording(dict):
         if not ep_numbers:
             ep_numbers = range(n_episodes)
         initial_index = ep_numbers[0]
-        recording["raw_"] = [
-            Episode(
-                time,
-                current[i],
-                n_episode=int(ep_numbers[i]),
-                piezo=piezo[i],
-                command=command[i],
-                sampling_rate=recording.sampling_rate,
-                input_time_unit=time_input_unit,
-                input_trace_unit=trace_input_unit,
-                input_piezo_unit=piezo_input_unit,
-                input_command_unit=command_input_unit,
+        series = []
+        for i in range(n_episodes):
+            series.append(
+                Episode(
+                    time,
+                    current[i],
+                    n_episode=int(ep_numbers[i]),
+                    piezo=piezo[i],
+                    command=command[i],
+                    sampling_rate=recording.sampling_rate,
+                    input_time_unit=time_input_unit,
+                    input_trace_unit=trace_input_unit,
+                    input_piezo_unit=piezo_input_unit,
+                    input_command_unit=command_input_unit,
+                )
             )
-            for i in range(n_episodes)
-        ]
+            if progress is not None:
+                progress(i + 1, n_episodes)
+        recording["raw_"] = series
         recording.current_ep_ind = int(initial_index)
         return recording
@@ -1,6 +1,49 @@
-from scipy import io
 import os
 import json
+import zlib
+import pickle
+import struct
+
+import numpy as np
+
+from ..constants import SNAPSHOT_MAGIC, SNAPSHOT_VERSION, SNAPSHOT_ALIGNMENT
+
+
+def save_snapshot(obj, filepath, compress=False):
+    """
+    Pickle an object with protocol 5 and write the buffers of its arrays
+    out-of-band as raw blocks instead of copying them into the pickle.
+    Layout of the file:
+        - magic bytes, version, compression flag, length of the pickle and
+          number of buffers
+        - the pickle
+        - the buffers, each starting at a multiple of SNAPSHOT_ALIGNMENT
+        - a table with offset, stored size and raw size of each buffer
+    Parameters:
+        obj - the object to save
+        filepath - path of the file
+        compress - if true compress each buffer with zlib
+    """
+    buffers = []
+    payload = pickle.dumps(obj, protocol=5, buffer_callback=buffers.append)
+    table = np.zeros((len(buffers), 3), dtype="<u8")
+    with open(filepath, "wb") as save_file:
+        save_file.write(
+            SNAPSHOT_MAGIC
+            + struct.pack(
+                "<IIQQ", SNAPSHOT_VERSION, int(compress), len(payload), len(buffers)
+            )
+        )
+        save_file.write(payload)
+        for i, buffer in enumerate(buffers):
+            raw = buffer.raw()
+            block = zlib.compress(raw, 1) if compress else raw
+            offset = save_file.tell()
+            padding = -offset % SNAPSHOT_ALIGNMENT
+            save_file.write(b"\0" * padding)
+            table[i] = offset + padding, len(block), raw.nbytes
+            save_file.write(block)
+        save_file.write(table.tobytes())
 
 
 def save_metadata(data, filename):
@@ -147,6 +190,8 @@ def save_matlab(data, filepath="", save_piezo=True, save_command=True):
                     n = n.zfill(fill_length)
                     savedict[name + n] = value
         # save to file
+        from scipy import io
+
         io.savemat(file_to_save, savedict)
         return_status = True
     return return_status
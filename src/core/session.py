@@ -0,0 +1,321 @@
+"""Journaled saving of a `Recording`.
+
+A journal is a directory with the arrays of the recording in `chunks`, each
+stored once under the hash of its contents, and a sequence of JSON manifests
+that describe the recording in terms of these chunks. A save only writes the
+chunks that are not in the journal yet, so unchanged series cost nothing but
+hashing them, and the manifest is replaced atomically after all its chunks
+are on disk. The latest manifest whose chunks are all present is therefore
+always a consistent state of the recording."""
+
+import os
+import json
+import glob
+import time
+import shutil
+import hashlib
+import logging
+import weakref
+import threading
+
+import numpy as np
+
+from .episode import Episode
+from .recording import Recording
+
+debug_logger = logging.getLogger("ascam.debug")
+ana_logger = logging.getLogger("ascam.analysis")
+
+MANIFEST_VERSION = 1
+# number of old manifests kept in addition to the latest one
+KEEP_MANIFESTS = 2
+
+
+def _write_atomic(filepath, write):
+    """Call `write` with a file object for a temporary file and move it to
+    `filepath` once it is completely on disk."""
+    tmp_path = f"{filepath}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as tmp_file:
+        write(tmp_file)
+        tmp_file.flush()
+        os.fsync(tmp_file.fileno())
+    os.replace(tmp_path, filepath)
+
+
+class SessionJournal:
+    def __init__(self, path):
+        """Create or open the journal in the directory `path`."""
+        self.path = path
+        self.chunk_dir = os.path.join(path, "chunks")
+        os.makedirs(self.chunk_dir, exist_ok=True)
+        # digests of the arrays that were already saved, arrays are replaced
+        # rather than changed in place by the processing and analysis
+        # methods so the digest of an array that is still alive is valid
+        self._digests = dict()
+        self._lock = threading.Lock()
+        self._thread = None
+        # the exception of the last background save, raised by `wait`
+        self._error = None
+        sequences = self._sequences()
+        self.sequence = sequences[-1] if sequences else 0
+
+    @staticmethod
+    def default_path(filename, root=None):
+        """Return the journal directory used for autosaving the recording
+        loaded from `filename`."""
+        if root is None:
+            from ..constants import AUTOSAVE_DIR
+
+            root = AUTOSAVE_DIR
+        digest = hashlib.sha1(os.path.abspath(filename).encode()).hexdigest()
+        return os.path.join(root, f"{os.path.basename(filename)}_{digest[:12]}")
+
+    @staticmethod
+    def find_journals(root=None):
+        """Return the journals in `root` that have a saved state, newest
+        first."""
+        if root is None:
+            from ..constants import AUTOSAVE_DIR
+
+            root = AUTOSAVE_DIR
+        journals = [
+            path
+            for path in glob.glob(os.path.join(root, "*"))
+            if glob.glob(os.path.join(path, "manifest_*.json"))
+        ]
+        return sorted(journals, key=os.path.getmtime, reverse=True)
+
+    @staticmethod
+    def discard_all(root=None):
+        """Delete all journals in `root`, e.g. when the user declined to
+        restore a session."""
+        if root is None:
+            from ..constants import AUTOSAVE_DIR
+
+            root = AUTOSAVE_DIR
+        for path in glob.glob(os.path.join(root, "*")):
+            shutil.rmtree(path, ignore_errors=True)
+
+    def _sequences(self):
+        sequences = []
+        for manifest in glob.glob(os.path.join(self.path, "manifest_*.json")):
+            try:
+                sequences.append(int(os.path.basename(manifest)[9:-5]))
+            except ValueError:
+                continue
+        return sorted(sequences)
+
+    def _manifest_path(self, sequence):
+        return os.path.join(self.path, f"manifest_{sequence:08d}.json")
+
+    def _chunk_path(self, digest):
+        return os.path.join(self.chunk_dir, digest + ".npy")
+
+    def _digest(self, array):
+        key = id(array)
+        known = self._digests.get(key)
+        if known is not None and known[0]() is array:
+            return known[1]
+        array_hash = hashlib.sha1(f"{array.dtype.str}{array.shape}".encode())
+        array_hash.update(np.ascontiguousarray(array).data)
+        digest = array_hash.hexdigest()
+        self._digests[key] = (weakref.ref(array), digest)
+        return digest
+
+    def snapshot(self, recording):
+        """Collect the state of a recording without copying its arrays.
+
+        This is cheap and should be called from the thread that changes the
+        recording, the snapshot can then be written from any thread."""
+        return {
+            "attributes": {
+                "filename": recording.filename,
+                "sampling_rate": recording.sampling_rate,
+                "current_datakey": recording.current_datakey,
+                "current_ep_ind": recording.current_ep_ind,
+            },
+            "lists": {
+                name: (list(indices), key)
+                for name, (indices, key) in recording.lists.items()
+            },
+            "series": {
+                datakey: [dict(vars(episode)) for episode in series]
+                for datakey, series in recording.items()
+            },
+        }
+
+    def _encode(self, value, written):
+        if isinstance(value, np.ndarray):
+            digest = self._digest(value)
+            if digest not in written and not os.path.exists(self._chunk_path(digest)):
+                _write_atomic(
+                    self._chunk_path(digest),
+                    lambda chunk: np.save(chunk, value, allow_pickle=False),
+                )
+                written.add(digest)
+            return {"chunk": digest}
+        if isinstance(value, np.generic):
+            return value.item()
+        if value is None or isinstance(value, (bool, int, float, str)):
+            return value
+        raise TypeError(f"Cannot save object of type {type(value)} in a journal.")
+
+    def write(self, snapshot):
+        """Write the chunks and the manifest of a snapshot and return the
+        number of newly written chunks."""
+        with self._lock:
+            written = set()
+            series = dict()
+            for datakey, episodes in snapshot["series"].items():
+                series[datakey] = []
+                for attributes in episodes:
+                    encoded = dict()
+                    for name, value in attributes.items():
+                        try:
+                            encoded[name] = self._encode(value, written)
+                        except TypeError as error:
+                            debug_logger.debug(f"not journaling {name}: {error}")
+                    series[datakey].append(encoded)
+            manifest = {
+                "version": MANIFEST_VERSION,
+                "sequence": self.sequence + 1,
+                "time": time.time(),
+                "attributes": snapshot["attributes"],
+                "lists": snapshot["lists"],
+                "series": series,
+            }
+            _write_atomic(
+                self._manifest_path(self.sequence + 1),
+                lambda manifest_file: manifest_file.write(
+                    json.dumps(manifest).encode()
+                ),
+            )
+            self.sequence += 1
+            self._prune()
+            self._digests = {
+                key: known
+                for key, known in self._digests.items()
+                if known[0]() is not None
+            }
+            debug_logger.debug(
+                f"journaled state {self.sequence} to {self.path}, "
+                f"{len(written)} new chunks"
+            )
+            return len(written)
+
+    def save(self, recording):
+        return self.write(self.snapshot(recording))
+
+    def save_in_background(self, recording):
+        """Snapshot the recording and write it in a background thread.
+
+        Returns False without saving if the previous save is still running.
+        An exception of the save is logged and raised by `wait`."""
+        if self._thread is not None and self._thread.is_alive():
+            return False
+        self._thread = threading.Thread(
+            target=self._write_in_background,
+            args=(self.snapshot(recording),),
+            daemon=True,
+        )
+        self._thread.start()
+        return True
+
+    def _write_in_background(self, snapshot):
+        try:
+            self.write(snapshot)
+        except Exception as error:
+            debug_logger.exception(f"autosave to {self.path} failed")
+            ana_logger.warning(f"Autosaving the session failed: {error}")
+            self._error = error
+
+    def wait(self):
+        """Block until the background save, if any, is finished and raise
+        the exception it failed with."""
+        if self._thread is not None:
+            self._thread.join()
+        error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    def _prune(self):
+        """Remove old manifests and the chunks no remaining manifest uses."""
+        sequences = self._sequences()
+        for sequence in sequences[: -KEEP_MANIFESTS - 1]:
+            os.remove(self._manifest_path(sequence))
+        used = set()
+        for sequence in sequences[-KEEP_MANIFESTS - 1 :]:
+            used.update(self._chunks_of(self._read_manifest(sequence)))
+        for chunk in glob.glob(os.path.join(self.chunk_dir, "*.npy")):
+            if os.path.basename(chunk)[:-4] not in used:
+                os.remove(chunk)
+
+    def _read_manifest(self, sequence):
+        with open(self._manifest_path(sequence)) as manifest_file:
+            return json.load(manifest_file)
+
+    @staticmethod
+    def _chunks_of(manifest):
+        for episodes in manifest["series"].values():
+            for attributes in episodes:
+                for value in attributes.values():
+                    if isinstance(value, dict):
+                        yield value["chunk"]
+
+    def _consistent_manifest(self):
+        for sequence in reversed(self._sequences()):
+            try:
+                manifest = self._read_manifest(sequence)
+            except (OSError, ValueError):
+                continue
+            if all(
+                os.path.exists(self._chunk_path(digest))
+                for digest in self._chunks_of(manifest)
+            ):
+                return manifest
+        return None
+
+    def restore(self):
+        """Return the recording in the latest consistent state of the journal
+        or None if there is none."""
+        manifest = self._consistent_manifest()
+        if manifest is None:
+            return None
+        attributes = manifest["attributes"]
+        recording = Recording(attributes["filename"], attributes["sampling_rate"])
+        recording.current_datakey = attributes["current_datakey"]
+        recording.current_ep_ind = attributes["current_ep_ind"]
+        recording.lists = {
+            name: (indices, key) for name, (indices, key) in manifest["lists"].items()
+        }
+        arrays = dict()
+        for datakey, episodes in manifest["series"].items():
+            series = []
+            for encoded in episodes:
+                episode = Episode.__new__(Episode)
+                for name, value in encoded.items():
+                    if isinstance(value, dict):
+                        digest = value["chunk"]
+                        if digest not in arrays:
+                            arrays[digest] = np.load(self._chunk_path(digest))
+                            self._digests[id(arrays[digest])] = (
+                                weakref.ref(arrays[digest]),
+                                digest,
+                            )
+                        value = arrays[digest]
+                    setattr(episode, name, value)
+                series.append(episode)
+            recording[datakey] = series
+        debug_logger.debug(
+            f"restored state {manifest['sequence']} from {self.path}"
+        )
+        return recording
+
+    def discard(self):
+        """Delete the journal, e.g. after the session was closed normally."""
+        try:
+            self.wait()
+        except Exception:
+            # the failure was logged and the journal is deleted anyway
+            pass
+        shutil.rmtree(self.path, ignore_errors=True)
@@ -0,0 +1,201 @@
+"""Synthetic episodic single channel recordings.
+
+The channel is a continuous time Markov chain given by a matrix of
+transition rates. The dwell times of all episodes are drawn together, one
+transition of every episode at a time, and the states are then looked up at
+the sampling times of all episodes with a single search. During the piezo
+step the channel follows `rates`, before it rests in its initial state and
+after it follows `rates_after`, e.g. the rates without agonist."""
+
+import logging
+
+import numpy as np
+
+from .episode import Episode
+from .recording import Recording
+from .filtering import gaussian_filter
+
+debug_logger = logging.getLogger("ascam.debug")
+
+
+def _transition_probabilities(rates):
+    """Return the rates of leaving each state and the cumulative probabilities
+    of the state that is entered next."""
+    rates = np.array(rates, dtype=float)
+    np.fill_diagonal(rates, 0)
+    exit_rates = rates.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        jump = rates / exit_rates[:, None]
+    # absorbing states are never left
+    jump[exit_rates == 0] = 0
+    return exit_rates, np.cumsum(jump, axis=1)
+
+
+def simulate_dwells(rates, initial_states, t_start, t_stop, rng):
+    """Simulate the states of many channels between `t_start` and `t_stop`.
+
+    Args:
+        rates [2D array] - rates [1/s] of the transitions from the state of
+            the row to that of the column, the diagonal is ignored
+        initial_states [1D int array] - the state of each channel at t_start
+        rng - a numpy random Generator
+    Returns:
+        times [2D array] - the times at which the channels enter a state, one
+            row per channel padded with inf
+        states [2D array] - the state entered at these times"""
+    exit_rates, cumulative = _transition_probabilities(rates)
+    n_channels = len(initial_states)
+    state = np.asarray(initial_states, dtype=int).copy()
+    now = np.full(n_channels, float(t_start))
+    times, states = [now.copy()], [state.copy()]
+    running = np.ones(n_channels, dtype=bool)
+    while running.any():
+        with np.errstate(divide="ignore"):
+            dwell = rng.exponential(size=n_channels) / exit_rates[state]
+        now = np.where(running, now + dwell, np.inf)
+        running &= now < t_stop
+        draws = rng.random(n_channels)[:, None]
+        new_state = (draws >= cumulative[state]).sum(axis=1)
+        state = np.where(running, np.minimum(new_state, len(exit_rates) - 1), state)
+        times.append(np.where(running, now, np.inf))
+        states.append(state.copy())
+    return np.column_stack(times), np.column_stack(states)
+
+
+def _states_at(times, states, sample_times):
+    """Return the state of each channel at `sample_times`, shape (channels,
+    samples).
+
+    The times of all channels are offset so that they increase across rows
+    and the states of all channels are found with one `searchsorted`."""
+    n_channels, n_transitions = times.shape
+    span = max(sample_times[-1], np.nanmax(np.where(np.isinf(times), 0, times))) + 1
+    offsets = np.arange(n_channels)[:, None] * span
+    flat_times = np.where(np.isinf(times), span - 0.5, times) + offsets
+    index = np.searchsorted(
+        flat_times.ravel(), (sample_times + offsets).ravel(), side="right"
+    )
+    return states.ravel()[index - 1].reshape(n_channels, len(sample_times))
+
+
+def colored_noise(shape, std, exponent, rng):
+    """Noise with a power spectrum proportional to 1/f**exponent along the
+    last axis, 0 gives white noise, scaled to standard deviation `std`."""
+    noise = rng.standard_normal(shape)
+    if exponent:
+        spectrum = np.fft.rfft(noise, axis=-1)
+        frequencies = np.fft.rfftfreq(shape[-1])
+        frequencies[0] = frequencies[1]
+        spectrum *= frequencies ** (-exponent / 2)
+        noise = np.fft.irfft(spectrum, n=shape[-1], axis=-1)
+        noise /= noise.std(axis=-1, keepdims=True)
+    return noise * std
+
+
+def simulate_recording(
+    rates,
+    amplitudes,
+    n_episodes=100,
+    duration=0.1,
+    sampling_rate=4e4,
+    initial_state=0,
+    piezo_step=None,
+    rates_after=None,
+    piezo_voltage=5.0,
+    command_voltage=-0.06,
+    noise_std=0.3e-12,
+    noise_exponent=0,
+    filter_freq=None,
+    seed=None,
+    filename="simulated",
+    return_states=False,
+):
+    """Simulate an episodic single channel recording.
+
+    Args:
+        rates [2D array] - transition rates [1/s] between the states
+        amplitudes [1D array] - the current [A] of each state
+        n_episodes - the number of episodes
+        duration - the length of an episode [s]
+        sampling_rate - the sampling rate [Hz]
+        initial_state - the state of the channel at the start of an episode
+            or at the start of the piezo step
+        piezo_step - (start, stop) of the piezo step [s], the channel only
+            leaves `initial_state` during and after it, without a step it
+            follows `rates` for the whole episode
+        rates_after - the rates after the step, `rates` if None
+        piezo_voltage - the piezo voltage [V] during the step
+        command_voltage - the constant command voltage [V], None for none
+        noise_std - standard deviation of the noise [A]
+        noise_exponent - 0 for white noise, 1 for 1/f noise, etc.
+        filter_freq - cutoff [Hz] of a gaussian filter applied to the
+            noisy current, no filtering if None
+        seed - seed of the random number generator
+        filename - the file name of the recording
+        return_states - if true also return the states of the channel
+    Returns:
+        recording - the recording with the episodes in the series 'raw_'
+        states [2D int array] - the state at each sample of each episode,
+            only if `return_states` is true"""
+    rng = np.random.default_rng(seed)
+    amplitudes = np.asarray(amplitudes, dtype=float)
+    time = np.arange(int(round(duration * sampling_rate))) / sampling_rate
+    initial = np.full(n_episodes, initial_state, dtype=int)
+
+    if piezo_step is None:
+        times, states = simulate_dwells(rates, initial, 0, duration, rng)
+    else:
+        start, stop = piezo_step
+        times, states = simulate_dwells(rates, initial, start, stop, rng)
+        # the chain is memoryless so it continues from its state at the end
+        # of the step with the new rates
+        at_stop = _states_at(times, states, np.array([stop]))[:, 0]
+        after_times, after_states = simulate_dwells(
+            rates if rates_after is None else rates_after, at_stop, stop, duration, rng
+        )
+        times = np.column_stack(
+            (np.zeros(n_episodes), np.where(times < stop, times, np.inf), after_times)
+        )
+        states = np.column_stack((initial, states, after_states))
+        # move the padding to the end so that the times of each channel
+        # increase
+        order = np.argsort(times, axis=1, kind="stable")
+        times = np.take_along_axis(times, order, axis=1)
+        states = np.take_along_axis(states, order, axis=1)
+    sample_states = _states_at(times, states, time)
+    debug_logger.debug(
+        f"simulated {n_episodes} episodes with {np.isfinite(times).sum()} dwells"
+    )
+
+    traces = amplitudes[sample_states]
+    if noise_std:
+        traces += colored_noise(traces.shape, noise_std, noise_exponent, rng)
+
+    piezo = None
+    if piezo_step is not None:
+        during_step = (time >= piezo_step[0]) & (time < piezo_step[1])
+        piezo = np.where(during_step, piezo_voltage, 0.0)
+    command = None
+    if command_voltage is not None:
+        command = np.full(time.size, float(command_voltage))
+
+    recording = Recording(filename, sampling_rate)
+    series = []
+    for i, trace in enumerate(traces):
+        if filter_freq is not None:
+            trace = gaussian_filter(trace, filter_freq, sampling_rate)
+        series.append(
+            Episode(
+                time,
+                trace,
+                n_episode=i,
+                piezo=piezo,
+                command=command,
+                sampling_rate=sampling_rate,
+            )
+        )
+    recording["raw_"] = series
+    recording.lists = {"All": (list(range(n_episodes)), None)}
+    if return_states:
+        return recording, sample_states
+    return recording
@@ -17,9 +17,11 @@ from PySide2.QtWidgets import (
     QTabBar,
     QPushButton,
     QLabel,
+    QComboBox,
 )
 
 from .io_widgets import ExportIdealizationDialog
+from .workers import run_task, start_worker, Worker
 from ..utils import string_to_array, array_to_string, update_number_in_string
 from ..constants import TIME_UNIT_FACTORS, CURRENT_UNIT_FACTORS
 from ..core import IdealizationCache
@@ -27,6 +29,10 @@ from ..utils.widgets import TextEdit, HistogramViewBox, EntryWidget, TableFrame
 
 debug_logger = logging.getLogger("ascam.debug")
 
+# time after the last change of a dragged line until the visible episode is
+# idealized again
+DRAG_DEBOUNCE_MS = 15
+
 
 class IdealizationFrame(QWidget):
     def __init__(self, main):
@@ -39,6 +45,15 @@ class IdealizationFrame(QWidget):
 
         self.main.plot_frame.tc_tracking = False
 
+        # while lines are dragged the visible episode is re-idealized after a
+        # short pause and the rest of the series is refreshed afterwards in a
+        # background worker, which is cancelled when the lines move again
+        self.drag_timer = QtCore.QTimer(self)
+        self.drag_timer.setSingleShot(True)
+        self.drag_timer.setInterval(DRAG_DEBOUNCE_MS)
+        self.drag_timer.timeout.connect(self.refresh_idealization)
+        self.series_worker = None
+
         self.create_widgets()
 
         self.main.ep_frame.ep_list.currentItemChanged.connect(self.on_episode_click)
@@ -86,6 +101,8 @@ class IdealizationFrame(QWidget):
             self.close_frame()
 
     def close_frame(self):
+        self.drag_timer.stop()
+        self.stop_series_refresh()
         self.main.ep_frame.ep_list.currentItemChanged.disconnect(self.on_episode_click)
         self.main.plot_frame.tc_tracking = False
         self.main.tc_frame = None
@@ -100,18 +117,30 @@ class IdealizationFrame(QWidget):
 
     def export_events(self):
         self.get_params()
-        self.current_tab.idealization_cache.get_events()
+        self.idealize_series(on_result=self.save_events)
+
+    def save_events(self, *args):
         filename = QFileDialog.getSaveFileName(
             self, dir=self.main.filename[:-4] + "_events.csv", filter="*.csv"
         )[0]
-        self.current_tab.idealization_cache.export_events(
-            filename, self.current_tab.time_unit, self.current_tab.trace_unit
+        if not filename:
+            return
+        run_task(
+            self.main,
+            "Exporting events",
+            self.current_tab.idealization_cache.export_events,
+            filename,
+            self.current_tab.time_unit,
+            self.current_tab.trace_unit,
         )
 
     def export_idealization(self):
         self.get_params()
-        self.idealize_series()
-        ExportIdealizationDialog(self.main, self.current_tab.idealization_cache)
+        self.idealize_series(
+            on_result=lambda *args: ExportIdealizationDialog(
+                self.main, self.current_tab.idealization_cache
+            )
+        )
         # filename = QFileDialog.getSaveFileName(
         #     self, dir=self.main.filename[:-4] + "_idealization.csv", filter="*.csv"
         # )[0]
@@ -140,8 +169,13 @@ class IdealizationFrame(QWidget):
     def idealize_episode(self):
         self.current_tab.idealization_cache.idealize_episode()
 
-    def idealize_series(self):
-        self.current_tab.idealization_cache.idealize_series()
+    def idealize_series(self, on_result=None):
+        run_task(
+            self.main,
+            "Idealizing series",
+            self.current_tab.idealization_cache.idealize_series,
+            on_result=on_result,
+        )
 
     def track_cursor(self, y_pos):
         """Track the position of the mouse cursor over the plot and if mouse 1
@@ -172,7 +206,31 @@ class IdealizationFrame(QWidget):
                 y_pos, self.current_tab.amp_entry.toPlainText()
             )
             self.current_tab.amp_entry.setPlainText(new_str)
+        self.stop_series_refresh()
+        self.main.plot_frame.prefetcher.cancel()
+        self.main.plot_frame.plot_tc_params()
+        self.drag_timer.start()
+
+    def refresh_idealization(self):
+        """Idealize and redraw the visible episode with the current parameters
+        and then refresh the rest of the series in the background."""
         self.calculate_click()
+        self.stop_series_refresh()
+        # episodes close to the visible one are refreshed first
+        self.series_worker = start_worker(
+            Worker(
+                self.current_tab.idealization_cache.idealize_series,
+                report_progress=True,
+                around=self.main.data.current_ep_ind,
+            )
+        )
+
+    def stop_series_refresh(self):
+        # the worker stops at its next progress report, an episode it is
+        # still idealizing is discarded because the parameters changed
+        if self.series_worker is not None:
+            self.series_worker.cancel()
+            self.series_worker = None
 
 
 class IdealizationTabFrame(QTabWidget):
@@ -271,7 +329,13 @@ class IdealizationTab(EntryWidget):
         self.add_row(intrp_label, self.interpolate)
 
         self.intrp_entry = QLineEdit(self)
-        self.add_row(self.intrp_entry)
+        self.intrp_method_entry = QComboBox()
+        self.intrp_method_entry.addItems(["Spline", "Polyphase"])
+        self.intrp_method_entry.setToolTip(
+            "Spline: cubic spline interpolation\n"
+            "Polyphase: faster resampling with a polyphase FIR filter"
+        )
+        self.add_row(self.intrp_entry, self.intrp_method_entry)
 
     def toggle_drag_params(self, checked):
         self.parent.parent.main.plot_frame.tc_tracking = checked
@@ -279,8 +343,10 @@ class IdealizationTab(EntryWidget):
     def toggle_interpolation(self, state):
         if not state:
             self.intrp_entry.setEnabled(False)
+            self.intrp_method_entry.setEnabled(False)
         else:
             self.intrp_entry.setEnabled(True)
+            self.intrp_method_entry.setEnabled(True)
 
     def toggle_resolution(self, state):
         if not state:
@@ -329,32 +395,48 @@ class IdealizationTab(EntryWidget):
             intrp_factor = int(intrp_string)
         else:
             intrp_factor = 1
+        intrp_method = self.intrp_method_entry.currentText().lower()
+
+        restored_cache = self.parent.parent.main.data.idealization_cache
+        if self.idealization_cache is None and restored_cache is not None:
+            # continue with the idealization loaded from a snapshot, it is
+            # only recomputed if the parameters differ
+            self.idealization_cache = restored_cache
+            self.parent.parent.main.data.idealization_cache = None
 
-        if self.check_params_changed(amps, thresholds, resolution, intrp_factor):
+        if self.check_params_changed(
+            amps, thresholds, resolution, intrp_factor, intrp_method
+        ):
             debug_logger.debug(
                 f"creating new idealization cache for\n"
                 f"amp = {amps} \n"
                 f"thresholds = {thresholds}\n"
                 f"resolution = {res_string}\n"
-                f"interpolation = {intrp_string}"
-            )
-            try:
-                self.idealization_cache.clear_idealization()
-            except AttributeError as e:
-                if "'IdealizationTab' object has no attribute 'idealization_cache'" in str(
-                    e
-                ) or "object has no attribute " in str(
-                    e
-                ):
-                    pass
-                else:
-                    raise AttributeError(e)
-            self.idealization_cache = IdealizationCache(
-                self.parent.parent.main.data, amps, thresholds, resolution, intrp_factor
+                f"interpolation = {intrp_string} ({intrp_method})"
             )
+            if (
+                self.idealization_cache is not None
+                and self.idealization_cache.data is self.parent.parent.main.data
+            ):
+                # update the cache in place to keep what does not depend on
+                # the changed parameters
+                self.idealization_cache.set_params(
+                    amps, thresholds, resolution, intrp_factor, intrp_method
+                )
+            else:
+                if self.idealization_cache is not None:
+                    self.idealization_cache.clear_idealization()
+                self.idealization_cache = IdealizationCache(
+                    self.parent.parent.main.data,
+                    amps,
+                    thresholds,
+                    resolution,
+                    intrp_factor,
+                    intrp_method,
+                )
         return amps, thresholds, resolution, intrp_factor
 
-    def check_params_changed(self, amp, theta, res, intrp):
+    def check_params_changed(self, amp, theta, res, intrp, intrp_method="spline"):
         changed = True
         try:
             if set(amp) != set(self.idealization_cache.amplitudes):
@@ -365,6 +447,8 @@ class IdealizationTab(EntryWidget):
                 debug_logger.debug("resolution has changed")
             elif intrp != self.idealization_cache.interpolation_factor:
                 debug_logger.debug("interpolation factor has changed")
+            elif intrp_method != self.idealization_cache.interpolation_method:
+                debug_logger.debug("interpolation method has changed")
             else:
                 changed = False
         except AttributeError:
@@ -409,6 +493,13 @@ class IdealizationTab(EntryWidget):
             title=f"Amp={params[0]}; Thresh={params[1]}; Res={params[2]}; Intrp={params[3]}",
             trace_unit=self.trace_unit,
             time_unit=self.time_unit,
+            column_units=[
+                "int",
+                self.trace_unit,
+                self.time_unit,
+                self.time_unit,
+                self.time_unit,
+            ],
         )
 
 
@@ -437,29 +528,22 @@ class HistogramFrame(QDialog):
                 f"argument n_bins is being ignoroed because it is incorrect n_bins={n_bins}"
             )
         n_cols = np.round(np.sqrt(len(self.amps)))
+        hists = self.parent.idealization_cache.dwell_time_hists(
+            self.amps, n_bins, time_unit, log_times, root_counts
+        )
         self.histograms = []
         i = j = 0
         for amp in self.amps:
             debug_logger.debug(f"getting hist for {amp}")
-            if n_bins is None:
-                histogram = Histogram(
-                    histogram_frame=self,
-                    idealization_cache=self.parent.idealization_cache,
-                    amp=amp,
-                    log_times=log_times,
-                    root_counts=root_counts,
-                    time_unit=time_unit,
-                )
-            else:
-                histogram = Histogram(
-                    histogram_frame=self,
-                    idealization_cache=self.parent.idealization_cache,
-                    n_bins=n_bins[amp],
-                    amp=amp,
-                    log_times=log_times,
-                    root_counts=root_counts,
-                    time_unit=time_unit,
-                )
+            histogram = Histogram(
+                histogram_frame=self,
+                idealization_cache=self.parent.idealization_cache,
+                amp=amp,
+                log_times=log_times,
+                root_counts=root_counts,
+                time_unit=time_unit,
+                hist=hists[amp],
+            )
             self.histograms.append(histogram)
             self.layout.addWidget(histogram.widget, i, j)
             histogram.row = i
@@ -481,6 +565,7 @@ class Histogram:
         log_times=True,
         root_counts=True,
         trace_unit="pA",
+        hist=None,
     ):
         self.histogram_frame = histogram_frame
         self.idealization_cache = idealization_cache
@@ -491,14 +576,18 @@ class Histogram:
         self.root_counts = root_counts
         self.trace_unit = trace_unit
 
-        self.widget = self.create_widget()
+        self.widget = self.create_widget(hist)
         self.row = None
         self.col = None
 
-    def create_widget(self):
-        heights, bins = self.idealization_cache.dwell_time_hist(
-            self.amp, self.n_bins, self.time_unit, self.log_times, self.root_counts
-        )
+    def create_widget(self, hist=None):
+        """Create the plot of `hist`, the (heights, bins) of the histogram,
+        which is computed here if it is None."""
+        if hist is None:
+            hist = self.idealization_cache.dwell_time_hist(
+                self.amp, self.n_bins, self.time_unit, self.log_times, self.root_counts
+            )
+        heights, bins = hist
         self.n_bins = len(bins) - 1
         hist_viewbox = HistogramViewBox(
             histogram=self,
@@ -3,7 +3,7 @@ import logging
 from PySide2 import QtCore
 from PySide2.QtWidgets import (
     QWidget,
-    QListWidget,
+    QListView,
     QVBoxLayout,
     QSizePolicy,
     QCheckBox,
@@ -51,6 +51,7 @@ class EpisodeFrame(QWidget):
     def switch_series(self, index):
         debug_logger.debug(f"switching series to index {index}")
         self.main.data.current_datakey = index
+        self.ep_list.refresh()
         try:
             self.main.tc_frame.get_params()
             self.main.tc_frame.idealize_episode()
@@ -88,8 +89,7 @@ class EpisodeFrame(QWidget):
             for l in self.list_frame.lists:
                 if f"[{key}]" in l.text():
                     name = l.text().split()[0]
-                    for item in self.ep_list.selectedItems():
-                        index = self.ep_list.row(item)
+                    for index in self.ep_list.selected_rows():
                         self.list_frame.add_to_list(name, key, index)
 
 
@@ -123,43 +123,15 @@ class ListFrame(QWidget):
         )
 
     def add_to_list(self, name, key, index):
-        if index not in self.parent.main.data.lists[name][0]:
-            self.parent.main.data.lists[name][0].append(index)
-            assigned_keys = [
-                x[1]
-                for x in self.parent.main.data.lists.values()
-                if index in x[0] and x[1] is not None
-            ]
-            n = f"Episode {self.parent.main.data.series[index].n_episode} "
-            assigned_keys.sort()
-            s = ""
-            for k in assigned_keys:
-                if k is not None:
-                    s += f"[{k}]"
-            n += s.rjust(20 - len(n), " ")
-            self.parent.ep_list.item(index).setText(n)
-            ana_logger.debug(
-                f"added episode {self.parent.main.data.series[index].n_episode} to list {name}"
-            )
+        episode_list = self.parent.main.data.lists[name][0]
+        n_episode = self.parent.main.data.series[index].n_episode
+        if index not in episode_list:
+            episode_list.append(index)
+            ana_logger.debug(f"added episode {n_episode} to list {name}")
         else:
-            self.parent.main.data.lists[name][0].remove(index)
-            n = self.parent.ep_list.item(index).text()
-            assigned_keys = [
-                x[1]
-                for x in self.parent.main.data.lists.values()
-                if index in x[0] and x[1] is not None
-            ]
-            assigned_keys.sort()
-            n = f"Episode {self.parent.main.data.series[index].n_episode} "
-            s = ""
-            for k in assigned_keys:
-                if k is not None:
-                    s += f"[{k}]"
-            n += s.rjust(20 - len(n), " ")
-            self.parent.ep_list.item(index).setText(n)
-            ana_logger.debug(
-                f"removed episode {self.parent.main.data.series[index].n_episode} from list {name}"
-            )
+            episode_list.remove(index)
+            ana_logger.debug(f"removed episode {n_episode} from list {name}")
+        self.parent.ep_list.model().update_markers(index)
 
     def create_dialog(self):
         self.dialog = QDialog()
@@ -195,39 +167,127 @@ class ListFrame(QWidget):
             super().keyPressEvent(event)
 
 
-class EpisodeList(QListWidget):
+class EpisodeListModel(QtCore.QAbstractListModel):
+    """Model of the episodes in the current series.
+
+    The rows are the indices of the episodes in the series, their text is
+    only created when a row is shown. The keys of the lists an episode
+    belongs to are kept in `markers`, which maps row to the sorted keys."""
+
+    def __init__(self, main, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.main = main
+        self.markers = dict()
+        self._n_rows = 0
+        self.update_markers()
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid() or self.main.data is None:
+            return 0
+        return len(self.main.data.series)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid() or role != QtCore.Qt.DisplayRole:
+            return None
+        text = f"Episode {self.episode_number(index.row())} "
+        keys = "".join(f"[{k}]" for k in self.markers.get(index.row(), []))
+        return text + keys.rjust(20 - len(text), " ")
+
+    def episode_number(self, row):
+        return self.main.data.series[row].n_episode
+
+    def update_markers(self, row=None):
+        """Recompute the list keys shown next to the episode in `row`, or of
+        all rows if `row` is None."""
+        if self.main.data is None:
+            self.markers = dict()
+            return
+        lists = [
+            (indices, key)
+            for indices, key in self.main.data.lists.values()
+            if key is not None and key != ""
+        ]
+        if row is None:
+            self.markers = dict()
+            for indices, key in lists:
+                for i in indices:
+                    self.markers.setdefault(i, []).append(key)
+            for keys in self.markers.values():
+                keys.sort()
+            return
+        self.markers[row] = sorted(key for indices, key in lists if row in indices)
+        index = self.index(row)
+        self.dataChanged.emit(index, index)
+
+    def refresh(self):
+        """Show the current series, the model is only reset if the number of
+        episodes changed."""
+        self.update_markers()
+        n_rows = self.rowCount()
+        if n_rows == self._n_rows:
+            if n_rows:
+                self.dataChanged.emit(self.index(0), self.index(n_rows - 1))
+        else:
+            self.reset()
+
+    def reset(self):
+        self.beginResetModel()
+        self.update_markers()
+        self._n_rows = self.rowCount()
+        self.endResetModel()
+
+
+class EpisodeList(QListView):
     """Widget holding the scrollable list of episodes and the episode list
-    selection"""
+    selection
+
+    The list is a view of an `EpisodeListModel`, so only the visible rows
+    are drawn however long the series is. `currentItemChanged` is emitted
+    with the model indices of the new and previous episode after the
+    current episode of the recording has been updated."""
 
     keyPressed = QtCore.Signal(str)
+    currentItemChanged = QtCore.Signal(object, object)
 
     def __init__(self, parent, *args, **kwargs):
         super(EpisodeList, self).__init__(*args, **kwargs)
         self.parent = parent
         self.setSelectionMode(QAbstractItemView.ExtendedSelection)
         self.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Expanding)
-        self.currentItemChanged.connect(
-            self.on_item_click, type=QtCore.Qt.DirectConnection
-        )
+        self.setUniformItemSizes(True)
+        self.setModel(EpisodeListModel(parent.main, self))
+        self.selectionModel().currentChanged.connect(self.on_item_click)
+        self.update_current = True
         self.populate()
 
-    def on_item_click(self, item, _):
+    def on_item_click(self, current, previous):
+        if not current.isValid():
+            return
         debug_logger.debug(f"clicked new episode")
-        ep_number = int(item.text().split()[1])
-        self.parent.main.data.current_ep_ind = ep_number
+        if self.update_current:
+            ep_number = self.model().episode_number(current.row())
+            self.parent.main.data.current_ep_ind = ep_number
+        self.currentItemChanged.emit(current, previous)
 
     def populate(self):
-        self.currentItemChanged.disconnect(self.on_item_click)
-        self.clear()
-        if self.parent.main.data is not None:
-            debug_logger.debug("inserting data")
-            self.addItems(
-                [f"Episode {e.n_episode}" for e in self.parent.main.data.series]
-            )
+        # the current episode of a newly loaded recording is kept when the
+        # first row is selected
+        self.update_current = False
+        self.model().reset()
         self.setCurrentRow(0)
-        self.currentItemChanged.connect(
-            self.on_item_click, type=QtCore.Qt.DirectConnection
-        )
+        self.update_current = True
+
+    def refresh(self):
+        self.model().refresh()
+
+    def setCurrentRow(self, row):
+        self.setCurrentIndex(self.model().index(row))
+
+    def currentRow(self):
+        return self.currentIndex().row()
+
+    def selected_rows(self):
+        return sorted(index.row() for index in self.selectionModel().selectedIndexes())
 
     def keyPressEvent(self, event):
         if event.text().isalpha():
@@ -131,7 +131,7 @@ class FirstActivationFrame(EntryWidget):
         self.table_frame = TableFrame(
             self,
             data=self.main.data.create_first_activation_table(
-                trace_unit=self.trace_unit
+                time_unit=self.time_unit, trace_unit=self.trace_unit
             ),
             header=[
                 "Episode Number",
@@ -142,6 +142,7 @@ class FirstActivationFrame(EntryWidget):
             time_unit=self.time_unit,
             title=f"First activations in {self.main.data.current_datakey}",
             width=400,
+            column_units=["int", self.time_unit, self.trace_unit],
         )
 
     def show_first_event_table(self):
@@ -151,9 +152,10 @@ class FirstActivationFrame(EntryWidget):
                 time_unit=self.time_unit,
             )
         header = ["Episode Number", "First state"]
-        for i in range(int(len(table_data)/2)):
+        for i in range((table_data.shape[1] - 2) // 2):
             header.append(f"S{i}-start [{self.time_unit}]")
             header.append(f"S{i}-duration [{self.time_unit}]")
+        column_units = ["int", "int"] + [self.time_unit] * (len(header) - 2)
         self.fe_table_frame = TableFrame(
             self,
             data=table_data,
@@ -161,6 +163,7 @@ class FirstActivationFrame(EntryWidget):
             time_unit=self.time_unit,
             title=f"First events of each state",
             width=1000,
+            column_units=column_units,
         )
 
     def on_episode_click(self, item, *args):
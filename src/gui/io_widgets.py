@@ -12,6 +12,7 @@ from PySide2.QtWidgets import (
 )
 
 
+from .workers import run_task
 from ..core import Recording
 from ..utils.widgets import EntryWidget
 
@@ -87,7 +88,10 @@ class ExportFAWidget(BaseExportWidget):
             filter="Comma Separated Valued (*.csv)",
         )
         if filename:
-            self.main.data.export_first_activation(
+            run_task(
+                self.main,
+                "Exporting first activation",
+                self.main.data.export_first_activation,
                 filepath=filename,
                 datakey=self.series_selection.currentText(),
                 lists_to_save=[
@@ -137,7 +141,10 @@ class ExportFEWidget(BaseExportWidget):
             filter="Comma Separated Valued (*.csv)",
         )
         if filename:
-            self.main.data.export_first_events(
+            run_task(
+                self.main,
+                "Exporting first events",
+                self.main.data.export_first_events,
                 filepath=filename,
                 datakey=self.series_selection.currentText(),
                 lists_to_save=[
@@ -211,19 +218,18 @@ class OpenFileEntryWidget(EntryWidget):
         self.add_row(ok_button, cancel_button)
 
     def ok_clicked(self):
-        self.main.data = Recording.from_file(
+        run_task(
+            self.main,
+            f"Loading {self.main.filename}",
+            Recording.from_file,
             filename=self.main.filename,
             sampling_rate=self.sampling_entry.text(),
             time_input_unit=self.time_unit,
             trace_input_unit=self.trace_unit,
             piezo_input_unit=self.piezo_unit,
             command_input_unit=self.command_unit,
+            on_result=self.main.show_recording,
         )
-        self.main.ep_frame.ep_list.populate()
-        self.main.ep_frame.update_combo_box()
-        self.main.ep_frame.setFocus()
-        self.main.plot_frame.plot_all()
-        self.main.setWindowTitle(f"cuteSCAM {self.main.filename}")
         self.dialog.close()
         self.close()
 
@@ -250,6 +256,8 @@ class ExportWidget(BaseExportWidget):
         self.save_piezo = QCheckBox("Export Piezo Data")
         self.save_command = QCheckBox("Export Command Voltage")
         self.add_row(self.save_piezo, self.save_command)
+        self.compress = QCheckBox("Compress (Matlab only)")
+        self.add_row(self.compress)
 
         self.add_row(QLabel("Lists to export:"))
         self.add_row(self.list_selection)
@@ -275,8 +283,13 @@ class ExportWidget(BaseExportWidget):
             filter="Axograph (*.axgd);; Matlab (*.mat)",
         )
         if filename:
+            # exports of large series take a while, write them in the
+            # background so the GUI stays responsive
             if "Matlab" in filetype:
-                self.main.data.export_matlab(
+                run_task(
+                    self.main,
+                    "Exporting to Matlab",
+                    self.main.data.export_matlab,
                     filepath=filename,
                     datakey=self.series_selection.currentText(),
                     lists_to_save=[
@@ -288,9 +301,13 @@ class ExportWidget(BaseExportWidget):
                     trace_unit=self.trace_unit,
                     piezo_unit=self.piezo_unit,
                     command_unit=self.command_unit,
+                    do_compression=self.compress.isChecked(),
                 )
             elif "Axograph" in filetype:
-                self.main.data.export_axo(
+                run_task(
+                    self.main,
+                    "Exporting to Axograph",
+                    self.main.data.export_axo,
                     filepath=filename,
                     datakey=self.series_selection.currentText(),
                     lists_to_save=[
@@ -334,18 +351,26 @@ class ExportIdealizationWidget(BaseExportWidget):
         self.add_row(save_button, cancel_button)
 
     def save_click(self):
-        filename, filetye = QFileDialog.getSaveFileName(
-            self, dir=self.main.filename[:-4], filter="CSV (*.csv)"
-        )
-        self.main.data.export_idealization(
-            filename,
-            time_unit=self.time_unit,
-            trace_unit=self.trace_unit,
-            lists_to_save=[item.text() for item in self.list_selection.selectedItems()],
-            amplitudes=self.id_cache.amplitudes,
-            thresholds=self.id_cache.thresholds,
-            resolution=self.id_cache.resolution,
-            interpolation_factor=self.id_cache.interpolation_factor,
+        filename, filetype = QFileDialog.getSaveFileName(
+            self,
+            dir=self.main.filename[:-4],
+            filter="CSV (*.csv);; Compressed events (*.npz)",
         )
-
+        if filename:
+            run_task(
+                self.main,
+                "Exporting idealization",
+                self.main.data.export_idealization,
+                filename,
+                time_unit=self.time_unit,
+                trace_unit=self.trace_unit,
+                lists_to_save=[
+                    item.text() for item in self.list_selection.selectedItems()
+                ],
+                amplitudes=self.id_cache.amplitudes,
+                thresholds=self.id_cache.thresholds,
+                resolution=self.id_cache.resolution,
+                interpolation_factor=self.id_cache.interpolation_factor,
+                filetype="npz" if "npz" in filetype else "csv",
+            )
         self.dialog.close()
@@ -1,8 +1,10 @@
 import logging
 import os
 
+from PySide2.QtCore import QTimer
 from PySide2.QtWidgets import (
     QGridLayout,
+    QMessageBox,
     QWidget,
     QMainWindow,
     QFileDialog,
@@ -10,6 +12,8 @@ from PySide2.QtWidgets import (
     QSizePolicy,
 )
 
+from .watch_dialog import WatchFolderDialog
+from .performance_panel import PerformancePanel
 from ..gui import (
     ExportDialog,
     OpenFileDialog,
@@ -21,13 +25,16 @@ from ..gui import (
     FirstActivationFrame,
 )
 from ..utils import parse_filename, clear_qt_layout
-from ..core import Recording
+from ..core import Recording, SessionJournal
 from ..constants import TEST_FILE_NAME
 
 
 ana_logger = logging.getLogger("ascam.analysis")
 debug_logger = logging.getLogger("ascam.debug")
 
+# interval between the autosaves of the session
+AUTOSAVE_INTERVAL_MS = 120000
+
 
 class MainWindow(QMainWindow):
     def __init__(self, screen_resolution, *args, **kwargs):
@@ -47,9 +54,16 @@ class MainWindow(QMainWindow):
 
         self.fa_frame = None
         self.tc_frame = None
+        self.performance_panel = None
 
         self.data = Recording()
 
+        # the journal the session is autosaved to, see `start_autosave`
+        self.journal = None
+        self.autosave_timer = QTimer(self)
+        self.autosave_timer.setInterval(AUTOSAVE_INTERVAL_MS)
+        self.autosave_timer.timeout.connect(self.autosave)
+
         self.create_menu()
 
         self.create_widgets()
@@ -59,7 +73,9 @@ class MainWindow(QMainWindow):
         self.file_menu = self.menuBar().addMenu("File")
         self.file_menu.addAction("Open File", self.open_file)
         self.file_menu.addAction("Save Session", self.save_to_file)
+        self.file_menu.addAction("Save Snapshot", self.save_snapshot)
         self.file_menu.addAction("Export Data", lambda: ExportDialog(self))
+        self.file_menu.addAction("Watch Folder", self.watch_folder)
         self.file_menu.addSeparator()
         self.file_menu.addAction("Quit", self.close)
 
@@ -81,9 +97,14 @@ class MainWindow(QMainWindow):
         )
         self.plot_menu.addAction(self.show_command)
 
+        self.tools_menu = self.menuBar().addMenu("Tools")
+        self.tools_menu.addAction("Performance", self.show_performance_panel)
+
         # self.histogram_menu = self.menuBar().addMenu("Histogram")
 
     def create_widgets(self):
+        if getattr(self, "plot_frame", None) is not None:
+            self.plot_frame.prefetcher.stop()
         self.ep_frame = EpisodeFrame(self)
         self.central_layout.addWidget(self.ep_frame, 1, 3)
 
@@ -110,6 +131,96 @@ class MainWindow(QMainWindow):
         else:
             debug_logger.debug("Not saving to pickle - no filename given.")
 
+    def save_snapshot(self):
+        filename = QFileDialog.getSaveFileName(
+            self, dir=os.path.splitext(self.filename)[0] + ".ascam", filter="*.ascam"
+        )[0]
+        if filename.strip():
+            idealization_cache = None
+            if self.tc_frame is not None:
+                idealization_cache = self.tc_frame.current_tab.idealization_cache
+            self.data.save_snapshot(filename, idealization_cache)
+        else:
+            debug_logger.debug("Not saving snapshot - no filename given.")
+
+    def show_performance_panel(self):
+        # keep a reference, the panel is not modal, and only keep one open
+        if self.performance_panel is not None and self.performance_panel.isVisible():
+            self.performance_panel.raise_()
+            return
+        self.performance_panel = PerformancePanel(self)
+
+    def watch_folder(self):
+        # keep a reference, the dialog is not modal
+        self.watch_dialog = WatchFolderDialog(self)
+
+    def start_autosave(self, journal_path=None):
+        """Autosave the session periodically to a journal, by default the
+        one belonging to the loaded file."""
+        if journal_path is None:
+            journal_path = SessionJournal.default_path(self.data.filename)
+        if self.journal is not None and self.journal.path != journal_path:
+            self.journal.discard()
+        self.journal = SessionJournal(journal_path)
+        self.autosave()
+        self.autosave_timer.start()
+
+    def autosave(self):
+        if self.journal is not None:
+            self.journal.save_in_background(self.data)
+
+    def offer_restore(self):
+        """Ask to restore the latest autosaved session if ASCAM was not
+        closed normally."""
+        journals = SessionJournal.find_journals()
+        if not journals:
+            return
+        answer = QMessageBox.question(
+            self,
+            "Restore session",
+            "ASCAM was not closed normally, restore the autosaved session "
+            f"{os.path.basename(journals[0])}?",
+        )
+        if answer != QMessageBox.Yes:
+            SessionJournal.discard_all()
+            return
+        journal = SessionJournal(journals[0])
+        recording = journal.restore()
+        if recording is None:
+            debug_logger.warning(f"no consistent state in {journals[0]}")
+            return
+        self.filename = recording.filename
+        self.show_recording(recording, journals[0])
+
+    def show_recording(self, recording, journal_path=None):
+        """Make a loaded recording the current data and display it."""
+        self.data = recording
+        self.ep_frame.ep_list.populate()
+        self.ep_frame.update_combo_box()
+        self.ep_frame.setFocus()
+        self.plot_frame.plot_all()
+        self.setWindowTitle(f"cuteSCAM {self.filename}")
+        self.start_autosave(journal_path)
+
+    def add_series(self, result):
+        """Add the series returned by a processing step run in the background
+        and display it, the recording is only changed in the GUI thread."""
+        self.data.add_series(*result)
+        self.show_new_series()
+
+    def show_new_series(self, *args):
+        """Display the series created by a processing step."""
+        self.ep_frame.update_combo_box()
+        self.plot_frame.plot_all()
+
+    def closeEvent(self, event):
+        # the session ended normally so there is nothing to restore
+        self.autosave_timer.stop()
+        self.plot_frame.prefetcher.stop()
+        if self.journal is not None:
+            self.journal.discard()
+        super().closeEvent(event)
+
     def launch_idealization(self):
         self.close_fa_frame()
         self.tc_frame = IdealizationFrame(self)
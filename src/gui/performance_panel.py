@@ -0,0 +1,95 @@
+import logging
+
+from PySide2.QtCore import QObject, Signal
+from PySide2.QtWidgets import (
+    QDialog,
+    QCheckBox,
+    QPushButton,
+    QTableWidget,
+    QTableWidgetItem,
+    QHBoxLayout,
+    QVBoxLayout,
+    QHeaderView,
+)
+
+from ..utils import instrumentation
+
+debug_logger = logging.getLogger("ascam.debug")
+
+
+class MeasurementSignals(QObject):
+    """Operations also run in background threads, their measurements are
+    passed to the panel through a signal."""
+
+    measured = Signal(object)
+
+
+class PerformancePanel(QDialog):
+    """Table of the wall time, CPU time and peak memory of the most recent
+    operations."""
+
+    HEADER = ["Operation", "Wall [ms]", "CPU [ms]", "Peak [MB]"]
+
+    def __init__(self, main):
+        super().__init__()
+        self.main = main
+        self.setWindowTitle("Performance")
+        self.setModal(False)
+        self.layout = QVBoxLayout()
+        self.setLayout(self.layout)
+
+        self.table = QTableWidget(0, len(self.HEADER))
+        self.table.setHorizontalHeaderLabels(self.HEADER)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.layout.addWidget(self.table)
+
+        row = QHBoxLayout()
+        self.trace_memory = QCheckBox("Trace memory (slower)")
+        self.trace_memory.stateChanged.connect(self.toggle_memory_tracing)
+        row.addWidget(self.trace_memory)
+        clear_button = QPushButton("Clear")
+        clear_button.clicked.connect(self.clear)
+        row.addWidget(clear_button)
+        self.layout.addLayout(row)
+
+        for measurement in instrumentation.RECENT:
+            self.add_measurement(measurement)
+        self.signals = MeasurementSignals()
+        self.signals.measured.connect(self.add_measurement)
+        # each access of a bound method creates a new object, the listener
+        # is kept so that the same object is removed again
+        self._listener = self.signals.measured.emit
+        instrumentation.add_listener(self._listener)
+        self.resize(500, 400)
+        self.show()
+
+    def add_measurement(self, measurement):
+        row = self.table.rowCount()
+        self.table.insertRow(row)
+        peak = ""
+        if measurement.peak_bytes is not None:
+            peak = f"{measurement.peak_bytes / 2 ** 20:.2f}"
+        values = [
+            measurement.name,
+            f"{measurement.wall * 1e3:.1f}",
+            f"{measurement.cpu * 1e3:.1f}",
+            peak,
+        ]
+        for column, value in enumerate(values):
+            self.table.setItem(row, column, QTableWidgetItem(value))
+        self.table.scrollToBottom()
+
+    def toggle_memory_tracing(self, *args):
+        debug_logger.debug(f"memory tracing set to {self.trace_memory.isChecked()}")
+        instrumentation.set_memory_tracing(self.trace_memory.isChecked())
+
+    def clear(self):
+        instrumentation.RECENT.clear()
+        self.table.setRowCount(0)
+
+    def done(self, result):
+        # closing the window and Esc both end the dialog here, closeEvent is
+        # not called for Esc
+        instrumentation.remove_listener(self._listener)
+        instrumentation.set_memory_tracing(False)
+        super().done(result)
@@ -6,6 +6,8 @@ import numpy as np
 import pyqtgraph as pg
 
 from ..utils import clear_qt_layout
+from ..core.analysis import Idealizer
+from ..core.prefetch import EpisodePrefetcher
 
 GREEN = (70, 250, 150)
 ORANGE = (255, 153, 0)
@@ -37,19 +39,12 @@ class PlotFrame(QWidget):
         self.tc_tracking = False
         self.fa_tracking = False
 
+        self.trace_pyramid = None
+        # prepares the episodes next to the visible one while browsing
+        self.prefetcher = EpisodePrefetcher()
         self.init_plots()
         self.init_hist()
 
-        self.fa_line = None
-        self.fa_thresh_line = None
-        self.fa_thresh_hist_line = None
-        self.marking_indicator = None
-
-        self.amp_lines = []
-        self.amp_hist_lines = []
-        self.theta_lines = []
-        self.theta_hist_lines = []
-
         self.main.ep_frame.ep_list.currentItemChanged.connect(
             self.update_plots, type=QtCore.Qt.QueuedConnection
         )
@@ -72,6 +67,7 @@ class PlotFrame(QWidget):
 
     def init_plots(self):
         self.trace_viewbox = CustomHorizontalViewBox(self)
+        self.trace_viewbox.sigXRangeChanged.connect(self.update_trace_detail)
         self.trace_plot = pg.PlotWidget(viewBox=self.trace_viewbox, name=f"trace")
         self.trace_plot.setBackground("w")
         self.trace_plot.setLabel("left", "Current", units="A")
@@ -116,6 +112,22 @@ class PlotFrame(QWidget):
             if self.show_command:
                 self.command_plot.showGrid(x=True, y=True)
 
+        # the plot items are created once and their data is replaced when
+        # another episode is shown
+        pen = pg.mkPen(color="b")
+        self.trace_line = self.trace_plot.plot(pen=pen)
+        self.idealization_line = self.trace_plot.plot(pen=pg.mkPen(color=ORANGE))
+        self.piezo_line = self.piezo_plot.plot(pen=pen) if self.show_piezo else None
+        self.command_line = (
+            self.command_plot.plot(pen=pen) if self.show_command else None
+        )
+
+        self.fa_line = None
+        self.fa_thresh_line = None
+        self.marking_indicator = None
+        self.amp_lines = []
+        self.theta_lines = []
+
     def init_hist(self):
         self.hist_viewbox = CustomVerticalViewBox(self)
         self.hist = pg.PlotWidget(viewBox=self.hist_viewbox)
@@ -128,6 +140,10 @@ class PlotFrame(QWidget):
         if self.show_grid:
             self.hist.showGrid(x=True, y=True)
 
+        self.fa_thresh_hist_line = None
+        self.amp_hist_lines = []
+        self.theta_hist_lines = []
+
     def plot_all(self):
         debug_logger.debug(f"redoing all plots for {self.main.data.current_datakey}")
         self.clear_plots()
@@ -139,9 +155,32 @@ class PlotFrame(QWidget):
     def update_plots(self):
         self.update_episode()
         self.update_episode_hist()
+        self.prefetch_neighbours()
+
+    def prefetch_neighbours(self):
+        """Compute the plot data, histograms and idealizations of the episodes
+        around the visible one in the background."""
+        data = self.main.data
+        datakey = data.current_datakey
+        cache = None
+        if self.main.tc_frame is not None:
+            cache = self.main.tc_frame.current_tab.idealization_cache
+
+        def prepare(n_episode):
+            if data.current_datakey != datakey:
+                return
+            data.trace_pyramid(n_episode, datakey)
+            data.episode_hist(n_episode=n_episode)
+            if cache is not None:
+                cache.idealize_episode(n_episode)
+
+        self.prefetcher.request(
+            [episode.n_episode for episode in data.series],
+            data.current_ep_ind,
+            prepare,
+        )
 
     def update_episode(self):
-        self.clear_plots()
         self.plot_episode()
         try:
             self.plot_tc_params()
@@ -150,7 +189,8 @@ class PlotFrame(QWidget):
 
     def update_episode_hist(self):
         heights, bins, = self.main.data.episode_hist()[:2]
-        heights = np.asarray(heights, dtype=float)
+        # copy, the histogram is cached by the recording
+        heights = np.array(heights, dtype=float)
         heights /= np.max(heights)
         heights *= -1
         self.episode_hist.setData(bins, heights)
@@ -159,7 +199,8 @@ class PlotFrame(QWidget):
         debug_logger.debug("drawing episode hist")
         pen = pg.mkPen(color="b")
         heights, bins, = self.main.data.episode_hist()[:2]
-        heights = np.asarray(heights, dtype=float)
+        # copy, the histogram is cached by the recording
+        heights = np.array(heights, dtype=float)
         heights /= np.max(heights)
         heights *= -1
         self.episode_hist = pg.PlotDataItem(bins, heights, stepMode=True, pen=pen)
@@ -190,28 +231,48 @@ class PlotFrame(QWidget):
         debug_logger.debug(
             f"plotting episode {self.main.data.episode().n_episode} of series {self.main.data.current_datakey}"
         )
-        pen = pg.mkPen(color="b")
-        self.trace_line = self.trace_plot.plot(
-            self.main.data.episode().time, self.main.data.episode().trace, pen=pen
-        )
+        # the trace is drawn from its min/max pyramid with about two points
+        # per pixel of the visible range, see `update_trace_detail`
+        self.trace_pyramid = self.main.data.trace_pyramid()
+        self.trace_line.setData(*self.visible_trace())
         if (
             self.main.tc_frame is not None
             and self.main.tc_frame.idealization() is not None
         ):
-            id_pen = pg.mkPen(color=ORANGE)
-            self.trace_plot.plot(
-                self.main.tc_frame.time(), self.main.tc_frame.idealization(), pen=id_pen
+            # two vertices per event instead of every (interpolated) sample
+            self.idealization_line.setData(
+                *Idealizer.step_curve(
+                    self.main.tc_frame.idealization(), self.main.tc_frame.time()
+                )
             )
+        else:
+            self.idealization_line.clear()
         if self.show_command:
-            self.command_plot.plot(
-                self.main.data.episode().time, self.main.data.episode().command, pen=pen
+            self.command_line.setData(
+                self.main.data.episode().time, self.main.data.episode().command
             )
         if self.show_piezo:
-            self.piezo_plot.plot(
-                self.main.data.episode().time, self.main.data.episode().piezo, pen=pen
+            self.piezo_line.setData(
+                self.main.data.episode().time, self.main.data.episode().piezo
             )
         self.set_viewbox_limits()
 
+    def visible_trace(self):
+        """Return the points of the trace to draw for the visible range, the
+        whole episode is visible while the x-axis is autoranged."""
+        if self.trace_viewbox.autoRangeEnabled()[0]:
+            time = self.trace_pyramid.time
+            x_range = (time[0], time[-1])
+        else:
+            x_range = self.trace_viewbox.viewRange()[0]
+        return self.trace_pyramid.slice(*x_range, self.trace_plot.width())
+
+    def update_trace_detail(self):
+        """Draw the trace at the level of detail fitting the visible range."""
+        if self.trace_pyramid is None:
+            return
+        self.trace_line.setData(*self.visible_trace())
+
     def set_viewbox_limits(self):
         time_max = np.max(self.main.data.episode().time)
         time_min = np.min(self.main.data.episode().time)
@@ -248,92 +309,88 @@ class PlotFrame(QWidget):
             xMin=-0.05, xMax=1.05, yMin=trace_min, yMax=trace_max
         )
 
+    @staticmethod
+    def set_horizontal_lines(plot, lines, positions, pen):
+        """Move the horizontal lines in the list `lines` to `positions`,
+        adding lines to or removing them from the plot as needed."""
+        for line in lines[len(positions) :]:
+            plot.removeItem(line)
+        del lines[len(positions) :]
+        for line, position in zip(lines, positions):
+            line.setValue(position)
+        for position in positions[len(lines) :]:
+            line = pg.InfiniteLine(pos=position, angle=0, pen=pen)
+            plot.addItem(line)
+            lines.append(line)
+
     def plot_fa_threshold(self, threshold):
         debug_logger.debug(f"plotting first activation threshold at {threshold}")
         pen = pg.mkPen(
             color=ORANGE, style=QtCore.Qt.DashLine, width=0.7 * self.base_line_width
         )
-        self.clear_fa_threshold()
-
-        time = self.main.data.episode().time
-        hist_x = np.arange(
-            np.min([*self.hist_y_range]), np.max([*self.hist_y_range]), 0.1
-        )
-
-        self.fa_thresh_line = self.trace_plot.plot(
-            time, np.ones(len(time)) * threshold, pen=pen
-        )
-        self.trace_plot.addItem(self.fa_thresh_line)
-        self.fa_thresh_hist_line = self.hist.plot(
-            hist_x, np.ones(len(hist_x)) * threshold, pen=pen
-        )
-        self.hist.addItem(self.fa_thresh_hist_line)
+        if self.fa_thresh_line is None:
+            self.fa_thresh_line = pg.InfiniteLine(pos=threshold, angle=0, pen=pen)
+            self.trace_plot.addItem(self.fa_thresh_line)
+        else:
+            self.fa_thresh_line.setValue(threshold)
+        if self.fa_thresh_hist_line is None:
+            self.fa_thresh_hist_line = pg.InfiniteLine(pos=threshold, angle=0, pen=pen)
+            self.hist.addItem(self.fa_thresh_hist_line)
+        else:
+            self.fa_thresh_hist_line.setValue(threshold)
 
     def plot_fa_line(self):
-        self.clear_fa()
-        pen = pg.mkPen(
-            color=GREEN, style=QtCore.Qt.DashLine, width=self.base_line_width
-        )
-        self.fa_line = pg.InfiniteLine(
-            pos=self.main.data.episode().first_activation, angle=90, pen=pen
-        )
-        self.trace_plot.addItem(self.fa_line)
+        first_activation = self.main.data.episode().first_activation
+        if first_activation is None:
+            self.clear_fa()
+            return
+        if self.fa_line is None:
+            pen = pg.mkPen(
+                color=GREEN, style=QtCore.Qt.DashLine, width=self.base_line_width
+            )
+            self.fa_line = pg.InfiniteLine(pos=first_activation, angle=90, pen=pen)
+            self.trace_plot.addItem(self.fa_line)
+        else:
+            self.fa_line.setValue(first_activation)
 
     def draw_fa_marking_indicator(self):
-        pen = pg.mkPen(
-            color=GREY, style=QtCore.Qt.DashLine, width=0.8 * self.base_line_width
-        )
-        self.marking_indicator = pg.InfiniteLine(pos=0, angle=90, pen=pen)
-        self.main.plot_frame.trace_plot.addItem(self.marking_indicator)
+        if self.marking_indicator is None:
+            pen = pg.mkPen(
+                color=GREY, style=QtCore.Qt.DashLine, width=0.8 * self.base_line_width
+            )
+            self.marking_indicator = pg.InfiniteLine(pos=0, angle=90, pen=pen)
+        if self.marking_indicator not in self.trace_plot.getPlotItem().items:
+            self.trace_plot.addItem(self.marking_indicator)
 
     def clear_fa_threshold(self):
         if self.fa_thresh_line is not None:
             self.trace_plot.removeItem(self.fa_thresh_line)
+            self.fa_thresh_line = None
+        if self.fa_thresh_hist_line is not None:
             self.hist.removeItem(self.fa_thresh_hist_line)
+            self.fa_thresh_hist_line = None
 
     def clear_fa(self):
         if self.fa_line is not None:
             self.trace_plot.removeItem(self.fa_line)
+            self.fa_line = None
 
     def plot_theta_lines(self, thetas):
         pen = pg.mkPen(
             color="r", style=QtCore.Qt.DashLine, width=0.6 * self.base_line_width
         )
-        thetas = np.asarray(thetas)
-        self.clear_theta_lines()
-        self.theta_lines = []
-        self.theta_hist_lines = []
-        time = self.main.data.episode().time
-        hist_x = np.arange(
-            np.min([*self.hist_y_range]), np.max([*self.hist_y_range]), 0.1
-        )
-        for theta in thetas:
-            self.theta_lines.append(
-                self.trace_plot.plot(time, np.ones(len(time)) * theta, pen=pen)
-            )
-            self.theta_hist_lines.append(
-                self.hist.plot(hist_x, np.ones(len(hist_x)) * theta, pen=pen)
-            )
+        thetas = list(np.asarray(thetas))
+        self.set_horizontal_lines(self.trace_plot, self.theta_lines, thetas, pen)
+        self.set_horizontal_lines(self.hist, self.theta_hist_lines, thetas, pen)
 
     def plot_amp_lines(self, amps):
         debug_logger.debug(f"plotting amps at {amps}")
         pen = pg.mkPen(
             color=ORANGE, style=QtCore.Qt.DashLine, width=0.6 * self.base_line_width
         )
-        self.clear_amp_lines()
-        self.amp_lines = []
-        self.amp_hist_lines = []
-        time = self.main.data.episode().time
-        hist_x = np.arange(
-            np.min([*self.hist_y_range]), np.max([*self.hist_y_range]), 0.1
-        )
-        for amp in amps:
-            self.amp_lines.append(
-                self.trace_plot.plot(time, np.ones(len(time)) * amp, pen=pen)
-            )
-            self.amp_hist_lines.append(
-                self.hist.plot(hist_x, np.ones(len(hist_x)) * amp, pen=pen)
-            )
+        amps = list(np.asarray(amps))
+        self.set_horizontal_lines(self.trace_plot, self.amp_lines, amps, pen)
+        self.set_horizontal_lines(self.hist, self.amp_hist_lines, amps, pen)
 
     def plot_tc_params(self):
         amps, thresh, resolution, intrp_factor = self.main.tc_frame.get_params()
@@ -349,31 +406,31 @@ class PlotFrame(QWidget):
     def clear_hist(self):
         debug_logger.debug(f"clearing histogram")
         self.hist.clear()
+        self.fa_thresh_hist_line = None
+        self.amp_hist_lines = []
+        self.theta_hist_lines = []
 
     def clear_plots(self):
         debug_logger.debug(f"clearing plots")
-        self.trace_plot.clear()
+        self.trace_line.clear()
+        self.idealization_line.clear()
         self.clear_tc_lines()
-        if self.show_command and self.command_plot is not None:
-            self.command_plot.clear()
-        if self.show_piezo and self.piezo_plot is not None:
-            self.piezo_plot.clear()
+        if self.show_command and self.command_line is not None:
+            self.command_line.clear()
+        if self.show_piezo and self.piezo_line is not None:
+            self.piezo_line.clear()
 
     def clear_tc_lines(self):
         self.clear_amp_lines()
         self.clear_theta_lines()
 
     def clear_amp_lines(self):
-        for a in self.amp_lines:
-            self.trace_plot.removeItem(a)
-        for a in self.amp_hist_lines:
-            self.hist.removeItem(a)
+        self.set_horizontal_lines(self.trace_plot, self.amp_lines, [], None)
+        self.set_horizontal_lines(self.hist, self.amp_hist_lines, [], None)
 
     def clear_theta_lines(self):
-        for a in self.theta_lines:
-            self.trace_plot.removeItem(a)
-        for a in self.theta_hist_lines:
-            self.hist.removeItem(a)
+        self.set_horizontal_lines(self.trace_plot, self.theta_lines, [], None)
+        self.set_horizontal_lines(self.hist, self.theta_hist_lines, [], None)
 
     def togggle_grid(self):
         clear_qt_layout(self.layout)
@@ -13,6 +13,7 @@ from PySide2.QtWidgets import (
     QFormLayout,
 )
 
+from .workers import run_task
 from ..utils import clear_qt_layout, string_to_list, get_dict_key_index
 from ..utils.widgets import VerticalContainerWidget
 from ..constants import TIME_UNIT_FACTORS
@@ -87,17 +88,27 @@ class FilterFrame(QDialog):
     def ok_clicked(self):
         filter_method = self.filter_options[self.method_box.currentIndex()]
         if filter_method == "Gaussian":
-            self.main.data.gauss_filter_series(float(self.freq_entry.text()))
+            run_task(
+                self.main,
+                "Filtering",
+                self.main.data.gauss_filter_series,
+                float(self.freq_entry.text()),
+                add=False,
+                on_result=self.main.add_series,
+            )
         elif filter_method == "Chung-Kennedy":
-            self.main.data.CK_filter_series(
+            run_task(
+                self.main,
+                "Filtering",
+                self.main.data.CK_filter_series,
                 window_lengths=[int(x) for x in self.window_entry.text().split()],
                 weight_exponent=int(self.exponent_entry.text()),
                 weight_window=int(self.window_entry.text()),
                 apriori_f_weights=[int(x) for x in self.forward_entry.text().split()],
                 apriori_b_weights=[int(x) for x in self.backward_entry.text().split()],
+                add=False,
+                on_result=self.main.add_series,
             )
-        self.main.plot_frame.plot_all()
-        self.main.ep_frame.update_combo_box()
         self.close()
 
 
@@ -222,7 +233,10 @@ class BaselineWidget(VerticalContainerWidget):
             intervals = string_to_list(self.interval_entry.text())
             time_unit = self.time_unit_entry.currentText()
 
-        self.main.data.baseline_correction(
+        run_task(
+            self.main,
+            "Baseline correction",
+            self.main.data.baseline_correction,
             method=method,
             degree=degree,
             intervals=intervals,
@@ -230,9 +244,9 @@ class BaselineWidget(VerticalContainerWidget):
             deviation=deviation,
             active=active,
             time_unit=time_unit,
+            add=False,
+            on_result=self.main.add_series,
         )
-        self.main.ep_frame.update_combo_box()
-        self.main.plot_frame.plot_all()
         self.dialog.close()
         self.close()
 
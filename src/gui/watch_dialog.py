@@ -0,0 +1,144 @@
+import json
+import logging
+
+from PySide2.QtCore import QTimer
+from PySide2.QtWidgets import (
+    QDialog,
+    QLabel,
+    QLineEdit,
+    QCheckBox,
+    QPushButton,
+    QTableView,
+    QFileDialog,
+    QVBoxLayout,
+    QHBoxLayout,
+)
+
+from .workers import run_in_background
+from ..watch import FolderWatcher, format_result
+from ..utils.widgets import TableModel
+
+debug_logger = logging.getLogger("ascam.debug")
+
+# interval between the polls of the watched directory
+POLL_INTERVAL_MS = 2000
+
+
+class WatchFolderDialog(QDialog):
+    """Dialog that watches a directory for new recordings, processes them
+    with the steps of a batch spec and shows the running event table."""
+
+    def __init__(self, main):
+        super().__init__()
+        self.main = main
+        self.watcher = None
+        self.polling = False
+        self.setWindowTitle("Watch Folder")
+        self.setModal(False)
+
+        self.layout = QVBoxLayout()
+        self.setLayout(self.layout)
+        self.create_widgets()
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(POLL_INTERVAL_MS)
+        self.timer.timeout.connect(self.poll)
+        self.resize(600, 700)
+        self.show()
+
+    def create_widgets(self):
+        self.directory_entry = QLineEdit()
+        directory_button = QPushButton("Browse")
+        directory_button.clicked.connect(self.choose_directory)
+        self.add_row(QLabel("Directory:"), self.directory_entry, directory_button)
+
+        self.spec_entry = QLineEdit()
+        spec_button = QPushButton("Browse")
+        spec_button.clicked.connect(self.choose_spec)
+        self.add_row(QLabel("Steps (JSON):"), self.spec_entry, spec_button)
+
+        self.output_entry = QLineEdit("./ASCAM_watch")
+        self.add_row(QLabel("Output directory:"), self.output_entry)
+
+        self.show_newest = QCheckBox("Show newest recording")
+        self.add_row(self.show_newest)
+
+        self.start_button = QPushButton("Start")
+        self.start_button.clicked.connect(self.toggle)
+        self.add_row(self.start_button)
+
+        self.status = QLabel("Not watching")
+        self.add_row(self.status)
+
+        self.table_view = QTableView()
+        self.layout.addWidget(self.table_view)
+
+    def add_row(self, *widgets):
+        row = QHBoxLayout()
+        for widget in widgets:
+            row.addWidget(widget)
+        self.layout.addLayout(row)
+
+    def choose_directory(self):
+        directory = QFileDialog.getExistingDirectory(self)
+        if directory:
+            self.directory_entry.setText(directory)
+
+    def choose_spec(self):
+        filename = QFileDialog.getOpenFileName(self, filter="*.json")[0]
+        if filename:
+            self.spec_entry.setText(filename)
+
+    def toggle(self):
+        if self.timer.isActive():
+            self.timer.stop()
+            self.start_button.setText("Start")
+            self.status.setText("Stopped")
+            return
+        with open(self.spec_entry.text()) as f:
+            spec = json.load(f)
+        self.watcher = FolderWatcher(
+            self.directory_entry.text(), spec, self.output_entry.text()
+        )
+        self.show_events()
+        self.timer.start()
+        self.start_button.setText("Stop")
+        self.status.setText(f"Watching {self.watcher.directory}")
+
+    def poll(self):
+        # the files are processed in the background, a poll is skipped while
+        # the previous one is still running
+        if self.polling:
+            return
+        self.polling = True
+        run_in_background(
+            self.watcher.poll, on_result=self.show_results, on_error=self.poll_failed
+        )
+
+    def show_results(self, results):
+        self.polling = False
+        if not results:
+            return
+        self.status.setText("\n".join(format_result(result) for result in results))
+        self.show_events()
+        if self.show_newest.isChecked() and self.watcher.latest_recording is not None:
+            self.main.filename = self.watcher.latest_recording.filename
+            self.main.show_recording(self.watcher.latest_recording)
+
+    def poll_failed(self, error):
+        self.polling = False
+        self.status.setText(error.splitlines()[-1])
+
+    def show_events(self):
+        self.table_view.setModel(
+            TableModel(
+                self.watcher.events(),
+                self.watcher.header(),
+                self.watcher.column_units(),
+            )
+        )
+        self.table_view.scrollToBottom()
+
+    def closeEvent(self, event):
+        self.timer.stop()
+        super().closeEvent(event)
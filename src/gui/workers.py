@@ -0,0 +1,143 @@
+import logging
+import traceback
+
+from PySide2.QtCore import QObject, QRunnable, QThreadPool, Qt, Signal, Slot
+from PySide2.QtWidgets import QMessageBox, QProgressDialog
+
+debug_logger = logging.getLogger("ascam.debug")
+
+# workers that are running, a reference is kept until they are finished so
+# that their signals are not garbage collected
+_active_workers = set()
+
+
+class TaskCancelled(Exception):
+    """Raised from the progress callback of a cancelled task to stop it."""
+
+
+class WorkerSignals(QObject):
+    """Signals emitted by a `Worker`, a QRunnable cannot emit signals
+    itself.
+
+    finished - emitted when the function returned, raised or was cancelled
+    error - emitted with the formatted traceback if the function raised
+    result - emitted with the return value of the function
+    progress - emitted with the number of finished and total steps
+    cancelled - emitted if the function was stopped by `Worker.cancel`"""
+
+    finished = Signal()
+    error = Signal(str)
+    result = Signal(object)
+    progress = Signal(int, int)
+    cancelled = Signal()
+
+
+class Worker(QRunnable):
+    """Run a function in a thread of the global QThreadPool.
+
+    If `report_progress` is true the function is passed a `progress` keyword
+    argument, a function it should call with the number of finished and the
+    total number of steps. Cancelling the worker makes the next call of it
+    raise `TaskCancelled`, which stops the function."""
+
+    def __init__(self, fn, *args, report_progress=False, **kwargs):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        if report_progress:
+            self.kwargs["progress"] = self.report_progress
+        self.signals = WorkerSignals()
+        self.is_cancelled = False
+
+    def cancel(self):
+        self.is_cancelled = True
+
+    def report_progress(self, done, total):
+        if self.is_cancelled:
+            raise TaskCancelled()
+        self.signals.progress.emit(done, total)
+
+    def run(self):
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except TaskCancelled:
+            debug_logger.debug(f"{self.fn.__name__} was cancelled")
+            self.signals.cancelled.emit()
+        except Exception:
+            error = traceback.format_exc()
+            debug_logger.error(f"{self.fn.__name__} failed:\n{error}")
+            self.signals.error.emit(error)
+        else:
+            self.signals.result.emit(result)
+        finally:
+            self.signals.finished.emit()
+
+
+def start_worker(worker):
+    _active_workers.add(worker)
+    worker.signals.finished.connect(lambda: _active_workers.discard(worker))
+    QThreadPool.globalInstance().start(worker)
+    return worker
+
+
+def run_in_background(fn, *args, on_result=None, on_error=None, **kwargs):
+    """Call `fn(*args, **kwargs)` in the global thread pool and return the
+    worker.
+
+    Args:
+        on_result - called in the GUI thread with the return value
+        on_error - called in the GUI thread with the traceback"""
+    worker = Worker(fn, *args, **kwargs)
+    if on_result is not None:
+        worker.signals.result.connect(on_result)
+    if on_error is not None:
+        worker.signals.error.connect(on_error)
+    return start_worker(worker)
+
+
+class TaskProgressDialog(QProgressDialog):
+    """Modal dialog showing the progress of a worker with a button to cancel
+    it, errors are shown in a message box."""
+
+    def __init__(self, parent, label, worker):
+        super().__init__(label, "Cancel", 0, 0, parent)
+        self.setWindowTitle("ASCAM")
+        self.setWindowModality(Qt.WindowModal)
+        # shown at once, the window modality keeps the recording from being
+        # changed while the task runs
+        self.setMinimumDuration(0)
+        self.setAutoReset(False)
+        self.worker = worker
+        self.canceled.connect(worker.cancel)
+        worker.signals.progress.connect(self.set_progress)
+        worker.signals.error.connect(self.show_error)
+        worker.signals.finished.connect(self.close)
+        self.show()
+
+    @Slot(int, int)
+    def set_progress(self, done, total):
+        self.setMaximum(total)
+        self.setValue(done)
+
+    @Slot(str)
+    def show_error(self, error):
+        QMessageBox.critical(self.parentWidget(), "ASCAM", error.splitlines()[-1])
+
+
+def run_task(parent, label, fn, *args, on_result=None, **kwargs):
+    """Run a function that reports its progress in the background while a
+    modal progress dialog is shown.
+
+    Args:
+        parent - the widget the dialog belongs to
+        label - text shown in the dialog
+        fn - the function, it is called with a `progress` keyword argument
+        on_result - called in the GUI thread with the return value of `fn`
+    Returns:
+        the worker running the function"""
+    worker = Worker(fn, *args, report_progress=True, **kwargs)
+    if on_result is not None:
+        worker.signals.result.connect(on_result)
+    worker.dialog = TaskProgressDialog(parent, label, worker)
+    return start_worker(worker)
@@ -0,0 +1,139 @@
+"""Profile the processing of a recording.
+
+The file is loaded and processed either with the steps of a batch spec (see
+`batch.py`) or, without a spec, with a gaussian filter and the histogram of
+the filtered series. The run is profiled with cProfile and the functions
+with the largest cumulative time are printed, followed by the time spent in
+each of the instrumented operations (see `utils/instrumentation.py`).
+
+The module is not called `profile` so that it does not shadow the module of
+the standard library."""
+
+import io
+import sys
+import json
+import getopt
+import pstats
+import logging
+import tempfile
+import cProfile
+import collections
+
+from .batch import BatchJob
+from .core import Recording
+from .utils import instrumentation
+
+debug_logger = logging.getLogger("ascam.debug")
+
+DEFAULT_FILTER_FREQ = 1000
+
+
+def default_processing(filename):
+    recording = Recording.from_file(filename)
+    recording.gauss_filter_series(DEFAULT_FILTER_FREQ)
+    recording.series_hist()
+
+
+def profile_file(filename, spec=None):
+    """Process `filename` under cProfile.
+
+    Args:
+        filename - the recording to process
+        spec - the loading arguments and steps, see `batch.py`, if None the
+            recording is filtered and its histogram computed
+    Returns:
+        stats - the `pstats.Stats` of the run
+        measurements - the `instrumentation.Measurement`s of the run"""
+    measurements = []
+    instrumentation.add_listener(measurements.append)
+    profiler = cProfile.Profile()
+    try:
+        with tempfile.TemporaryDirectory() as output_dir:
+            profiler.enable()
+            try:
+                if spec is None:
+                    default_processing(filename)
+                else:
+                    BatchJob(filename, spec, output_dir).run()
+            finally:
+                profiler.disable()
+    finally:
+        instrumentation.remove_listener(measurements.append)
+    return pstats.Stats(profiler), measurements
+
+
+def format_operations(measurements):
+    """Return a table of the number of calls and the total wall and CPU time
+    of each operation."""
+    totals = collections.OrderedDict()
+    for measurement in measurements:
+        calls, wall, cpu = totals.get(measurement.name, (0, 0.0, 0.0))
+        totals[measurement.name] = (
+            calls + 1,
+            wall + measurement.wall,
+            cpu + measurement.cpu,
+        )
+    lines = [f"{'operation':50} {'calls':>6} {'wall [s]':>10} {'cpu [s]':>10}"]
+    for name, (calls, wall, cpu) in totals.items():
+        lines.append(f"{name:50} {calls:6d} {wall:10.4f} {cpu:10.4f}")
+    return "\n".join(lines)
+
+
+def format_stats(stats, top):
+    stream = io.StringIO()
+    stats.stream = stream
+    stats.sort_stats("cumulative").print_stats(top)
+    return stream.getvalue()
+
+
+def display_help():
+    print(
+        """Usage: ascam profile [--spec=SPEC] [--top=N] [--output=FILE] FILE
+
+            FILE : the recording to process
+            -s --spec : JSON file with the loading arguments and processing
+                        steps, see `ascam batch` (default: gaussian filter
+                        and histogram)
+            -n --top : number of functions to print (default: 25)
+            -o --output : save the profile for e.g. snakeviz or pstats
+            -h --help : display this message"""
+    )
+
+
+def main(argv=None):
+    """Entry point of `ascam profile`, returns the exit status."""
+    if argv is None:
+        argv = sys.argv[1:]
+    spec = None
+    top = 25
+    output = None
+    try:
+        options, args = getopt.getopt(
+            argv, "s:n:o:h", ["spec=", "top=", "output=", "help"]
+        )
+    except getopt.GetoptError as err:
+        print(err)
+        display_help()
+        return 2
+    for opt, arg in options:
+        if opt in ("-s", "--spec"):
+            with open(arg) as f:
+                spec = json.load(f)
+        elif opt in ("-n", "--top"):
+            top = int(arg)
+        elif opt in ("-o", "--output"):
+            output = arg
+        elif opt in ("-h", "--help"):
+            display_help()
+            return 0
+    if len(args) != 1:
+        display_help()
+        return 2
+
+    stats, measurements = profile_file(args[0], spec)
+    print(format_stats(stats, top))
+    print(format_operations(measurements))
+    if output is not None:
+        stats.dump_stats(output)
+        print(f"\nprofile saved to {output}")
+    return 0
@@ -6,8 +6,13 @@ from .tools import (
     update_number_in_string,
     interval_selection,
     round_off_tables,
+    write_csv_table,
+    remove_on_error,
     parse_filename,
     array_to_string,
     string_to_array,
 )
+from .pyramid import MinMaxPyramid
+from .instrumentation import instrumented, measure
 from .logging_setup import initialize_logger
+from .provenance import get_version, log_version_in_background
@@ -0,0 +1,134 @@
+"""Timing and memory measurements of the expensive operations.
+
+Functions decorated with `instrumented`, or code run in a `measure` block,
+log their wall time, the CPU time of the thread that ran them and, if
+memory tracing is switched on, the peak memory they allocated to the
+`ascam.performance` logger. The measurements are also kept in `RECENT` and
+passed to the functions registered with `add_listener`, e.g. the
+performance panel of the GUI.
+
+Tracing the memory slows down every allocation, so it is off unless
+`set_memory_tracing(True)` is called. Peaks are tracked per operation,
+including nested ones, but allocations of other threads count towards the
+operation that runs at the same time."""
+
+import time
+import logging
+import functools
+import threading
+import contextlib
+import collections
+import tracemalloc
+
+perf_logger = logging.getLogger("ascam.performance")
+
+# the most recent measurements
+RECENT = collections.deque(maxlen=1000)
+_listeners = []
+_local = threading.local()
+
+
+class Measurement:
+    def __init__(self, name, wall, cpu, peak_bytes=None):
+        """The cost of one operation.
+
+        Args:
+            name - the name of the operation
+            wall - the elapsed time [s]
+            cpu - the CPU time of the thread [s]
+            peak_bytes - the peak memory allocated during the operation, None
+                if memory was not traced"""
+        self.name = name
+        self.wall = wall
+        self.cpu = cpu
+        self.peak_bytes = peak_bytes
+        self.timestamp = time.time()
+
+    def __repr__(self):
+        text = f"{self.name}: wall {self.wall:.4f} s, cpu {self.cpu:.4f} s"
+        if self.peak_bytes is not None:
+            text += f", peak {self.peak_bytes / 2 ** 20:.2f} MB"
+        return text
+
+
+def add_listener(listener):
+    """Call `listener` with every new `Measurement`, it is called in the
+    thread that ran the operation."""
+    _listeners.append(listener)
+
+
+def remove_listener(listener):
+    if listener in _listeners:
+        _listeners.remove(listener)
+
+
+def set_memory_tracing(enabled):
+    if enabled and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    elif not enabled and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def _frames():
+    if not hasattr(_local, "frames"):
+        _local.frames = []
+    return _local.frames
+
+
+@contextlib.contextmanager
+def measure(name):
+    """Measure the code run in the block as the operation `name`."""
+    frames = _frames()
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        current, peak = tracemalloc.get_traced_memory()
+        if frames:
+            # the peak is reset for this operation, keep that of the
+            # enclosing one
+            frames[-1]["peak"] = max(frames[-1]["peak"], peak)
+        tracemalloc.reset_peak()
+        frames.append(dict(start=current, peak=current))
+    wall_start = time.perf_counter()
+    cpu_start = time.thread_time()
+    try:
+        yield
+    finally:
+        wall = time.perf_counter() - wall_start
+        cpu = time.thread_time() - cpu_start
+        peak_bytes = None
+        if tracing and tracemalloc.is_tracing():
+            frame = frames.pop()
+            peak = max(frame["peak"], tracemalloc.get_traced_memory()[1])
+            peak_bytes = peak - frame["start"]
+            if frames:
+                frames[-1]["peak"] = max(frames[-1]["peak"], peak)
+        elif tracing:
+            frames.pop()
+        measurement = Measurement(name, wall, cpu, peak_bytes)
+        RECENT.append(measurement)
+        perf_logger.info(repr(measurement))
+        # a failing listener must not replace the result of the operation
+        for listener in list(_listeners):
+            try:
+                listener(measurement)
+            except Exception:
+                perf_logger.exception(f"listener {listener} failed")
+
+
+def instrumented(function=None, name=None):
+    """Decorator that measures every call of a function, the operation is
+    named after the function unless `name` is given."""
+
+    def decorate(function):
+        operation = name or function.__qualname__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with measure(operation):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    if function is not None:
+        return decorate(function)
+    return decorate
@@ -14,14 +14,17 @@ def initialize_logger(output_dir=".", silent=False, debug=False):
 
     analysis_logger = logging.getLogger("ascam.analysis")
     debug_logger = logging.getLogger("ascam.debug")
+    performance_logger = logging.getLogger("ascam.performance")
     root_logger = logging.getLogger()
 
     # do not show these logs in root logger (avoids double printing)
     analysis_logger.propagate = False
     debug_logger.propagate = False
+    performance_logger.propagate = False
 
     analysis_logger.setLevel(logging.DEBUG)
     debug_logger.setLevel(logging.DEBUG)
+    performance_logger.setLevel(logging.INFO)
     root_logger.setLevel(logging.INFO)
 
     if (not silent) and debug:
@@ -48,6 +51,13 @@ def initialize_logger(output_dir=".", silent=False, debug=False):
     root_logger.addHandler(ana_handler)
     analysis_logger.addHandler(ana_handler)
 
+    performance_handler = setup_file_handler(
+        output_dir, f"performance_ASCAM_{date}.log"
+    )
+    performance_logger.addHandler(performance_handler)
+    if debug:
+        setup_cl_handlers(performance_logger)
+
 
 def setup_file_handler(output_dir, filename):
     formatter = logging.Formatter(
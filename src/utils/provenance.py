@@ -0,0 +1,121 @@
+"""Record which versions of ASCAM and its dependencies are running.
+
+Asking pip and git for them takes seconds, so the answer is cached on disk
+under a key made from the interpreter and the modification times of the
+installed packages and of the ASCAM source, and collected in a background
+thread when the cache is out of date."""
+
+import os
+import sys
+import glob
+import json
+import site
+import hashlib
+import logging
+import threading
+import subprocess
+
+from ..constants import CACHE_DIR
+
+debug_logger = logging.getLogger("ascam.debug")
+
+# the root directory of the ASCAM source, two above this file
+SOURCE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def cache_key():
+    """Return a key that changes when the interpreter, an installed package
+    or the checked out version of ASCAM changes.
+
+    Installing or removing a package changes the modification time of its
+    site-packages directory and a commit or checkout that of the git HEAD
+    and index."""
+    package_dirs = sorted(
+        set(site.getsitepackages() + [site.getusersitepackages()])
+    )
+    parts = [sys.executable, sys.version]
+    for path in package_dirs + [
+        os.path.join(SOURCE_DIR, "src"),
+        os.path.join(SOURCE_DIR, ".git", "HEAD"),
+        os.path.join(SOURCE_DIR, ".git", "index"),
+    ]:
+        parts.append(f"{path}:{_mtime(path)}")
+    return hashlib.sha1("\n".join(parts).encode()).hexdigest()
+
+
+def _run(*command):
+    try:
+        return subprocess.run(
+            command, cwd=SOURCE_DIR, capture_output=True, text=True
+        ).stdout
+    except OSError as e:
+        debug_logger.warning(f"could not run {command[0]}: {e}")
+        return ""
+
+
+def collect_version():
+    """Ask pip and git for the installed packages and the current commit.
+
+    Returns:
+        pip_freeze - the output of `pip freeze`
+        git_info - the first three lines of `git show`"""
+    pip_freeze = _run(sys.executable, "-m", "pip", "freeze")
+    git_info = _run("git", "show", "-s")
+    git_info = "\n".join(git_info.split("\n")[:3])
+    return pip_freeze, git_info
+
+
+def get_version(cache_dir=CACHE_DIR):
+    """Return the output of `pip freeze` and `git show`, from the cache if it
+    is up to date.
+
+    Args:
+        cache_dir - the directory of the cache, if None nothing is cached
+    Returns:
+        pip_freeze, git_info - see `collect_version`"""
+    key = cache_key()
+    cache_file = None
+    if cache_dir is not None:
+        cache_file = os.path.join(cache_dir, f"version_{key}.json")
+        try:
+            with open(cache_file) as f:
+                cached = json.load(f)
+            return cached["pip_freeze"], cached["git_info"]
+        except (OSError, ValueError, KeyError):
+            pass
+    pip_freeze, git_info = collect_version()
+    if cache_file is not None:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp_file = f"{cache_file}.{threading.get_ident()}.tmp"
+            with open(tmp_file, "w") as f:
+                json.dump({"pip_freeze": pip_freeze, "git_info": git_info}, f)
+            os.replace(tmp_file, cache_file)
+            # the versions cached under older keys are out of date
+            for old_file in glob.glob(os.path.join(cache_dir, "version_*.json")):
+                if old_file != cache_file:
+                    os.remove(old_file)
+        except OSError as e:
+            debug_logger.warning(f"could not cache the version: {e}")
+    return pip_freeze, git_info
+
+
+def log_version(cache_dir=CACHE_DIR):
+    """Write the versions of ASCAM and the installed packages to the log."""
+    pip_freeze, git_info = get_version(cache_dir)
+    logging.info(git_info)
+    logging.info(pip_freeze)
+
+
+def log_version_in_background(cache_dir=CACHE_DIR):
+    """Call `log_version` in a daemon thread and return the thread."""
+    thread = threading.Thread(target=log_version, args=(cache_dir,), daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,61 @@
+import numpy as np
+
+
+class MinMaxPyramid:
+    def __init__(self, time, signal, factor=4, min_bins=256):
+        """Levels of detail of a signal for plotting.
+
+        Each level divides the signal into bins of `factor` times as many
+        samples as the previous level and stores the minimum and maximum of
+        every bin, so drawing a level shows the same envelope as the full
+        signal with two points per bin.
+        Args:
+            time - the (increasing) time of the samples
+            signal - the signal
+            factor - ratio of the bin sizes of consecutive levels
+            min_bins - no coarser level is built once a level has fewer
+                bins than this"""
+        self.time = time
+        self.signal = signal
+        self.factor = factor
+        # bin_sizes[k] is the number of samples in a bin of levels[k], the
+        # last bin of a level may be shorter
+        self.bin_sizes = []
+        self.levels = []
+        mins = maxs = signal
+        bin_size = 1
+        while mins.size > min_bins:
+            starts = np.arange(0, mins.size, factor)
+            mins = np.minimum.reduceat(mins, starts)
+            maxs = np.maximum.reduceat(maxs, starts)
+            bin_size *= factor
+            self.bin_sizes.append(bin_size)
+            self.levels.append(np.column_stack((mins, maxs)))
+
+    def slice(self, x_min, x_max, n_pixels):
+        """Return the points to draw for the time range [x_min, x_max] on a
+        plot that is `n_pixels` wide.
+
+        The coarsest level with at least one bin per pixel is used, which
+        gives about two points per pixel. If no level is that coarse the
+        samples themselves are returned.
+        Returns:
+            time, signal - the x and y values of the points"""
+        first = max(np.searchsorted(self.time, x_min, side="right") - 1, 0)
+        last = min(np.searchsorted(self.time, x_max, side="left") + 1, self.time.size)
+        n_samples = last - first
+        level = None
+        for k, bin_size in enumerate(self.bin_sizes):
+            if bin_size * max(n_pixels, 1) > n_samples:
+                break
+            level = k
+        if level is None:
+            return self.time[first:last], self.signal[first:last]
+        bin_size = self.bin_sizes[level]
+        first_bin = first // bin_size
+        last_bin = -(-last // bin_size)
+        bin_starts = np.arange(first_bin, last_bin) * bin_size
+        return (
+            np.repeat(self.time[bin_starts], 2),
+            self.levels[level][first_bin:last_bin].ravel(),
+        )
@@ -1,3 +1,7 @@
+import csv
+import os
+import contextlib
+
 import numpy as np
 
 from ..constants import PRECISIONS
@@ -32,12 +36,14 @@ def parse_filename(filename):
         filetype_long = "matlab"
     elif filetype == "pkl":
         filetype_long = "pickle"
+    elif filetype == "ascam":
+        filetype_long = "snapshot"
     elif filetype in ("txt", "axgt"):
         filetype = "tdt"
         filetype_long = "tab-delimited-text"
     else:
         raise Exception(
-            "Uknown filetype, can only read '.mat', '.axg*', '.csv', '.pkl'"
+            "Uknown filetype, can only read '.mat', '.axg*', '.csv', '.pkl', '.ascam'"
         )
     filename = filename[slash + 1 :]
     return filetype, path, filetype_long, filename
@@ -165,6 +171,53 @@ def round_off_tables(dataframe, column_units):
     return dataframe
 
 
+def write_csv_table(
+    filepath, table, header, column_units, mode="w", chunk_size=100000, progress=None
+):
+    """Write a numeric table to a csv file, rounding each column to the
+    precision of its unit.
+
+    The output is the same as that of `DataFrame.to_csv` after
+    `round_off_tables`, including the index column, but whole chunks of rows
+    are formatted at once and streamed to the file.
+    Args:
+        filepath - the file to write to
+        table [2D array] - the data with one column per entry in `header`
+        header [list of strings] - the column names
+        column_units [list of strings] - the unit of each column, see
+            `constants.PRECISIONS`
+        mode - 'w' to create a new file or 'a' to append to an existing one
+        chunk_size - the number of rows formatted and written at a time
+        progress - function called with the number of written rows and the
+            total number of rows"""
+    table = np.asarray(table, dtype=float)
+    row_format = (
+        ",".join(["%d"] + [f"%.{PRECISIONS[unit]}f" for unit in column_units])
+        + os.linesep
+    )
+    with open(filepath, mode, newline="") as csv_file:
+        csv.writer(csv_file, lineterminator=os.linesep).writerow(["", *header])
+        for start in range(0, len(table), chunk_size):
+            chunk = table[start : start + chunk_size]
+            # prepend the row numbers as the index column
+            chunk = np.column_stack((np.arange(start, start + len(chunk)), chunk))
+            csv_file.write((row_format * len(chunk)) % tuple(chunk.ravel().tolist()))
+            if progress is not None:
+                progress(start + len(chunk), len(table))
+
+
+@contextlib.contextmanager
+def remove_on_error(filepath):
+    """Remove the file written in the block if the block raises, e.g.
+    because the export was cancelled, so that no truncated file is left."""
+    try:
+        yield
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(filepath)
+        raise
+
+
 def get_dict_key_index(dictionary, target_key):
     return [index for index, key in enumerate(dictionary.keys()) if key == target_key][
         0
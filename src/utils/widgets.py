@@ -1,5 +1,6 @@
 import logging
 
+import numpy as np
 from PySide2 import QtCore
 from PySide2.QtWidgets import (
     QLayout,
@@ -19,7 +20,12 @@ from PySide2.QtWidgets import (
 )
 import pyqtgraph as pg
 
-from ..constants import TIME_UNIT_FACTORS, VOLTAGE_UNIT_FACTORS, CURRENT_UNIT_FACTORS
+from ..constants import (
+    TIME_UNIT_FACTORS,
+    VOLTAGE_UNIT_FACTORS,
+    CURRENT_UNIT_FACTORS,
+    PRECISIONS,
+)
 from ..utils import clear_qt_layout, get_dict_key_index
 
 debug_logger = logging.getLogger("ascam.debug")
@@ -211,7 +217,16 @@ class TableFrame(QDialog):
         title=None,
         height=800,
         width=500,
+        column_units=None,
     ):
+        """Dialog showing a numeric table that can be sorted by clicking on
+        the header of a column.
+
+        Args:
+            data [2D array] - the table with one column per entry in `header`
+            header [list of strings] - the column names
+            column_units [list of strings] - the unit of each column, which
+                sets the number of decimals shown, see `constants.PRECISIONS`"""
         super().__init__()
         self.parent = parent
         self.layout = QVBoxLayout()
@@ -219,9 +234,11 @@ class TableFrame(QDialog):
 
         self.setGeometry(parent.x() + width / 4, parent.y() + height / 3, width, height)
 
-        table = TableModel(data, header)
+        table = TableModel(data, header, column_units)
         table_view = QTableView()
         table_view.setModel(table)
+        table_view.setSortingEnabled(True)
+        table_view.sortByColumn(-1, QtCore.Qt.AscendingOrder)
 
         self.layout.addWidget(table_view)
         self.setModal(False)
@@ -232,25 +249,62 @@ class TableFrame(QDialog):
 
 
 class TableModel(QtCore.QAbstractTableModel):
-    def __init__(self, data, header):
+    def __init__(self, data, header, column_units=None):
+        """Model of a numeric table.
+
+        The numbers are only formatted when a cell is shown and sorting
+        permutes an array of row indices instead of the table.
+        Args:
+            data [2D array] - the table
+            header [list of strings] - the column names
+            column_units [list of strings] - the unit of each column, see
+                `constants.PRECISIONS`, if None all numbers are shown in full"""
         super().__init__()
-        self._data = data
+        self._data = np.asarray(data, dtype=float)
+        if self._data.size == 0:
+            # an empty selection gives a 1D array without columns to sort by
+            self._data = self._data.reshape(0, len(header))
         self._header = header
-
-    def data(self, index, role):
-        if role == QtCore.Qt.DisplayRole:
-            # See below for the nested-list data structure.
-            # .row() indexes into the outer list,
-            # .column() indexes into the sub-list
-            if index.row() == 0:
-                return self._header[index.column()]
-            return self._data[index.row() - 1][index.column()]
-
-    def rowCount(self, index):
+        if column_units is None:
+            self._formats = ["{}"] * len(header)
+        else:
+            self._formats = [f"{{:.{PRECISIONS[unit]}f}}" for unit in column_units]
+        # the row of the table shown in each row of the view
+        self._order = np.arange(len(self._data))
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if role == QtCore.Qt.DisplayRole and index.isValid():
+            column = index.column()
+            value = self._data[self._order[index.row()], column]
+            return self._formats[column].format(value)
+        return None
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if role == QtCore.Qt.DisplayRole and orientation == QtCore.Qt.Horizontal:
+            return self._header[section]
+        return super().headerData(section, orientation, role)
+
+    def rowCount(self, index=QtCore.QModelIndex()):
+        if index.isValid():
+            return 0
         return len(self._data)
 
-    def columnCount(self, index):
-        return len(self._data[0])
+    def columnCount(self, index=QtCore.QModelIndex()):
+        if index.isValid():
+            return 0
+        return len(self._header)
+
+    def sort(self, column, order=QtCore.Qt.AscendingOrder):
+        """Sort the rows by a column, a negative column restores the original
+        order of the table."""
+        self.layoutAboutToBeChanged.emit()
+        if column < 0:
+            self._order = np.arange(len(self._data))
+        else:
+            self._order = np.argsort(self._data[:, column], kind="stable")
+            if order == QtCore.Qt.DescendingOrder:
+                self._order = self._order[::-1]
+        self.layoutChanged.emit()
 
 
 class VerticalContainerWidget(QWidget):
@@ -0,0 +1,224 @@
+"""Process recordings as they are written to a directory during an experiment.
+
+The directory is polled for data files. A file is processed with the steps
+of a batch spec (see `batch.py`) once its size and modification time stayed
+the same between two polls, so files are not read while they are being
+written. If a file grows later it is processed again. The events of every
+episode that was not seen before are appended to a running event table,
+`watch_events.csv` in the output directory."""
+
+import os
+import sys
+import json
+import time
+import getopt
+import logging
+
+import numpy as np
+
+from .batch import BatchJob, run_job
+from .constants import PRECISIONS
+
+debug_logger = logging.getLogger("ascam.debug")
+ana_logger = logging.getLogger("ascam.analysis")
+
+EVENT_TABLE_FILE = "watch_events.csv"
+WATCHED_EXTENSIONS = (".axgd", ".axgx", ".mat")
+
+
+class FolderWatcher:
+    def __init__(
+        self,
+        directory,
+        spec,
+        output_dir,
+        time_unit="us",
+        trace_unit="pA",
+        extensions=WATCHED_EXTENSIONS,
+    ):
+        """Watch `directory` for new or changed recordings.
+
+        Args:
+            directory - the directory the acquisition writes to
+            spec - the loading arguments and steps, see `batch.py`, events
+                are only collected if the steps contain 'idealize'
+            output_dir - the directory for the outputs of the steps, their
+                logs and the event table
+            time_unit, trace_unit - the units of the event table
+            extensions - the file types that are processed"""
+        self.directory = directory
+        self.spec = spec
+        self.output_dir = output_dir
+        self.time_unit = time_unit
+        self.trace_unit = trace_unit
+        self.extensions = tuple(extensions)
+        # size and modification time of the files at the last poll and when
+        # they were processed
+        self._last_stat = dict()
+        self._processed_stat = dict()
+        # numbers of the episodes of each file that are in the event table
+        self._episodes = dict()
+        # the rows of the event table, the file column is kept apart from
+        # the numeric columns
+        self.event_files = []
+        self.event_tables = []
+        # the last recording that was processed without errors
+        self.latest_recording = None
+
+        os.makedirs(output_dir, exist_ok=True)
+        self.event_table_path = os.path.join(output_dir, EVENT_TABLE_FILE)
+        with open(self.event_table_path, "w") as f:
+            f.write(",".join(["File"] + self.header()) + "\n")
+
+    def header(self):
+        return [
+            "Episode Number",
+            f"Amplitude [{self.trace_unit}]",
+            f"Duration [{self.time_unit}]",
+            f"t_start [{self.time_unit}]",
+            f"t_stop [{self.time_unit}]",
+        ]
+
+    def column_units(self):
+        return ["int", self.trace_unit] + [self.time_unit] * 3
+
+    def events(self):
+        """Return the event table of all processed files as a 2D array with
+        the columns of `header`."""
+        if not self.event_tables:
+            return np.empty((0, len(self.header())))
+        return np.concatenate(self.event_tables)
+
+    def ready_files(self):
+        """Return the files that changed since they were processed and did not
+        change since the last poll."""
+        ready = []
+        for name in sorted(os.listdir(self.directory)):
+            if not name.lower().endswith(self.extensions):
+                continue
+            filename = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(filename)
+            except OSError:
+                continue
+            stat = (stat.st_size, stat.st_mtime_ns)
+            if stat == self._processed_stat.get(filename):
+                continue
+            if stat == self._last_stat.get(filename):
+                ready.append(filename)
+            self._last_stat[filename] = stat
+        return ready
+
+    def poll(self):
+        """Process the files that are ready.
+
+        Returns:
+            the results of `batch.run_job` of the processed files"""
+        results = []
+        for filename in self.ready_files():
+            results.append(self.process(filename))
+            self._processed_stat[filename] = self._last_stat[filename]
+        return results
+
+    def process(self, filename):
+        debug_logger.debug(f"watch folder processing {filename}")
+        job = BatchJob(filename, self.spec, self.output_dir)
+        result = run_job(job)
+        result["n_new_events"] = 0
+        if result["status"] == "ok":
+            self.latest_recording = job.recording
+        if result["status"] == "ok" and job.idealization_cache is not None:
+            events = job.idealization_cache.get_events(
+                time_unit=self.time_unit, trace_unit=self.trace_unit
+            )
+            result["n_new_events"] = self.append_events(filename, events)
+        return result
+
+    def append_events(self, filename, events):
+        """Add the events of the episodes of `filename` that are not in the
+        table yet and return their number."""
+        seen = self._episodes.setdefault(filename, set())
+        new = ~np.isin(events[:, 0], list(seen))
+        events = events[new]
+        seen.update(events[:, 0].astype(int).tolist())
+        if not len(events):
+            return 0
+        self.event_files.extend([filename] * len(events))
+        self.event_tables.append(events)
+        row_format = (
+            ",".join(
+                ['"%s"'] + [f"%.{PRECISIONS[unit]}f" for unit in self.column_units()]
+            )
+            + "\n"
+        )
+        name = os.path.basename(filename)
+        with open(self.event_table_path, "a") as f:
+            for row in events:
+                f.write(row_format % (name, *row))
+        ana_logger.info(f"added {len(events)} events of {filename} to the table")
+        return len(events)
+
+    def run(self, poll_interval=2.0, should_stop=None):
+        """Poll every `poll_interval` seconds until `should_stop` returns true
+        or the process is interrupted."""
+        try:
+            while should_stop is None or not should_stop():
+                for result in self.poll():
+                    print(format_result(result), flush=True)
+                time.sleep(poll_interval)
+        except KeyboardInterrupt:
+            pass
+
+
+def format_result(result):
+    line = f"{result['status']:6} {result['file']}"
+    if result["error"] is not None:
+        line += f": {result['error']} (see {result['log']})"
+    else:
+        line += f": {result['n_new_events']} new events"
+    return line
+
+
+def display_help():
+    print(
+        """Usage: ascam watch [--interval=SECONDS] [--outdir=DIR] SPEC DIRECTORY
+
+            SPEC : JSON file with the loading arguments and processing steps,
+                   see `ascam batch`
+            DIRECTORY : the directory the recordings are written to
+            -i --interval : seconds between polls of the directory (default: 2)
+            -o --outdir : directory for the outputs (default: ./ASCAM_watch)
+            -h --help : display this message"""
+    )
+
+
+def main(argv=None):
+    """Entry point of `ascam watch`, returns the exit status."""
+    if argv is None:
+        argv = sys.argv[1:]
+    poll_interval = 2.0
+    output_dir = "./ASCAM_watch"
+    try:
+        options, args = getopt.getopt(argv, "i:o:h", ["interval=", "outdir=", "help"])
+    except getopt.GetoptError as err:
+        print(err)
+        display_help()
+        return 2
+    for opt, arg in options:
+        if opt in ("-i", "--interval"):
+            poll_interval = float(arg)
+        elif opt in ("-o", "--outdir"):
+            output_dir = arg
+        elif opt in ("-h", "--help"):
+            display_help()
+            return 0
+    if len(args) != 2:
+        display_help()
+        return 2
+
+    with open(args[0]) as f:
+        spec = json.load(f)
+    watcher = FolderWatcher(args[1], spec, output_dir)
+    print(f"watching {args[1]}, press Ctrl+C to stop", flush=True)
+    watcher.run(poll_interval)
+    return 0
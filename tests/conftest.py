@@ -0,0 +1,61 @@
+import copy
+
+import pytest
+
+from src.core import simulate_recording
+
+# filter, idealize and export the recordings of `make_recording`
+BATCH_SPEC = {
+    "steps": [
+        {"step": "gauss_filter", "filter_freq": 2000},
+        {"step": "idealize", "amplitudes": [0, -2], "trace_unit": "pA"},
+        {"step": "export_events"},
+        {"step": "export_idealization", "filetype": "npz"},
+    ]
+}
+
+
+@pytest.fixture
+def make_recording():
+    """Return a function that simulates a recording of a channel switching
+    between 0 and -2 pA, the same arguments give the same recording.
+
+    Args:
+        n_episodes - the number of episodes
+        n_points - the number of samples per episode
+        sampling_rate - the sampling rate [Hz]
+        seed - seed of the simulation
+        kwargs - further arguments of `simulate_recording`"""
+
+    def make(n_episodes=4, n_points=4000, sampling_rate=4e4, seed=0, **kwargs):
+        kwargs.setdefault("noise_std", 0.1e-12)
+        kwargs.setdefault("command_voltage", None)
+        return simulate_recording(
+            [[0, 200], [200, 0]],
+            [0, -2e-12],
+            n_episodes=n_episodes,
+            duration=n_points / sampling_rate,
+            sampling_rate=sampling_rate,
+            seed=seed,
+            **kwargs,
+        )
+
+    return make
+
+
+@pytest.fixture
+def save_recording(make_recording):
+    """Return a function that saves a recording of `make_recording` as a
+    snapshot to `filepath`, it takes the same keyword arguments."""
+
+    def save(filepath, n_episodes=3, **kwargs):
+        recording = make_recording(n_episodes, filename=filepath, **kwargs)
+        recording.save_snapshot(filepath)
+        return recording
+
+    return save
+
+
+@pytest.fixture
+def batch_spec():
+    return copy.deepcopy(BATCH_SPEC)
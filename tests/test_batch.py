@@ -0,0 +1,59 @@
+import json
+
+from src import batch
+
+
+def test_batch_processes_files_in_parallel(tmp_path, save_recording, batch_spec):
+    files = [str(tmp_path / f"rec{i}.ascam") for i in range(2)]
+    for filepath in files:
+        save_recording(filepath)
+    missing = str(tmp_path / "missing.ascam")
+    output_dir = tmp_path / "out"
+
+    results = batch.run_batch(files + [missing], batch_spec, str(output_dir), jobs=2)
+
+    assert [result["status"] for result in results] == ["ok", "ok", "failed"]
+    for result in results[:2]:
+        assert result["n_episodes"] == 3
+        assert len(result["outputs"]) == 2
+        for output in result["outputs"]:
+            assert (output_dir / output).exists()
+    assert "FileNotFoundError" in results[2]["error"]
+    assert "Traceback" in (output_dir / "missing_ascam.log").read_text()
+    assert "gauss_filter" in (output_dir / "rec0_ascam.log").read_text()
+    summary = json.loads((output_dir / batch.SUMMARY_FILE).read_text())
+    assert summary["n_files"] == 3 and summary["n_failed"] == 1
+
+
+def test_batch_rejects_unknown_step(tmp_path, save_recording):
+    filepath = str(tmp_path / "rec.ascam")
+    save_recording(filepath)
+    spec = {"steps": [{"step": "smooth"}]}
+    (result,) = batch.run_batch([filepath], spec, str(tmp_path), jobs=1)
+    assert result["status"] == "failed"
+    assert "Unknown batch step 'smooth'" in result["error"]
+
+
+def test_outputs_of_files_with_the_same_name_are_kept_apart(
+    tmp_path, save_recording, batch_spec
+):
+    files = []
+    for directory in ["day1", "day2"]:
+        (tmp_path / directory).mkdir()
+        files.append(str(tmp_path / directory / "rec.ascam"))
+        save_recording(files[-1])
+    assert batch.output_names(files + ["rec.mat"]) == [
+        "rec_ascam_1",
+        "rec_ascam_2",
+        "rec_mat",
+    ]
+
+    output_dir = tmp_path / "out"
+    results = batch.run_batch(files, batch_spec, str(output_dir), jobs=2)
+    assert [result["status"] for result in results] == ["ok", "ok"]
+    outputs = results[0]["outputs"] + results[1]["outputs"]
+    assert len(set(outputs)) == 4
+    assert {result["log"] for result in results} == {
+        str(output_dir / "rec_ascam_1.log"),
+        str(output_dir / "rec_ascam_2.log"),
+    }
@@ -0,0 +1,125 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.utils import round_off_tables, write_csv_table
+
+
+def test_write_csv_table_matches_pandas(tmp_path):
+    rng = np.random.default_rng(0)
+    table = np.column_stack(
+        (
+            np.arange(1000),
+            rng.normal(0, 3, 1000),
+            rng.exponential(1e3, 1000),
+        )
+    )
+    table[5, 1] = np.nan
+    table[7, 2] = -0.0
+    header = ["Episode Number", "Amplitude [pA]", "Duration, [us]"]
+    units = ["int", "pA", "us"]
+
+    expected = round_off_tables(pd.DataFrame(table.astype(object), columns=header), units)
+    expected.to_csv(tmp_path / "expected.csv")
+    write_csv_table(tmp_path / "out.csv", table, header, units, chunk_size=64)
+
+    assert (tmp_path / "out.csv").read_bytes() == (
+        tmp_path / "expected.csv"
+    ).read_bytes()
+
+
+@pytest.fixture
+def recording(make_recording):
+    """A recording whose idealization is the simulated current."""
+    recording, states = make_recording(
+        n_episodes=5, n_points=2000, noise_std=0, return_states=True
+    )
+    for episode, episode_states in zip(recording.series, states):
+        episode.idealization = np.array([0, -2e-12])[episode_states]
+        episode.id_time = episode.time
+    return recording
+
+
+def test_export_idealization_matches_savetxt(tmp_path, recording):
+    params = dict(
+        amplitudes=[0, -1, -2],
+        thresholds=None,
+        resolution=None,
+        interpolation_factor=1,
+    )
+    recording.export_idealization(
+        str(tmp_path / "out.csv"), ["All"], "ms", "pA", **params
+    )
+
+    episodes = recording.series
+    expected = np.vstack(
+        [episodes[0].id_time * 1e3] + [e.idealization * 1e12 for e in episodes]
+    )
+    np.savetxt(
+        tmp_path / "expected.csv",
+        expected.T,
+        delimiter=",",
+        header="amplitudes = [0, -1, -2];thresholds = None;resolution = None;"
+        "interpolation_factor = 1\n Time, "
+        + ", ".join(f"Episode number {e.n_episode}" for e in episodes),
+    )
+    assert (tmp_path / "out.csv").read_bytes() == (
+        tmp_path / "expected.csv"
+    ).read_bytes()
+
+
+def test_export_idealization_npz_round_trip(tmp_path, recording):
+    from src.core.readdata import load_idealization
+
+    recording.export_idealization(
+        str(tmp_path / "out"),
+        ["All"],
+        "ms",
+        "pA",
+        amplitudes=[0, -1, -2],
+        thresholds=[-0.5, -1.5],
+        resolution=None,
+        interpolation_factor=1,
+        filetype="npz",
+    )
+    time, episode_numbers, idealizations, params = load_idealization(
+        tmp_path / "out.npz"
+    )
+    np.testing.assert_array_equal(time, recording.series[0].id_time * 1e3)
+    np.testing.assert_array_equal(episode_numbers, np.arange(5))
+    for episode, idealization in zip(recording.series, idealizations):
+        np.testing.assert_array_equal(idealization, episode.idealization * 1e12)
+    assert params["trace_unit"] == "pA"
+    assert np.isnan(params["resolution"])
+
+
+def test_export_matlab_matches_savemat(tmp_path, recording):
+    from scipy import io
+
+    recording.export_matlab(
+        str(tmp_path / "out.mat"), "raw_", ["All"], False, False, trace_unit="pA"
+    )
+    fill_length = len(str(len(recording["raw_"])))
+    expected = {"time": recording["raw_"][0].time}
+    for episode in recording.series:
+        expected["trace" + str(episode.n_episode).zfill(fill_length)] = (
+            episode.trace * 1e12
+        )
+    io.savemat(tmp_path / "expected.mat", expected)
+    # the first 116 bytes of the header hold the creation date
+    assert (tmp_path / "out.mat").read_bytes()[116:] == (
+        tmp_path / "expected.mat"
+    ).read_bytes()[116:]
+
+    recording.export_matlab(
+        str(tmp_path / "compressed.mat"),
+        "raw_",
+        ["All"],
+        False,
+        False,
+        trace_unit="pA",
+        do_compression=True,
+    )
+    loaded = io.loadmat(tmp_path / "compressed.mat")
+    for key, value in expected.items():
+        np.testing.assert_array_equal(loaded[key][0], value)
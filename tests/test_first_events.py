@@ -38,3 +38,63 @@ def test_detect_first_events():
     assert all(np.isnan(first_events_list[3][:, -1]))
     assert len(starttimes[np.isnan(starttimes)]) == 1
     assert first_events_list[2][1, 2] < first_events_list[2][1, 1]
+
+
+def test_get_first_events_matches_per_episode_detection():
+    from src.core import Episode, Recording
+
+    time = np.linspace(0, 100, 3010) * 1e-3
+    piezo = np.hstack([np.zeros(500), 4 * np.ones(1510), np.zeros(1000)])
+    states = -np.array([0.0, 1.0, 2.0])
+    recording = Recording()
+    recording["raw_"] = []
+    for i in range(6):
+        # random sequences of events in the states
+        durations = np.random.randint(50, 400, size=20)
+        levels = np.random.choice(states, size=20)
+        idealization = np.repeat(levels, durations)[: time.size]
+        idealization = np.pad(idealization, (0, time.size - idealization.size))
+        trace = (idealization + (np.random.rand(time.size) - 0.5) * 1e-3) * 1e-12
+        episode = Episode(time, trace, n_episode=i, piezo=piezo)
+        episode.idealization = idealization * 1e-12
+        episode.id_time = episode.time
+        recording["raw_"].append(episode)
+    recording.lists = {"All": (list(range(6)), None)}
+
+    threshold = -0.5e-12
+    found_states = np.unique(
+        np.hstack([e.idealization for e in recording.series])
+    )[::-1]
+    first_events = recording.get_first_events(threshold)
+    for episode, episode_first_events in zip(recording.series, first_events):
+        first_activation, expected = detect_first_events(
+            episode.time,
+            episode.trace,
+            threshold,
+            episode.piezo,
+            episode.idealization,
+            found_states,
+        )
+        assert episode.first_activation == first_activation
+        assert np.array_equal(episode_first_events, expected, equal_nan=True)
+
+    table = recording.create_first_event_table(time_unit="s").astype(float)
+    assert np.all(table[:, 0] == np.arange(6))
+    assert np.array_equal(table[:, 2::2], first_events[:, 0], equal_nan=True)
+    assert np.array_equal(table[:, 3::2], first_events[:, 1], equal_nan=True)
+
+
+def test_detect_fa_matches_threshold_scan():
+    from src.core import Episode, Recording
+
+    time = np.arange(1000) * 1e-4
+    recording = Recording()
+    recording["raw_"] = [
+        Episode(time, np.random.normal(0, 1, time.size), n_episode=i)
+        for i in range(5)
+    ]
+    for threshold in [-3.5, -2.0, -0.1, 0.0, -10.0]:
+        recording.detect_fa(threshold)
+        for episode in recording.series:
+            expected = time[np.argmax(episode.trace < threshold)]
+            assert episode.first_activation == expected
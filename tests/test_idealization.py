@@ -70,3 +70,218 @@ def test_extract_events(trace, events):
     print(out)
     print(events)
     assert np.all(out == events)
+
+
+def test_dwell_time_hist_matches_event_table():
+    from src.core import Episode, Recording, IdealizationCache
+
+    amplitudes = np.array([0, -1, -2], dtype=float) * 1e-12
+    time = np.arange(300) * 1e-4
+    recording = Recording()
+    recording["raw_"] = [
+        Episode(time, np.random.choice(amplitudes, size=time.size), n_episode=i)
+        for i in range(4)
+    ]
+    recording.lists = {"All": (list(range(4)), None)}
+    cache = IdealizationCache(recording, amplitudes, interpolation_factor=1)
+
+    events = cache.get_events(time_unit="ms").astype(float)
+    for amp in amplitudes:
+        durations = events[np.isclose(events[:, 1] * 1e12, amp * 1e12), 2]
+        expected, _ = np.histogram(np.log10(durations), 10)
+        heights, bins = cache.dwell_time_hist(amp, 10, "ms", root_counts=False)
+        assert np.all(heights == expected)
+    hists = cache.dwell_time_hists(amplitudes, n_bins=5, root_counts=False)
+    assert sum(h.sum() for h, _ in hists.values()) == len(events)
+
+
+@pytest.mark.parametrize("method", ["spline", "polyphase"])
+def test_interpolated_trace_is_cached_per_series(method):
+    from src.core import Episode, Recording
+    from src.core.analysis import interpolate
+
+    time = np.arange(200) * 1e-4
+    recording = Recording()
+    recording["raw_"] = [
+        Episode(time, np.sin(time * (i + 1) * 1e3), n_episode=i) for i in range(5)
+    ]
+    signal, id_time = recording.interpolated_trace(3, 4, method, block_size=2)
+    expected, expected_time = interpolate(recording.episode(3).trace, time, 4, method)
+    assert np.allclose(signal, expected)
+    assert np.all(id_time == expected_time)
+    # the second episode of the block was interpolated together with the first
+    params, cache = recording.derived_cache()["interpolation"]
+    assert params == (4, method) and set(cache) == {2, 3}
+    assert recording.interpolated_trace(3, 4, method)[0] is signal
+    # only the interpolation with the last factor is kept
+    recording.interpolated_trace(3, 2, method, block_size=2)
+    params, cache = recording.derived_cache()["interpolation"]
+    assert params == (2, method) and set(cache) == {2, 3}
+    assert recording.interpolated_trace(3, 4, method)[0] is not signal
+    # replacing the series invalidates the interpolation
+    recording["raw_"] = recording["raw_"]
+    assert "interpolation" not in recording.derived_cache()
+
+
+def reference_threshold_crossing(signal, amplitudes, thresholds):
+    amplitudes = np.sort(amplitudes)[::-1]
+    idealization = np.zeros(len(signal))
+    idealization[signal > thresholds[0]] = amplitudes[0]
+    for thresh, amp in zip(thresholds, amplitudes[1:]):
+        idealization[signal < thresh] = amp
+    return idealization
+
+
+@pytest.mark.parametrize(
+    "amplitudes, thresholds",
+    [
+        (np.array([0, -1, -2, -3.0]), np.array([-0.5, -1.5, -2.5])),
+        (np.array([0, -1, -2, -3.0]), np.array([-0.2, -1.9, -2.1])),
+        # thresholds not in descending order use the sequential method
+        (np.array([0, -1, -2.0]), np.array([-1.5, -0.5])),
+    ],
+)
+def test_threshold_crossing(amplitudes, thresholds):
+    signal = np.random.uniform(-4, 1, 1000)
+    out = Idealizer.threshold_crossing(signal, amplitudes, thresholds)
+    assert np.all(out == reference_threshold_crossing(signal, amplitudes, thresholds))
+
+
+def _recording_with_noise(n_episodes=3):
+    from src.core import Episode, Recording
+
+    rng = np.random.default_rng(0)
+    time = np.arange(500) * 1e-4
+    recording = Recording()
+    recording["raw_"] = [
+        Episode(time, rng.uniform(-3, 1, time.size), n_episode=i)
+        for i in range(n_episodes)
+    ]
+    return recording
+
+
+def _cached_levels(recording, n_episode):
+    return recording.derived_cache()["levels"][1][n_episode]
+
+
+def test_set_params_reuses_level_indices():
+    from src.core import IdealizationCache
+
+    recording = _recording_with_noise()
+    thresholds = np.array([-0.5, -1.5])
+    cache = IdealizationCache(recording, np.array([0, -1, -2.0]), thresholds, None, 1)
+    cache.idealize_series()
+    levels = _cached_levels(recording, 1)
+
+    cache.set_params(np.array([0.1, -0.9, -2.2]), thresholds, None, 1)
+    assert cache.ind_idealized == set()
+    cache.idealize_series()
+    assert _cached_levels(recording, 1) is levels
+    expected = reference_threshold_crossing(
+        recording.episode(1).trace, cache.amplitudes, thresholds
+    )
+    assert np.all(recording.episode(1).idealization == expected)
+
+    cache.set_params(cache.amplitudes, np.array([-0.4, -1.5]), None, 1)
+    cache.idealize_series()
+    assert _cached_levels(recording, 1) is not levels
+
+
+@pytest.mark.parametrize("amplitudes", [np.array([0, -2, -4.0]), np.array([0, -2.0])])
+def test_set_params_without_thresholds_uses_new_midpoints(amplitudes):
+    from src.core import IdealizationCache
+
+    recording = _recording_with_noise()
+    cache = IdealizationCache(recording, np.array([0, -1, -2.0]), None, None, 1)
+    cache.idealize_series()
+
+    cache.set_params(amplitudes, None, None, 1)
+    cache.idealize_series()
+    for episode in recording.series:
+        expected, _ = Idealizer.idealize_episode(
+            episode.trace, episode.time, amplitudes
+        )
+        assert np.all(episode.idealization == expected)
+
+
+def test_levels_are_dropped_when_the_series_is_replaced():
+    from src.core import Episode, IdealizationCache
+
+    recording = _recording_with_noise()
+    cache = IdealizationCache(recording, np.array([0, -1, -2.0]), None, None, 1)
+    cache.idealize_series()
+
+    recording["raw_"] = [
+        Episode(episode.time, episode.trace - 1, n_episode=episode.n_episode)
+        for episode in recording["raw_"]
+    ]
+    cache.clear_idealization()
+    cache.idealize_series()
+    for episode in recording.series:
+        expected, _ = Idealizer.idealize_episode(
+            episode.trace, episode.time, cache.amplitudes
+        )
+        assert np.all(episode.idealization == expected)
+
+
+def test_results_of_outdated_parameters_are_discarded():
+    from src.core import IdealizationCache
+
+    recording = _recording_with_noise()
+    cache = IdealizationCache(recording, np.array([0, -1, -2.0]), None, None, 1)
+    episode = recording.episode(0)
+    signal = cache._signal
+
+    def change_params_while_idealizing(*args):
+        # the parameters change after the old ones were read
+        cache.set_params(np.array([0, -2.0]), None, None, 1)
+        return signal(*args)
+
+    cache._signal = change_params_while_idealizing
+    cache.idealize_episode(0)
+    assert episode.idealization is None
+    cache._signal = signal
+    cache.idealize_episode(0)
+    expected, _ = Idealizer.idealize_episode(
+        episode.trace, episode.time, np.array([0, -2.0])
+    )
+    assert np.all(episode.idealization == expected)
+
+
+def test_idealize_series_around_an_episode():
+    from src.core import IdealizationCache
+
+    recording = _recording_with_noise(n_episodes=5)
+    cache = IdealizationCache(recording, np.array([0, -1, -2.0]), None, None, 1)
+    order = []
+
+    def progress(done, total):
+        (new,) = cache.ind_idealized - set(order)
+        order.append(new)
+
+    cache.idealize_series(progress=progress, around=3)
+    assert order[:3] == [3, 2, 4]
+    assert cache.ind_idealized == set(range(5))
+
+
+def test_extract_series_events():
+    traces = [trace for trace, _ in test_traces if trace.size == 6]
+    out = Idealizer.extract_series_events(np.vstack(traces), np.arange(6), [4, 5, 6])
+    expected = np.concatenate(
+        [
+            np.column_stack((np.full(len(events), label), events))
+            for label, (trace, events) in zip([4, 5, 6], test_traces)
+        ]
+    )
+    assert np.all(out == expected)
+
+
+@pytest.mark.parametrize("trace, events", test_traces)
+def test_step_curve(trace, events):
+    time = np.arange(trace.size)
+    x, y = Idealizer.step_curve(trace, time)
+    assert x.size == y.size == 2 * len(events)
+    # each sample lies on the segment of the event it belongs to
+    segment = np.searchsorted(x[::2], time, side="right") - 1
+    np.testing.assert_array_equal(y[::2][segment], trace)
+    assert x[0] == time[0] and x[-1] == time[-1]
@@ -0,0 +1,35 @@
+import re
+import sys
+import subprocess
+
+# cumulative time [us] that importing `src.core` may take
+IMPORT_BUDGET = 500000
+# modules that are only needed for some file types or exports
+LAZY_MODULES = ["scipy", "pandas", "axographio", "PySide2", "pyqtgraph"]
+
+
+def _import_times(statement):
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # cumulative import time of every module that was imported
+    times = dict()
+    for line in process.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \| *(\S+)", line)
+        if match is not None:
+            times[match.group(2)] = int(match.group(1))
+    return times
+
+
+def test_core_import_skips_heavy_modules():
+    times = _import_times("import src.core")
+    for module in LAZY_MODULES:
+        assert not [name for name in times if name.split(".")[0] == module]
+
+
+def test_core_import_time():
+    times = _import_times("import src.core")
+    assert times["src.core"] < IMPORT_BUDGET
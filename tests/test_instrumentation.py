@@ -0,0 +1,77 @@
+import pytest
+import numpy as np
+
+from src import profiling
+from src.core import simulate_recording
+from src.utils import instrumentation, instrumented, measure
+
+
+def test_instrumented_functions_are_measured():
+    measurements = []
+
+    @instrumented(name="double")
+    def double(x):
+        return 2 * x
+
+    instrumentation.add_listener(measurements.append)
+    try:
+        assert double(3) == 6
+    finally:
+        instrumentation.remove_listener(measurements.append)
+    (measurement,) = measurements
+    assert measurement.name == "double"
+    assert measurement.wall >= 0
+    assert measurement.peak_bytes is None
+    assert instrumentation.RECENT[-1] is measurement
+
+
+def test_failing_listener_does_not_replace_the_result():
+    def fail(measurement):
+        raise RuntimeError("listener failed")
+
+    instrumentation.add_listener(fail)
+    try:
+        assert instrumented(sum)([1, 2]) == 3
+        with pytest.raises(KeyError):
+            with measure("lookup"):
+                dict()["missing"]
+    finally:
+        instrumentation.remove_listener(fail)
+
+
+def test_nested_memory_peaks():
+    measurements = []
+    instrumentation.add_listener(measurements.append)
+    instrumentation.set_memory_tracing(True)
+    try:
+        with measure("outer"):
+            with measure("inner"):
+                data = np.ones(2 ** 20)
+                del data
+            with measure("small"):
+                data = np.ones(10)
+                del data
+    finally:
+        instrumentation.set_memory_tracing(False)
+        instrumentation.remove_listener(measurements.append)
+    inner, small, outer = measurements
+    assert inner.peak_bytes >= 8 * 2 ** 20
+    assert small.peak_bytes < 8 * 2 ** 20
+    # the peak of the inner operation is kept although it was reset later
+    assert outer.peak_bytes >= inner.peak_bytes
+
+
+def test_profile_command(tmp_path, capsys):
+    filename = str(tmp_path / "simulated.ascam")
+    recording = simulate_recording(
+        [[0, 500], [500, 0]], [0, -2e-12], n_episodes=5, duration=0.05, seed=1
+    )
+    recording.save_snapshot(filename)
+    output = str(tmp_path / "run.prof")
+
+    assert profiling.main(["--top=10", f"--output={output}", filename]) == 0
+    printed = capsys.readouterr().out
+    assert "cumulative" in printed
+    assert "Recording.gauss_filter_series" in printed
+    assert "Recording.series_hist" in printed
+    assert (tmp_path / "run.prof").exists()
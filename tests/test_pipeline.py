@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from src.core import IdealizationCache, Pipeline
+
+
+def test_pipeline_matches_series_methods(make_recording):
+    recording = make_recording()
+    raw = [episode.trace.copy() for episode in recording.series]
+    pipeline = (
+        Pipeline(recording)
+        .baseline(intervals=[[0, 10]], selection="intervals", time_unit="ms")
+        .gauss(2000)
+    )
+    traces = list(pipeline.traces())
+    # nothing is added to the recording until `run`
+    assert list(recording.keys()) == ["raw_"]
+    for episode, trace in zip(recording.series, raw):
+        np.testing.assert_array_equal(episode.trace, trace)
+
+    recording.baseline_correction(
+        intervals=[[0, 10]], selection="intervals", time_unit="ms"
+    )
+    recording.gauss_filter_series(2000)
+    for episode, trace in zip(recording.series, traces):
+        np.testing.assert_array_equal(episode.trace, trace)
+
+    recording.current_datakey = "raw_"
+    assert pipeline.run() == "BC_GFILTER2000_"
+
+
+def test_consecutive_gauss_filters_are_fused(make_recording):
+    recording = make_recording()
+    pipeline = Pipeline(recording).gauss(2000).gauss(3000)
+    (step,) = pipeline.plan()
+    assert step.params["filter_freqs"] == [2000, 3000]
+
+    recording.gauss_filter_series(2000)
+    recording.gauss_filter_series(3000)
+    pad = step.window.size
+    for episode, trace in zip(recording.series, pipeline.traces()):
+        np.testing.assert_allclose(trace[pad:-pad], episode.trace[pad:-pad])
+
+
+def test_run_applies_gauss_filters_one_after_the_other(make_recording):
+    recording = make_recording()
+    datakey = Pipeline(recording).gauss(2000).gauss(3000).run()
+    assert datakey == "GFILTER2000_GFILTER3000_"
+    piped = [episode.trace for episode in recording.series]
+
+    recording.current_datakey = "raw_"
+    recording.gauss_filter_series(2000)
+    recording.gauss_filter_series(3000)
+    assert recording.current_datakey == "GFILTER2000_GFILTER3000_"
+    # the whole trace matches, including its ends
+    for episode, trace in zip(recording.series, piped):
+        np.testing.assert_array_equal(episode.trace, trace)
+
+
+def test_run_without_new_series_is_refused(make_recording):
+    recording = make_recording()
+    raw = recording["raw_"]
+    with pytest.raises(ValueError):
+        Pipeline(recording).idealize(np.array([0, -2e-12])).run()
+    assert recording["raw_"] is raw
+    assert list(recording.keys()) == ["raw_"]
+
+
+def test_pipeline_events_match_idealization_cache(make_recording):
+    recording = make_recording()
+    amplitudes = np.array([0.5, -1.5]) * 1e-12
+    events = Pipeline(recording).idealize(amplitudes).events()
+    assert all(episode.idealization is None for episode in recording.series)
+
+    cache = IdealizationCache(recording, amplitudes, np.array([-0.5e-12]))
+    np.testing.assert_array_equal(events, cache.events())
@@ -0,0 +1,35 @@
+import threading
+
+from src.core.prefetch import EpisodePrefetcher
+
+
+def _prefetched(prefetcher, episode_numbers, current, expected_count):
+    done = []
+    finished = threading.Event()
+
+    def task(n_episode):
+        done.append(n_episode)
+        if len(done) == expected_count:
+            finished.set()
+
+    prefetcher.request(episode_numbers, current, task)
+    assert finished.wait(5)
+    return done
+
+
+def test_prefetch_follows_browsing_direction():
+    prefetcher = EpisodePrefetcher(n_episodes=2)
+    episodes = list(range(10, 20))
+    assert _prefetched(prefetcher, episodes, 15, 4) == [16, 17, 14, 13]
+    # moving backwards prepares the earlier episodes first
+    assert _prefetched(prefetcher, episodes, 14, 4) == [13, 12, 15, 16]
+    # no episodes beyond the ends of the series
+    assert _prefetched(prefetcher, episodes, 10, 2) == [11, 12]
+    prefetcher.stop()
+
+
+def test_prefetch_survives_failing_task():
+    prefetcher = EpisodePrefetcher(n_episodes=1)
+    prefetcher.request([0, 1, 2], 1, lambda n: 1 / 0)
+    assert _prefetched(prefetcher, [0, 1, 2], 2, 1) == [1]
+    prefetcher.stop()
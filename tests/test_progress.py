@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+
+class Stop(Exception):
+    pass
+
+
+@pytest.fixture
+def recording(make_recording):
+    return make_recording(n_points=1000, sampling_rate=1e4)
+
+
+def test_filter_reports_progress(recording):
+    calls = []
+    recording.gauss_filter_series(1000, progress=lambda *args: calls.append(args))
+    assert calls == [(1, 4), (2, 4), (3, 4), (4, 4)]
+    assert recording.current_datakey == "GFILTER1000_"
+
+
+def test_stopped_filter_leaves_no_series(recording):
+
+    def progress(done, total):
+        if done == 2:
+            raise Stop()
+
+    with pytest.raises(Stop):
+        recording.gauss_filter_series(1000, progress=progress)
+    assert list(recording.keys()) == ["raw_"]
+    assert recording.current_datakey == "raw_"
+
+
+def test_filter_can_return_the_series(recording):
+    datakey, series = recording.gauss_filter_series(1000, add=False)
+    assert datakey == "GFILTER1000_"
+    assert len(series) == 4
+    assert list(recording.keys()) == ["raw_"]
+    recording.add_series(datakey, series)
+    assert recording.current_datakey == "GFILTER1000_"
+
+
+def test_stopped_export_leaves_no_file(tmp_path, recording):
+    from src.core import IdealizationCache
+
+    cache = IdealizationCache(recording, np.array([0, -1.0]))
+    filepath = str(tmp_path / "events.csv")
+
+    def progress(done, total):
+        raise Stop()
+
+    with pytest.raises(Stop):
+        cache.export_events(filepath, progress=progress)
+    assert not (tmp_path / "events.csv").exists()
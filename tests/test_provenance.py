@@ -0,0 +1,42 @@
+import time
+
+from src.utils import provenance
+
+
+def test_version_is_cached(tmp_path, monkeypatch):
+    calls = []
+
+    def collect_version():
+        calls.append(1)
+        return "numpy==1.0\n", "commit abc"
+
+    monkeypatch.setattr(provenance, "collect_version", collect_version)
+    first = provenance.get_version(tmp_path)
+    second = provenance.get_version(tmp_path)
+    assert first == second == ("numpy==1.0\n", "commit abc")
+    assert len(calls) == 1
+
+
+def test_outdated_versions_are_removed(tmp_path, monkeypatch):
+    monkeypatch.setattr(provenance, "collect_version", lambda: ("", ""))
+    for key in ("old", "new"):
+        monkeypatch.setattr(provenance, "cache_key", lambda: key)
+        provenance.get_version(tmp_path)
+    assert [path.name for path in tmp_path.iterdir()] == ["version_new.json"]
+
+
+def test_startup_does_not_wait_for_version(tmp_path, monkeypatch):
+    def collect_version():
+        time.sleep(1)
+        return "", ""
+
+    monkeypatch.setattr(provenance, "collect_version", collect_version)
+    start = time.perf_counter()
+    thread = provenance.log_version_in_background(tmp_path)
+    assert time.perf_counter() - start < 0.2
+    thread.join()
+
+    # with a warm cache the version is read without running pip or git
+    start = time.perf_counter()
+    provenance.get_version(tmp_path)
+    assert time.perf_counter() - start < 0.2
@@ -0,0 +1,51 @@
+import numpy as np
+
+from src.utils import MinMaxPyramid
+
+
+def test_levels_hold_the_envelope_of_the_signal():
+    time = np.arange(100003) * 1e-4
+    signal = np.random.normal(0, 1, time.size)
+    pyramid = MinMaxPyramid(time, signal)
+    for bin_size, level in zip(pyramid.bin_sizes, pyramid.levels):
+        starts = np.arange(0, signal.size, bin_size)
+        np.testing.assert_array_equal(level[:, 0], np.minimum.reduceat(signal, starts))
+        np.testing.assert_array_equal(level[:, 1], np.maximum.reduceat(signal, starts))
+    assert pyramid.levels[-1].shape[0] <= 256
+
+
+def test_slice_covers_the_visible_range():
+    time = np.arange(1000000) * 1e-5
+    signal = np.random.normal(0, 1, time.size)
+    pyramid = MinMaxPyramid(time, signal)
+
+    x, y = pyramid.slice(time[0], time[-1], 1000)
+    assert 1000 <= x.size / 2 <= 4000
+    assert y.min() == signal.min() and y.max() == signal.max()
+
+    x, y = pyramid.slice(2.0, 3.0, 500)
+    assert x[0] <= 2.0 and x[-1] >= 3.0 - 1e-3
+    visible = (time >= 2.0) & (time <= 3.0)
+    assert y.min() <= signal[visible].min() and y.max() >= signal[visible].max()
+    assert x.size / 2 <= 4 * 500
+
+    # zoomed in far enough the samples themselves are drawn
+    x, y = pyramid.slice(2.0, 2.001, 500)
+    first = np.searchsorted(time, x[0])
+    np.testing.assert_array_equal(x, time[first : first + x.size])
+    np.testing.assert_array_equal(y, signal[first : first + x.size])
+    assert x[0] <= 2.0 and x[-1] >= 2.001
+
+
+def test_recording_keeps_the_pyramids_of_recent_episodes(make_recording):
+    from src.core import recording as recording_module
+
+    n_kept = recording_module.PYRAMID_CACHE_SIZE
+    recording = make_recording(n_episodes=n_kept + 2, n_points=400)
+    first = recording.trace_pyramid(0)
+    for n_episode in range(1, n_kept + 2):
+        recording.trace_pyramid(n_episode)
+    cache = recording.derived_cache()["pyramid"]
+    assert len(cache) == n_kept
+    assert 0 not in cache
+    assert recording.trace_pyramid(0) is not first
@@ -0,0 +1,113 @@
+import os
+
+import numpy as np
+import pytest
+
+from src.core import Recording, SessionJournal
+
+
+@pytest.fixture
+def recording(make_recording):
+    recording = make_recording(n_points=1000, sampling_rate=1e4, filename="test.mat")
+    recording.lists["good"] = ([1, 2], "g")
+    return recording
+
+
+def test_journal_restores_latest_state(tmp_path, recording):
+    journal = SessionJournal(str(tmp_path / "journal"))
+    # the time array is shared by all episodes and stored once
+    assert journal.save(recording) == 5
+
+    recording.gauss_filter_series(1000)
+    episode = recording["raw_"][2]
+    episode.idealization = np.sign(episode.trace)
+    episode.first_activation = np.float64(0.01)
+    episode.manual_first_activation = True
+    # only the changed and new arrays are written
+    assert journal.save(recording) == 5
+
+    restored = SessionJournal(str(tmp_path / "journal")).restore()
+    assert list(restored.keys()) == list(recording.keys())
+    assert restored.lists == recording.lists
+    assert restored.current_datakey == recording.current_datakey
+    for datakey in recording:
+        for original, copy in zip(recording[datakey], restored[datakey]):
+            np.testing.assert_array_equal(original.trace, copy.trace)
+            assert original.n_episode == copy.n_episode
+    copy = restored["raw_"][2]
+    np.testing.assert_array_equal(copy.idealization, episode.idealization)
+    assert copy.first_activation == 0.01 and copy.manual_first_activation
+
+
+def test_journal_skips_incomplete_state(tmp_path, recording):
+    journal = SessionJournal(str(tmp_path / "journal"))
+    journal.save(recording)
+    recording["raw_"][0].trace = np.zeros(1000)
+    journal.save(recording)
+    # a crash before all chunks of the last state were written
+    new_chunk = journal._chunk_path(journal._digest(recording["raw_"][0].trace))
+    os.remove(new_chunk)
+
+    restored = SessionJournal(str(tmp_path / "journal")).restore()
+    assert restored["raw_"][0].trace.any()
+
+    journal.save_in_background(recording)
+    journal.wait()
+    restored = SessionJournal(str(tmp_path / "journal")).restore()
+    np.testing.assert_array_equal(restored["raw_"][0].trace, np.zeros(1000))
+
+
+def test_snapshot_round_trip(tmp_path, recording):
+    from src.core import IdealizationCache
+
+    recording.gauss_filter_series(1000)
+    recording.interpolated_trace(0, 3)
+    recording["raw_"][1].first_activation = 0.02
+    recording["raw_"][1].manual_first_activation = True
+    cache = IdealizationCache(
+        recording, np.array([0.0, -2e-12]), interpolation_factor=1
+    )
+    cache.idealize_series()
+    events = cache.events()
+
+    for compress in (False, True):
+        filepath = str(tmp_path / f"snapshot_{compress}")
+        recording.save_snapshot(filepath, cache, compress=compress)
+        restored = Recording.from_file(filepath + ".ascam")
+
+        assert restored.lists == recording.lists
+        for datakey in recording:
+            for original, copy in zip(recording[datakey], restored[datakey]):
+                np.testing.assert_array_equal(original.trace, copy.trace)
+                np.testing.assert_array_equal(original.idealization, copy.idealization)
+        assert restored["raw_"][1].manual_first_activation
+        # derived data and the idealization cache are restored with it
+        np.testing.assert_array_equal(
+            restored.interpolated_trace(0, 3)[0], recording.interpolated_trace(0, 3)[0]
+        )
+        assert restored.idealization_cache.data is restored
+        np.testing.assert_array_equal(restored.idealization_cache.events(), events)
+        assert restored.series[0].trace.flags.writeable
+
+
+def test_failed_background_save_is_raised_by_wait(tmp_path, recording, monkeypatch):
+    journal = SessionJournal(str(tmp_path / "journal"))
+
+    def fail(snapshot):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(journal, "write", fail)
+    assert journal.save_in_background(recording)
+    with pytest.raises(OSError, match="disk full"):
+        journal.wait()
+    # the error is raised once
+    journal.wait()
+
+
+def test_discard_all_journals(tmp_path, recording):
+    for name in ("first", "second"):
+        SessionJournal(str(tmp_path / name)).save(recording)
+    assert len(SessionJournal.find_journals(str(tmp_path))) == 2
+
+    SessionJournal.discard_all(str(tmp_path))
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,60 @@
+import numpy as np
+
+from src.core import IdealizationCache
+from src.core.simulate import simulate_recording, simulate_dwells
+
+RATES = [[0, 1000], [500, 0]]
+
+
+def test_dwell_times_follow_rates():
+    rng = np.random.default_rng(0)
+    times, states = simulate_dwells(RATES, np.zeros(2000, dtype=int), 0, 1, rng)
+    with np.errstate(invalid="ignore"):
+        dwells = np.diff(times, axis=1)
+    left = states[:, :-1]
+    finite = np.isfinite(dwells)
+    # mean dwell in a state is the inverse of the rate of leaving it
+    assert np.isclose(dwells[finite & (left == 0)].mean(), 1e-3, rtol=0.05)
+    assert np.isclose(dwells[finite & (left == 1)].mean(), 2e-3, rtol=0.05)
+
+
+def test_piezo_step_and_rates_after():
+    recording, states = simulate_recording(
+        RATES,
+        [0, -2e-12],
+        n_episodes=200,
+        duration=0.05,
+        piezo_step=(0.01, 0.03),
+        rates_after=[[0, 0], [1e6, 0]],
+        noise_std=0,
+        seed=1,
+        return_states=True,
+    )
+    assert states.shape == (200, 2000)
+    assert len(recording.series) == 200
+    episode = recording.series[0]
+    assert recording.has_piezo and recording.has_command
+    assert episode.piezo[400:1200].min() > 0 and episode.piezo[:400].max() == 0
+    # the channel is closed before the step and closes right after it
+    assert not states[:, :400].any()
+    assert not states[:, 1210:].any()
+    assert np.isclose(states[:, 400:1200].mean(), 2 / 3, atol=0.05)
+    np.testing.assert_array_equal(episode.trace, np.array([0, -2e-12])[states[0]])
+
+
+def test_simulated_recording_can_be_idealized():
+    recording, states = simulate_recording(
+        RATES,
+        [0, -2e-12],
+        n_episodes=10,
+        noise_std=0.1e-12,
+        noise_exponent=1,
+        seed=2,
+        return_states=True,
+    )
+    noise = recording.series[0].trace - np.array([0, -2e-12])[states[0]]
+    assert np.isclose(noise.std(), 0.1e-12)
+    cache = IdealizationCache(recording, np.array([0, -2e-12]), np.array([-1e-12]))
+    cache.idealize_series()
+    idealized = np.array([episode.idealization for episode in recording.series])
+    assert np.mean(idealized == np.array([0, -2e-12])[states]) > 0.99
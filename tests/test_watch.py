@@ -0,0 +1,38 @@
+import numpy as np
+
+from src.watch import FolderWatcher, EVENT_TABLE_FILE
+
+
+def test_watcher_processes_new_and_growing_files(
+    tmp_path, save_recording, batch_spec
+):
+    watched = tmp_path / "acquisition"
+    watched.mkdir()
+    output_dir = tmp_path / "out"
+    watcher = FolderWatcher(
+        str(watched), batch_spec, str(output_dir), extensions=(".ascam",)
+    )
+    assert watcher.poll() == []
+
+    save_recording(str(watched / "cell1.ascam"), n_episodes=2)
+    # a file is only processed once it did not change between two polls
+    assert watcher.poll() == []
+    (result,) = watcher.poll()
+    assert result["status"] == "ok"
+    n_events = result["n_new_events"]
+    assert n_events > 0
+    assert watcher.poll() == []
+
+    # the file grows by one episode, only its events are added
+    save_recording(str(watched / "cell1.ascam"), n_episodes=3)
+    watcher.poll()
+    (result,) = watcher.poll()
+    events = watcher.events()
+    assert result["n_new_events"] == np.sum(events[:, 0] == 2) > 0
+    assert len(events) == n_events + result["n_new_events"]
+    assert set(events[:, 0]) == {0, 1, 2}
+
+    lines = (output_dir / EVENT_TABLE_FILE).read_text().splitlines()
+    assert lines[0].startswith("File,Episode Number")
+    assert len(lines) == len(events) + 1
+    assert lines[1].startswith('"cell1.ascam",0,')